@@ -6,7 +6,13 @@ from .models import (
     Account,
     Task,
     CrawlTestCasesTask,
-    CreateAccountsTask
+    CreateAccountsTask,
+    ProbeRecord,
+    VerifyTestCasesTask,
+    CrawlBatch,
+    CrawlShard,
+    BenchmarkCrawlerSourcesTask,
+    CrawlerSourceBenchmark
 )
 
 # Register your models here.
@@ -16,4 +22,10 @@ admin.site.register(TestCase)
 admin.site.register(Account)
 admin.site.register(Task)
 admin.site.register(CrawlTestCasesTask)
-admin.site.register(CreateAccountsTask)
\ No newline at end of file
+admin.site.register(CreateAccountsTask)
+admin.site.register(ProbeRecord)
+admin.site.register(VerifyTestCasesTask)
+admin.site.register(CrawlBatch)
+admin.site.register(CrawlShard)
+admin.site.register(BenchmarkCrawlerSourcesTask)
+admin.site.register(CrawlerSourceBenchmark)
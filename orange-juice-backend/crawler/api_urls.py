@@ -2,13 +2,24 @@ from django.urls import path
 from .views import (
     GetCSRFToken,
     CrawlTestCasesTaskView,
+    VerifyTestCasesTaskView,
     CreateAccountsTaskView,
     TaskStatusView,
+    TaskEventsView,
     ProblemListView,
     CrawlerSourceListView,
     ProblemDetailView,
     TestCaseListView,
+    TestCaseDetailView,
+    TestCaseExportView,
     ResumeCrawlTaskView,
+    PauseTaskView,
+    CancelTaskView,
+    MetricsView,
+    CrawlEstimateView,
+    CrawlerSourceBenchmarkView,
+    CrawlBatchView,
+    CrawlBatchStatusView,
 )
 
 
@@ -16,12 +27,24 @@ urlpatterns = [
     path('csrf-cookie/', GetCSRFToken.as_view(), name='get-csrf-token'), # 以後可以移至專門的 APP 中
     
     path('tasks/crawl-testcases/', CrawlTestCasesTaskView.as_view(), name='create_crawl_task'),
+    path('tasks/crawl-batch/', CrawlBatchView.as_view(), name='create_crawl_batch'),
+    path('tasks/crawl-batch/<uuid:batch_id>/', CrawlBatchStatusView.as_view(), name='crawl_batch_status'),
+    path('tasks/verify-testcases/', VerifyTestCasesTaskView.as_view(), name='create_verify_task'),
     path('tasks/<uuid:task_id>/status/', TaskStatusView.as_view(), name='task_status'),
+    path('tasks/<uuid:task_id>/events/', TaskEventsView.as_view(), name='task_events'),
     path('tasks/<uuid:task_id>/resume/', ResumeCrawlTaskView.as_view(), name='resume_crawl_task'),
+    path('tasks/<uuid:task_id>/pause/', PauseTaskView.as_view(), name='pause_task'),
+    path('tasks/<uuid:task_id>/cancel/', CancelTaskView.as_view(), name='cancel_task'),
     path('tasks/create-accounts/', CreateAccountsTaskView.as_view(), name='create_accounts_task'),
 
     path('problems/', ProblemListView.as_view(), name='problem-list'),
     path('problems/<str:problem_id>/', ProblemDetailView.as_view(), name='problem-detail'),
     path('problems/<str:problem_id>/testcases/', TestCaseListView.as_view(), name='testcase-list'),
+    path('problems/<str:problem_id>/testcases/export/', TestCaseExportView.as_view(), name='testcase-export'),
+    path('problems/<str:problem_id>/testcases/<int:pk>/', TestCaseDetailView.as_view(), name='testcase-detail'),
+    path('problems/<str:problem_id>/crawl-estimate/', CrawlEstimateView.as_view(), name='crawl-estimate'),
+    path('problems/<str:problem_id>/crawler-sources/benchmark/', CrawlerSourceBenchmarkView.as_view(), name='crawler-source-benchmark'),
     path('crawler-sources/', CrawlerSourceListView.as_view(), name='crawler-source-list'),
+
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
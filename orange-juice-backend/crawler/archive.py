@@ -0,0 +1,131 @@
+import tarfile
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Tuple
+
+TAR_BLOCK_SIZE = tarfile.BLOCKSIZE
+# tar 檔尾需要兩個全零的 block
+TAR_END_SIZE = TAR_BLOCK_SIZE * 2
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class TarMember:
+    """tar 封存檔中的一個檔案，只記錄排版所需的資訊（不含內容）。"""
+    name: str
+    size: int
+    mtime: int
+
+    @property
+    def span(self) -> int:
+        """此成員在封存檔中佔用的位元組數（header + 補齊到 block 的資料）。"""
+        padded = -(-self.size // TAR_BLOCK_SIZE) * TAR_BLOCK_SIZE
+        return TAR_BLOCK_SIZE + padded
+
+    def header(self) -> bytes:
+        info = tarfile.TarInfo(self.name)
+        info.size = self.size
+        info.mtime = self.mtime
+        info.mode = 0o644
+        return info.tobuf(format=tarfile.USTAR_FORMAT)
+
+
+def build_layout(members: List[TarMember]) -> Tuple[List[int], int]:
+    """
+    計算每個成員在封存檔中的起始位置以及整個封存檔的大小。
+    因為 tar 的排版只取決於檔名與大小，所以不需要讀取內容就能得知，
+    這讓 Range 請求可以直接跳到正確的位置。
+    """
+    offsets = []
+    offset = 0
+    for member in members:
+        offsets.append(offset)
+        offset += member.span
+    return offsets, offset + TAR_END_SIZE
+
+
+def overlapping_members(members: List[TarMember], offsets: List[int], start: int, end: int) -> Tuple[int, int]:
+    """回傳與位元組區間 [start, end] 重疊的成員索引範圍 [first, last)。"""
+    first = len(members)
+    last = len(members)
+    for i, (member, offset) in enumerate(zip(members, offsets)):
+        if offset + member.span <= start:
+            continue
+        if offset > end:
+            last = i
+            break
+        first = min(first, i)
+    return first, max(first, last)
+
+
+def iter_tar_range(
+    members: List[TarMember],
+    offsets: List[int],
+    total: int,
+    contents: Iterable[bytes],
+    start: int,
+    end: int,
+) -> Iterator[bytes]:
+    """
+    逐塊產生封存檔中 [start, end] 區間（含兩端）的位元組。
+
+    Args:
+        contents: 依序產生與此區間重疊之成員的內容，
+                  也就是 overlapping_members() 回傳的範圍。
+    """
+    first, last = overlapping_members(members, offsets, start, end)
+    content_iter = iter(contents)
+
+    for i in range(first, last):
+        member, offset = members[i], offsets[i]
+        data = next(content_iter)
+        if len(data) != member.size:
+            raise ValueError(f"Size of '{member.name}' changed while streaming the archive.")
+
+        padding = b"\0" * (member.span - TAR_BLOCK_SIZE - member.size)
+        block = member.header() + data + padding
+        lo = max(start - offset, 0)
+        hi = min(end - offset + 1, len(block))
+        for pos in range(lo, hi, STREAM_CHUNK_SIZE):
+            yield block[pos:min(pos + STREAM_CHUNK_SIZE, hi)]
+
+    trailer_offset = total - TAR_END_SIZE
+    if end >= trailer_offset:
+        lo = max(start - trailer_offset, 0)
+        yield b"\0" * (end - trailer_offset + 1 - lo)
+
+
+def parse_range_header(header: str, total: int):
+    """
+    解析單一區間的 HTTP Range 標頭。
+
+    Returns:
+        (start, end) 兩端皆包含；標頭不存在或格式不支援時回傳 None，
+        此時應回應完整內容。
+
+    Raises:
+        ValueError: 區間無法滿足（應回應 416）。
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        # 不支援多重區間，依規範可直接回應完整內容
+        return None
+
+    start_str, end_str = (part.strip() for part in spec.split("-", 1))
+    if not (start_str or end_str) or not all(s.isdigit() for s in (start_str, end_str) if s):
+        # 格式錯誤的 Range 直接忽略
+        return None
+
+    if start_str == "":
+        suffix = int(end_str)
+        if suffix == 0:
+            raise ValueError(f"Range '{header}' not satisfiable.")
+        start, end = max(total - suffix, 0), total - 1
+    else:
+        start = int(start_str)
+        end = int(end_str) if end_str else total - 1
+
+    if start >= total or start > end:
+        raise ValueError(f"Range '{header}' not satisfiable.")
+    return start, min(end, total - 1)
@@ -0,0 +1,353 @@
+"""
+在本機模擬 OJClient 會用到的 OJ API，讓爬蟲可以在不接觸真實 OJ 的情況下量測效能。
+
+判題時不會執行提交的程式碼，而是從程式碼中找出一行探測描述（JSON 物件，
+包含 "probe" 欄位與樣板參數），依照 CrawlerSource 樣板應有的語意對每筆測資
+計算數值，再取最大值換算成 memory_cost，與真實 OJ 的 statistic_info 相同。
+"""
+import base64
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import Counter
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from ..core.crawler_core import PAIR_SYMBOLS, CheckWindow, SymbolCode, pair_symbol
+from ..core.incremental import testcase_fingerprint
+from ..core.prefix_hash import prefix_hash
+from ..core.verifier import CHECKSUM_MODULUS, CHECKSUM_OFFSET, NO_MATCH, TOO_SHORT, prefix_checksum
+
+# 1x1 的 PNG，驗證碼內容不會被檢查
+CAPTCHA_PNG = base64.b64encode(
+    bytes.fromhex(
+        "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+        "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+    )
+).decode()
+
+# 與 clients.oj_client.Result 相同的判題結果值
+RESULT_AC = 0
+RESULT_PENDING = 6
+
+
+@dataclass
+class FakeOJConfig:
+    test_cases: List[str] = field(default_factory=list)
+    # 單次判題所需的時間（秒）
+    judge_latency: float = 0.05
+    # 同時判題的數量，超過時提交會排隊
+    queue_depth: int = 4
+    # memory_cost = memory_intercept + memory_slope * value + 雜訊
+    memory_intercept: int = 10 * 1024 * 1024
+    memory_slope: int = 64 * 1024
+    # 雜訊的標準差，與 memory_cost 同單位
+    memory_noise: float = 0.0
+    # 判題完成後回傳錯誤的機率
+    judge_error_rate: float = 0.0
+    # /api/submission 直接回應 HTTP 500 的機率
+    server_error_rate: float = 0.0
+    seed: Optional[int] = None
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    length = 0
+    while length < min(len(a), len(b)) and a[length] == b[length]:
+        length += 1
+    return length
+
+
+def _digit_count(number: int) -> int:
+    count = 0
+    while number > 0:
+        number >>= 8
+        count += 1
+    return count
+
+
+def _probe_prefix(probe: dict) -> str:
+    """樣板以 {prefix_hex} 填入位元組精確的前綴時，解回每個字元對應一個位元組的 str"""
+    if 'prefix_hex' in probe:
+        return bytes.fromhex(probe['prefix_hex']).decode('latin-1')
+    return probe['prefix']
+
+
+def _matched_prefix_length(probe: dict, test_case: str) -> Optional[int]:
+    """測資以探測的前綴開頭時回傳前綴長度，否則回傳 None；只拿到前綴的長度與雜湊時比對同長度前綴的雜湊"""
+    if 'prefix_hash' in probe:
+        length = probe['prefix_length']
+        if len(test_case) >= length and prefix_hash(test_case[:length].encode('latin-1')) == probe['prefix_hash']:
+            return length
+        return None
+    prefix = _probe_prefix(probe)
+    return len(prefix) if test_case.startswith(prefix) else None
+
+
+def evaluate_probe(probe: dict, test_case: str) -> int:
+    """
+    計算探測在單一測資上應回傳的數值（判題會取所有測資的最大值）。
+    與該測資無關時回傳 -1，這也是各樣板在真實 OJ 上應有的行為。
+    檢查探測（check_count 不為 0）回傳原本的數值經 CheckWindow 轉換的結果。
+    """
+    value = _evaluate_probe(probe, test_case)
+    if probe.get('check_count'):
+        value = CheckWindow(probe['check_low'], probe['check_count'], probe['check_spacing']).value(value)
+    return value
+
+
+def _evaluate_probe(probe: dict, test_case: str) -> int:
+    kind = probe['probe']
+    excluded = testcase_fingerprint(test_case) in probe.get('exclude', [])
+
+    if kind == 'get_number':
+        return probe['number']
+
+    if kind == 'get_next_char':
+        length = _matched_prefix_length(probe, test_case)
+        if excluded or length is None:
+            return -1
+        char = ord(test_case[length]) if len(test_case) > length else 0
+        return char if char < probe['limit'] else -1
+
+    if kind == 'get_next_char_pair':
+        length = _matched_prefix_length(probe, test_case)
+        if excluded or length is None:
+            return -1
+        chars = [ord(char) for char in test_case[length:length + 2]]
+        chars += [0] * (2 - len(chars))
+        if chars[0] >= probe['limit']:
+            return -1
+        return pair_symbol(chars[0]) * len(PAIR_SYMBOLS) + pair_symbol(chars[1])
+
+    if kind == 'get_next_symbols':
+        length = _matched_prefix_length(probe, test_case)
+        if excluded or length is None or (len(test_case) > length and ord(test_case[length]) >= probe['limit']):
+            return -1
+        code = SymbolCode(bytes(probe['alphabet']), probe['symbol_count'], probe['symbol_spacing'])
+        return code.encode(test_case[length:length + code.count].encode('latin-1'))
+
+    if kind == 'get_max_char_below':
+        chars = [ord(char) for char in test_case if ord(char) < probe['limit']]
+        return max(chars, default=-1)
+
+    if kind == 'get_next_char_or_branch':
+        # 可往下走的測資回傳 branch_radix + 字元，字典序較小的測資回傳與 prefix 的共同前綴長度
+        prefix = _probe_prefix(probe)
+        radix = probe['branch_radix']
+        if excluded:
+            return -1
+        if test_case.startswith(prefix):
+            if len(test_case) == len(prefix):
+                return -1
+            char = ord(test_case[len(prefix)])
+            return radix + char if char < probe['limit'] else -1
+        if test_case < prefix:
+            return min(_common_prefix_length(test_case, prefix), radix - 1)
+        return -1
+
+    if kind in ('get_prefix_length_length', 'get_prefix_length'):
+        # 字典序比 prefix 小的測資中，與 prefix 共同前綴最長者就是下一筆要走訪的測資
+        prefix = _probe_prefix(probe)
+        if excluded or test_case >= prefix:
+            return -1
+        length = _common_prefix_length(test_case, prefix)
+        if kind == 'get_prefix_length_length':
+            return _digit_count(length)
+        position = probe['position']
+        if length >> (8 * (position + 1)) != probe['length_prefix']:
+            return -1
+        return (length >> (8 * position)) & 0xFF
+
+    if kind == 'get_prefix_checksum':
+        if not test_case.startswith(probe['anchor']):
+            return NO_MATCH
+        if len(test_case) < probe['length']:
+            return TOO_SHORT
+        return CHECKSUM_OFFSET + prefix_checksum(test_case, probe['length'], probe.get('modulus', CHECKSUM_MODULUS))
+
+    if kind == 'get_char_at':
+        # 每筆測資回傳自己在 position 的字元，由判題結果中各測資的記憶體用量讀出
+        position = probe['position']
+        return ord(test_case[position]) if position < len(test_case) else 0
+
+    if kind == 'get_length_bits':
+        return len(test_case).bit_length()
+
+    if kind == 'has_case':
+        return int(testcase_fingerprint(test_case) == probe['fingerprint'])
+
+    if kind == 'has_unknown_case':
+        return int(testcase_fingerprint(test_case) not in probe['fingerprints'])
+
+    raise ValueError(f"Unknown probe '{kind}'.")
+
+
+def parse_probe(code: str) -> dict:
+    """從提交的程式碼中找出探測描述"""
+    for line in code.splitlines():
+        line = line.strip()
+        if line.startswith('{') and '"probe"' in line:
+            return json.loads(line)
+    raise ValueError("No probe descriptor found in submitted code.")
+
+
+class FakeOJ:
+    """
+    在背景執行緒中執行的假 OJ 伺服器。
+
+    使用方式：
+        with FakeOJ(FakeOJConfig(test_cases=[...])) as oj:
+            client.base_url = oj.url
+    """
+
+    def __init__(self, config: FakeOJConfig):
+        self.config = config
+        self.requests: Counter = Counter()
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._submissions: Dict[str, dict] = {}
+        # 每個判題槽位下一次空閒的時間
+        self._slot_free_at = [0.0] * max(config.queue_depth, 1)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> 'FakeOJ':
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-oj', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self) -> 'FakeOJ':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+    def _memory_of(self, value: int) -> int:
+        noise = self._random.gauss(0, self.config.memory_noise) if self.config.memory_noise else 0
+        return int(round(self.config.memory_intercept + self.config.memory_slope * value + noise))
+
+    def submit(self, code: str) -> dict:
+        """排入判題佇列並預先計算結果，回傳 /api/submission 的回應內容"""
+        try:
+            probe = parse_probe(code)
+            values = [evaluate_probe(probe, test_case) for test_case in self.config.test_cases]
+        except (ValueError, KeyError, TypeError) as e:
+            # 相當於編譯錯誤
+            return {"error": "error", "data": f"Compile Error: {e}"}
+
+        with self._lock:
+            now = time.monotonic()
+            slot = min(range(len(self._slot_free_at)), key=self._slot_free_at.__getitem__)
+            ready_at = max(now, self._slot_free_at[slot]) + self.config.judge_latency
+            self._slot_free_at[slot] = ready_at
+
+            submission_id = uuid.uuid4().hex
+            failed = self._random.random() < self.config.judge_error_rate
+            self._submissions[submission_id] = {
+                'ready_at': ready_at,
+                'failed': failed,
+                'case_memory': [self._memory_of(value) for value in values],
+                'value': max(values, default=-1),
+            }
+        return {"error": None, "data": {"submission_id": submission_id}}
+
+    def get_submission(self, submission_id: str) -> dict:
+        with self._lock:
+            submission = self._submissions.get(submission_id)
+        if submission is None:
+            return {"error": "error", "data": "Submission doesn't exist"}
+        if time.monotonic() < submission['ready_at']:
+            return {"error": None, "data": {"result": RESULT_PENDING, "statistic_info": {}}}
+        if submission['failed']:
+            return {"error": "error", "data": "Judge server unavailable"}
+
+        case_memory = submission['case_memory']
+        return {"error": None, "data": {
+            "result": RESULT_AC,
+            "statistic_info": {
+                "memory_cost": max(case_memory, default=self._memory_of(-1)),
+                "time_cost": int(self.config.judge_latency * 1000),
+            },
+            "info": {"data": [
+                {"test_case": str(i + 1), "result": RESULT_AC, "memory": memory, "cpu_time": int(self.config.judge_latency * 1000)}
+                for i, memory in enumerate(case_memory)
+            ]},
+        }}
+
+    def _make_handler(self):
+        oj = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, payload: dict, status: int = 200, cookies: Optional[dict] = None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (cookies or {}).items():
+                    cookie = SimpleCookie()
+                    cookie[name] = value
+                    cookie[name]['path'] = '/'
+                    self.send_header('Set-Cookie', cookie[name].OutputString())
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                oj.requests[('GET', url.path)] += 1
+                if url.path == '/api/profile':
+                    self._send_json({"error": None, "data": None}, cookies={'csrftoken': uuid.uuid4().hex})
+                elif url.path == '/api/captcha':
+                    self._send_json({"error": None, "data": f"data:image/png;base64,{CAPTCHA_PNG}"})
+                elif url.path == '/api/submission':
+                    if oj._random.random() < oj.config.server_error_rate:
+                        self._send_json({"error": "server error"}, status=500)
+                        return
+                    submission_id = parse_qs(url.query).get('id', [''])[0]
+                    self._send_json(oj.get_submission(submission_id))
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                oj.requests[('POST', url.path)] += 1
+                body = self._read_body()
+                if url.path == '/api/login':
+                    self._send_json({"error": None, "data": "Succeeded"}, cookies={'sessionid': uuid.uuid4().hex, 'csrftoken': uuid.uuid4().hex})
+                elif url.path == '/api/register':
+                    self._send_json({"error": None, "data": "Succeeded"})
+                elif url.path == '/api/submission':
+                    if oj._random.random() < oj.config.server_error_rate:
+                        self._send_json({"error": "server error"}, status=500)
+                        return
+                    form = parse_qs(body.decode())
+                    self._send_json(oj.submit(form.get('code', [''])[0]))
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+
+        return Handler
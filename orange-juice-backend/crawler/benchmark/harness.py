@@ -0,0 +1,406 @@
+"""
+在假 OJ 上以真正的 CrawlTestCasesSubmitter 與 OJClient 執行完整的爬取流程，
+量測每種 CrawlerCore 模式的提交次數、耗時、每次探測的 HTTP 請求數與解碼錯誤率。
+"""
+import logging
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from ..clients.oj_client import OJClient
+from ..core.alphabet import alphabet_of, choose_symbol_code, prepare_symbol_code
+from ..core.channel import measure_channel, prepare_check_code
+from ..core.cost_model import CALIBRATION_PROBES, probes_for_per_case, probes_for_test_cases
+from ..core.crawler_core import CALIBRATION_NUMBERS, CrawlerCore
+from ..core.incremental import plan_incremental_crawl, testcase_fingerprint
+from ..core.per_case import NoisyChannelError, PerCaseCrawler
+from ..core.sharding import plan_shards
+from ..core.speculation import NextCharModel
+from ..core.verifier import TestCaseVerifier, checksum_moduli, find_anchor
+from ..models import Account, CrawlerSource, Problem
+from ..tasks import CrawlTestCasesSubmitter
+from .fake_oj import FakeOJ, FakeOJConfig
+
+logger = logging.getLogger(__name__)
+
+# 假 OJ 認得的探測樣板：每個樣板只是一行 JSON 探測描述，判題時由假 OJ 計算結果
+BENCHMARK_CODES = {
+    'get_number': '{{"probe": "get_number", "number": {number}}}',
+    'get_next_char': '{{"probe": "get_next_char", "prefix_hash": {prefix_hash}, "prefix_length": {prefix_length}, "limit": {limit}, "exclude": {exclude}, "check_low": {check_low}, "check_count": {check_count}, "check_spacing": {check_spacing}}}',
+    'get_next_char_or_branch': '{{"probe": "get_next_char_or_branch", "prefix_hex": {prefix_hex}, "limit": {limit}, "branch_radix": {branch_radix}, "exclude": {exclude}, "check_low": {check_low}, "check_count": {check_count}, "check_spacing": {check_spacing}}}',
+    'get_next_char_pair': '{{"probe": "get_next_char_pair", "prefix_hash": {prefix_hash}, "prefix_length": {prefix_length}, "limit": {limit}, "exclude": {exclude}, "check_low": {check_low}, "check_count": {check_count}, "check_spacing": {check_spacing}}}',
+    'get_next_symbols': '{{"probe": "get_next_symbols", "prefix_hash": {prefix_hash}, "prefix_length": {prefix_length}, "limit": {limit}, "alphabet": {alphabet}, "symbol_count": {symbol_count}, "symbol_spacing": {symbol_spacing}, "exclude": {exclude}, "check_low": {check_low}, "check_count": {check_count}, "check_spacing": {check_spacing}}}',
+    'get_max_char_below': '{{"probe": "get_max_char_below", "limit": {limit}}}',
+    'get_prefix_length_length': '{{"probe": "get_prefix_length_length", "prefix_hex": {prefix_hex}, "exclude": {exclude}, "check_low": {check_low}, "check_count": {check_count}, "check_spacing": {check_spacing}}}',
+    'get_prefix_length': '{{"probe": "get_prefix_length", "prefix_hex": {prefix_hex}, "length_prefix": {length_prefix}, "position": {position}, "exclude": {exclude}, "check_low": {check_low}, "check_count": {check_count}, "check_spacing": {check_spacing}}}',
+    'get_length_bits': '{{"probe": "get_length_bits"}}',
+    'get_char_at': '{{"probe": "get_char_at", "position": {position}}}',
+    'get_prefix_checksum': '{{"probe": "get_prefix_checksum", "anchor": {anchor}, "length": {length}, "modulus": {checksum_modulus}}}',
+    'has_case': '{{"probe": "has_case", "fingerprint": {fingerprint}}}',
+    'has_unknown_case': '{{"probe": "has_unknown_case", "fingerprints": {fingerprints}}}',
+}
+BENCHMARK_LANGUAGE = 'JSON'
+
+
+class BenchmarkRecorder:
+    """
+    取代 WriteBehindBuffer，只在記憶體中累計探測統計，不寫入資料庫。
+    """
+
+    def __init__(self):
+        self.stats: Counter = Counter()
+        self.probe_records: List[dict] = []
+
+    def touch_account(self, account: Account) -> None:
+        pass
+
+    def set_progress(self, progress: int) -> None:
+        pass
+
+    def add_stats(self, **counters: int) -> None:
+        self.stats.update(counters)
+
+    def add_probe_record(self, **fields) -> None:
+        self.probe_records.append(fields)
+
+    def maybe_flush(self) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+
+class MemoryProbeCache:
+    """取代以 Redis 保存的 ProbeResultCache，只保存在記憶體中"""
+
+    def __init__(self):
+        self.results: Dict[str, dict] = {}
+
+    def get(self, code: str) -> Optional[dict]:
+        return self.results.get(code)
+
+    def put(self, code: str, result: dict) -> None:
+        self.results[code] = result
+
+
+class BenchmarkSubmitter(CrawlTestCasesSubmitter):
+    """找到的測資只收集在記憶體中，不寫入資料庫"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.testcases: List[str] = []
+
+    def found_testcase(self, testcase: str) -> None:
+        self.testcases.append(testcase)
+        if self.speculation is not None:
+            self.speculation.add(testcase)
+        self.buffer.add_stats(testcases_found=1)
+
+
+# 各模式接收已登入的 submitter 與 judge 上的測資，回傳解碼後認為 judge 上有的測資
+BenchmarkMode = Callable[[BenchmarkSubmitter, List[str]], List[str]]
+BENCHMARK_MODES: Dict[str, BenchmarkMode] = {}
+# 各模式的成本模型，回報中會附上預估的探測數以檢查模型是否準確
+BENCHMARK_ESTIMATES: Dict[str, Callable[[List[str]], int]] = {}
+
+
+def benchmark_mode(name: str, estimate: Optional[Callable[[List[str]], int]] = None):
+    """註冊一個基準測試模式"""
+    def decorator(func: BenchmarkMode) -> BenchmarkMode:
+        BENCHMARK_MODES[name] = func
+        if estimate is not None:
+            BENCHMARK_ESTIMATES[name] = estimate
+        return func
+    return decorator
+
+
+@benchmark_mode('full', estimate=probes_for_test_cases)
+def run_full_crawl(submitter: BenchmarkSubmitter, test_cases: List[str]) -> List[str]:
+    CrawlerCore(submitter).run()
+    return submitter.testcases
+
+
+# 'branch' 模式的進位數，與 CRAWL_BRANCH_RADIX 的預設值相同
+BENCHMARK_BRANCH_RADIX = 256
+
+
+@benchmark_mode('branch', estimate=lambda test_cases: probes_for_test_cases(test_cases, branch_radix=BENCHMARK_BRANCH_RADIX))
+def run_branch_crawl(submitter: BenchmarkSubmitter, test_cases: List[str]) -> List[str]:
+    """結尾探測同時回傳分岔點，省下大部分 get_prefix_length_length 與 get_prefix_length"""
+    CrawlerCore(submitter, branch_radix=BENCHMARK_BRANCH_RADIX).run()
+    return submitter.testcases
+
+
+@benchmark_mode('pairs', estimate=lambda test_cases: probes_for_test_cases(test_cases, char_pairs=True))
+def run_char_pair_crawl(submitter: BenchmarkSubmitter, test_cases: List[str]) -> List[str]:
+    """數字、空白與換行之後一次讀取兩個字元"""
+    CrawlerCore(submitter, char_pairs=True).run()
+    return submitter.testcases
+
+
+SYMBOL_CHANNEL_ROUNDS = 2
+
+
+def _estimate_symbol_crawl(test_cases: List[str]) -> int:
+    """
+    量測通道、校正、逐一探測字元集合（每個字元一次，再一次確認沒有更小的字元），
+    再以沒有雜訊時的 SymbolCode 爬取
+    """
+    alphabet = alphabet_of(test_cases)
+    learning = len(alphabet) - 1 + (0 if 1 in alphabet else 1)
+    code = choose_symbol_code(alphabet)
+    measurement = SYMBOL_CHANNEL_ROUNDS * len(CALIBRATION_NUMBERS)
+    return measurement + CALIBRATION_PROBES + learning + probes_for_test_cases(test_cases, calibrated=True, symbol_code=code)
+
+
+@benchmark_mode('symbols', estimate=_estimate_symbol_crawl)
+def run_symbol_crawl(submitter: BenchmarkSubmitter, test_cases: List[str]) -> List[str]:
+    """
+    先學習測資的字元集合，再依校正的雜訊一次讀取多個字元或拉開數值間距。
+    與任務相同，有雜訊時先決定檢查探測，其他單一字元的讀取（跳脫、前綴長度）也會被更正。
+    """
+    # 與任務使用 CrawlerSourceBenchmark 的雜訊相同：校正只有幾個點，先量測一次通道
+    measurement = measure_channel(submitter, rounds=SYMBOL_CHANNEL_ROUNDS)
+    crawler_core = CrawlerCore(submitter)
+    check_code = prepare_check_code(crawler_core, measured_noise=measurement.noise_bound)
+    if check_code is not None:
+        submitter.buffer.add_stats(check_probes_per_read=len(check_code.radii))
+    code = prepare_symbol_code(crawler_core, submitter, measured_noise=measurement.noise_bound)
+    if code is not None:
+        submitter.buffer.add_stats(symbols_per_probe=code.count, symbol_spacing=code.spacing)
+    crawler_core.run()
+    return submitter.testcases
+
+
+def _estimate_checked_crawl(test_cases: List[str]) -> int:
+    """量測通道與校正，沒有雜訊時不需要檢查探測"""
+    measurement = SYMBOL_CHANNEL_ROUNDS * len(CALIBRATION_NUMBERS)
+    return measurement + probes_for_test_cases(test_cases)
+
+
+@benchmark_mode('checked', estimate=_estimate_checked_crawl)
+def run_checked_crawl(submitter: BenchmarkSubmitter, test_cases: List[str]) -> List[str]:
+    """依量測的雜訊在每次讀取之後送出檢查探測，更正誤讀的數值"""
+    measurement = measure_channel(submitter, rounds=SYMBOL_CHANNEL_ROUNDS)
+    crawler_core = CrawlerCore(submitter)
+    code = prepare_check_code(crawler_core, measured_noise=measurement.noise_bound)
+    if code is not None:
+        submitter.buffer.add_stats(check_probes_per_read=len(code.radii))
+    crawler_core.run()
+    return submitter.testcases
+
+
+@benchmark_mode('sharded')
+def run_sharded_crawl(submitter: BenchmarkSubmitter, test_cases: List[str]) -> List[str]:
+    """依序執行 crawl coordinator 規劃的每個分片，分片之間共用同一組校正參數"""
+    coordinator = CrawlerCore(submitter)
+    shards = plan_shards(coordinator, submitter, shards_wanted=4, max_depth=3)
+    submitter.buffer.add_stats(shards=len(shards))
+    for shard in shards:
+        crawler_core = CrawlerCore(submitter)
+        crawler_core.load_state(shard.initial_state(coordinator))
+        crawler_core.run()
+    return submitter.testcases
+
+
+@benchmark_mode('per_case', estimate=probes_for_per_case)
+def run_per_case_crawl(submitter: BenchmarkSubmitter, test_cases: List[str]) -> List[str]:
+    """校正的雜訊太大時與任務相同，改以檢查探測更正讀數的完整爬取"""
+    try:
+        PerCaseCrawler(submitter).run()
+    except NoisyChannelError:
+        submitter.buffer.add_stats(fallback_full=1)
+        return run_checked_crawl(submitter, test_cases)
+    return submitter.testcases
+
+
+def _stale_copy(test_cases: List[str]) -> List[str]:
+    """
+    模擬上次爬取後的資料庫：每四筆少一筆（新增的測資）、
+    一筆內容被修改，以及一筆已從 judge 移除的測資。
+    """
+    stored = [test_case for i, test_case in enumerate(test_cases) if i % 4 != 3]
+    if stored:
+        stored[0] = stored[0] + '0'
+    stored.append('\x7f removed')
+    return stored
+
+
+@benchmark_mode('speculative', estimate=probes_for_test_cases)
+def run_speculative_crawl(submitter: BenchmarkSubmitter, test_cases: List[str]) -> List[str]:
+    """等待判題時以其他帳號預先提交最可能的下一個前綴，字元統計來自上次爬取的測資"""
+    submitter.speculation = NextCharModel(_stale_copy(test_cases))
+    submitter.speculation_width = len(submitter.accounts) - 1
+    CrawlerCore(submitter).run()
+    return submitter.testcases
+
+
+@benchmark_mode('recrawl', estimate=probes_for_test_cases)
+def run_recrawl(submitter: BenchmarkSubmitter, test_cases: List[str]) -> List[str]:
+    """同一題爬取兩次，第二次的探測與第一次完全相同，全部由探測結果快取回答"""
+    submitter.cache = MemoryProbeCache()
+    CrawlerCore(submitter).run()
+    submitter.testcases.clear()
+    CrawlerCore(submitter).run()
+    return submitter.testcases
+
+
+@benchmark_mode('incremental')
+def run_incremental_crawl(submitter: BenchmarkSubmitter, test_cases: List[str]) -> List[str]:
+    stored = _stale_copy(test_cases)
+    by_fingerprint = {testcase_fingerprint(content): content for content in stored}
+    crawler_core = CrawlerCore(submitter)
+
+    plan = plan_incremental_crawl(crawler_core, submitter, list(by_fingerprint))
+    submitter.exclude_fingerprints = plan.present
+    if plan.has_unknown:
+        crawler_core.run()
+    return [by_fingerprint[fingerprint] for fingerprint in plan.present] + submitter.testcases
+
+
+@benchmark_mode('verify')
+def run_verify(submitter: BenchmarkSubmitter, test_cases: List[str]) -> List[str]:
+    # 每三筆竄改一筆的最後一個字元
+    stored = [
+        test_case[:-1] + chr(ord(test_case[-1]) ^ 1) if i % 3 == 0 and test_case else test_case
+        for i, test_case in enumerate(test_cases)
+    ]
+    verifier = TestCaseVerifier(submitter, moduli=checksum_moduli(submitter.codes))
+    decoded = []
+    for content in stored:
+        extended = any(other != content and other.startswith(content) for other in stored)
+        outcome = verifier.verify(content, find_anchor(content, stored), check_length=not extended, others=stored)
+        if outcome.status == 'OK':
+            decoded.append(content)
+        elif outcome.status == 'REPAIRED':
+            decoded.append(outcome.repaired_content)
+    return decoded
+
+
+@dataclass
+class BenchmarkReport:
+    mode: str
+    test_cases: int
+    # 成功判題的探測數
+    probes: int = 0
+    failed_attempts: int = 0
+    wall_time: float = 0.0
+    # 探測期間對 /api/submission 的 HTTP 請求數（提交加上輪詢）
+    http_requests: int = 0
+    # 漏掉與多出的測資數除以 judge 上的測資數
+    decode_error_rate: float = 0.0
+    error: Optional[str] = None
+    extra: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def submissions_per_testcase(self) -> float:
+        return self.probes / self.test_cases if self.test_cases else 0.0
+
+    @property
+    def requests_per_probe(self) -> float:
+        return self.http_requests / self.probes if self.probes else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            'mode': self.mode,
+            'test_cases': self.test_cases,
+            'probes': self.probes,
+            'failed_attempts': self.failed_attempts,
+            'submissions_per_testcase': round(self.submissions_per_testcase, 3),
+            'wall_time': round(self.wall_time, 3),
+            'requests_per_probe': round(self.requests_per_probe, 3),
+            'decode_error_rate': round(self.decode_error_rate, 4),
+            'error': self.error,
+            **self.extra,
+        }
+
+
+def generate_test_cases(count: int, numbers: int, seed: Optional[int] = None) -> List[str]:
+    """產生常見的競程輸入格式：第一行為數量，第二行為以空白分隔的整數"""
+    rng = random.Random(seed)
+    test_cases = set()
+    while len(test_cases) < count:
+        n = rng.randint(1, numbers)
+        values = ' '.join(str(rng.randint(-10 ** 9, 10 ** 9)) for _ in range(n))
+        test_cases.add(f"{n}\n{values}\n")
+    return sorted(test_cases)
+
+
+def decode_error_rate(expected: Iterable[str], decoded: Iterable[str]) -> float:
+    expected, decoded = set(expected), set(decoded)
+    if not expected:
+        return float(bool(decoded))
+    return len(expected ^ decoded) / len(expected)
+
+
+def _login_accounts(oj: FakeOJ, num_accounts: int) -> list:
+    accounts = []
+    for i in range(num_accounts):
+        account = Account(username=f"benchmark{i}")
+        client = OJClient()
+        client.base_url = oj.url
+        client.login(account.username, 'benchmark')
+        accounts.append((account, client))
+    return accounts
+
+
+def run_benchmark_mode(mode: str, config: FakeOJConfig, num_accounts: int = 3, poll_interval: float = 0.01) -> BenchmarkReport:
+    """以新的假 OJ 執行一個模式，各模式的請求計數互不影響"""
+    report = BenchmarkReport(mode=mode, test_cases=len(set(config.test_cases)))
+    with FakeOJ(config) as oj:
+        accounts = _login_accounts(oj, num_accounts)
+        recorder = BenchmarkRecorder()
+        submitter = BenchmarkSubmitter(
+            accounts,
+            CrawlerSource(name='benchmark', language=BENCHMARK_LANGUAGE, code=BENCHMARK_CODES),
+            Problem(oj_submit_id=0),
+            '', '',
+            buffer=recorder,
+        )
+        submitter.poll_interval = poll_interval
+        submitter.retry_delay = poll_interval
+
+        requests_before = oj.requests[('POST', '/api/submission')] + oj.requests[('GET', '/api/submission')]
+        started = time.monotonic()
+        decoded = []
+        try:
+            decoded = BENCHMARK_MODES[mode](submitter, list(config.test_cases))
+        except Exception as e:
+            logger.warning(f"Benchmark mode '{mode}' failed: {e}", exc_info=True)
+            report.error = str(e)
+        report.wall_time = time.monotonic() - started
+        report.http_requests = oj.requests[('POST', '/api/submission')] + oj.requests[('GET', '/api/submission')] - requests_before
+
+    report.probes = recorder.stats['submissions']
+    report.failed_attempts = recorder.stats['failed_attempts']
+    if recorder.stats['shards']:
+        report.extra['shards'] = recorder.stats['shards']
+    if recorder.stats['symbols_per_probe']:
+        report.extra['symbols_per_probe'] = recorder.stats['symbols_per_probe']
+        report.extra['symbol_spacing'] = recorder.stats['symbol_spacing']
+    if recorder.stats['speculative_submissions']:
+        report.extra['speculative_submissions'] = recorder.stats['speculative_submissions']
+        report.extra['speculative_hits'] = recorder.stats['speculative_hits']
+    if recorder.stats['cache_hits']:
+        report.extra['cache_hits'] = recorder.stats['cache_hits']
+    if recorder.stats['fallback_full']:
+        report.extra['fallback_full'] = recorder.stats['fallback_full']
+    if recorder.stats['check_probes_per_read']:
+        report.extra['check_probes_per_read'] = recorder.stats['check_probes_per_read']
+    if report.probes:
+        report.extra['code_bytes_per_probe'] = round(recorder.stats['code_bytes'] / report.probes, 1)
+    report.decode_error_rate = 1.0 if report.error else decode_error_rate(config.test_cases, decoded)
+    if mode in BENCHMARK_ESTIMATES:
+        report.extra['estimated_probes'] = BENCHMARK_ESTIMATES[mode](list(config.test_cases))
+    return report
+
+
+def run_benchmark(config: FakeOJConfig, modes: Optional[Iterable[str]] = None, **kwargs) -> List[BenchmarkReport]:
+    """依序執行指定的模式（預設為全部已註冊的模式）"""
+    modes = list(modes) if modes is not None else list(BENCHMARK_MODES)
+    unknown = [mode for mode in modes if mode not in BENCHMARK_MODES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark mode(s): {', '.join(unknown)}.")
+    return [run_benchmark_mode(mode, config, **kwargs) for mode in modes]
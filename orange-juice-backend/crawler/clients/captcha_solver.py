@@ -1,5 +1,7 @@
-from typing import Union
+from dataclasses import dataclass
+from typing import List, Union
 import io
+import math
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
@@ -63,6 +65,18 @@ class CaptchaCNN(nn.Module):
 
         return output1, output2, output3, output4
 
+@dataclass
+class CaptchaSolution:
+    text: str
+    # 每個字元的 softmax 機率
+    confidences: List[float]
+
+    @property
+    def confidence(self) -> float:
+        """四個字元都正確的機率（假設各字元的預測互相獨立）"""
+        return math.prod(self.confidences)
+
+
 class CaptchaPredictor:
     def __init__(self, model_path):
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
@@ -77,6 +91,9 @@ class CaptchaPredictor:
         ])
 
     def predict(self, image: Union[Image.Image, str, io.BytesIO]):
+        return self.predict_with_confidence(image).text
+
+    def predict_with_confidence(self, image: Union[Image.Image, str, io.BytesIO]) -> CaptchaSolution:
         if not isinstance(image, Image.Image):
             image = Image.open(image).convert('RGB')
         
@@ -84,14 +101,23 @@ class CaptchaPredictor:
         
         with torch.no_grad():
             outputs = self.model(image)
-            predicted = [torch.argmax(output, dim=1).item() for output in outputs]
-            result = ''.join(INT_TO_CHAR[idx] for idx in predicted)
+            probabilities = [F.softmax(output, dim=1) for output in outputs]
+            best = [torch.max(probability, dim=1) for probability in probabilities]
+            result = ''.join(INT_TO_CHAR[idx.item()] for _, idx in best)
+            confidences = [value.item() for value, _ in best]
             
-        return result
+        return CaptchaSolution(text=result, confidences=confidences)
 
 
 predictor_instance: CaptchaPredictor = None
 
+def get_predictor() -> CaptchaPredictor:
+    """取得常駐記憶體的模型，第一次呼叫時才載入"""
+    global predictor_instance
+    if predictor_instance is None:
+        predictor_instance = CaptchaPredictor(model_path=settings.CNN_MODEL_PATH)
+    return predictor_instance
+
 def solve_captcha(image_data: Union[str, io.BytesIO]) -> str:
     """
     使用常駐記憶體的模型來辨識驗證碼。
@@ -102,8 +128,8 @@ def solve_captcha(image_data: Union[str, io.BytesIO]) -> str:
     Returns:
         辨識出的字串。
     """
-    global predictor_instance
-    if predictor_instance is None:
-        predictor_instance = CaptchaPredictor(model_path=settings.CNN_MODEL_PATH)
-        
-    return predictor_instance.predict(image_data)
\ No newline at end of file
+    return get_predictor().predict(image_data)
+
+def solve_captcha_with_confidence(image_data: Union[str, io.BytesIO]) -> CaptchaSolution:
+    """與 solve_captcha 相同，但同時回傳每個字元的信心值"""
+    return get_predictor().predict_with_confidence(image_data)
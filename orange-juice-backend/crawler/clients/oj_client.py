@@ -6,8 +6,8 @@ import requests
 from django.conf import settings
 from urllib.parse import urljoin
 
-from .captcha_solver import solve_captcha
 from .exceptions import OJClientError, CaptchaError, AccountExistsError, OJServerError, LoginFailedError
+from .. import metrics
 
 import logging
 
@@ -106,6 +106,39 @@ class OJClient:
         except requests.exceptions.RequestException as e:
             raise OJServerError(f"Network error while fetching CSRF token: {e}")
 
+    def _fetch_captcha(self) -> bytes:
+        """取得 session 目前的驗證碼圖片；之前取得的驗證碼會失效"""
+        response = self.session.get(self._get_url("/api/captcha"), timeout=10)
+        response.raise_for_status()
+        captcha_data = response.json()
+
+        base64_str = captcha_data.get('data', '').split(',')[-1]
+        if not base64_str:
+            raise OJClientError("Captcha data is empty in the response.")
+        return base64.b64decode(base64_str)
+
+    def _solve_confident_captcha(self) -> str:
+        """
+        辨識驗證碼，信心值低於 CAPTCHA_MIN_CONFIDENCE 時重新取得一張，最多 CAPTCHA_MAX_REFRESHES 次。
+        取得新的驗證碼只需要一次 GET，比送出一定會失敗的註冊請求便宜，也不會計入任務的失敗次數。
+        仍然信心不足時，使用最後一張的辨識結果（只有最後一張在 session 中有效）。
+        """
+        # 延遲載入 torch，只有註冊帳號的 worker 需要辨識驗證碼
+        from .captcha_solver import solve_captcha_with_confidence
+
+        for refresh in range(settings.CAPTCHA_MAX_REFRESHES + 1):
+            captcha_image_bytes = self._fetch_captcha()
+            with metrics.span('captcha_solve'):
+                solution = solve_captcha_with_confidence(BytesIO(captcha_image_bytes))
+            if solution.confidence >= settings.CAPTCHA_MIN_CONFIDENCE:
+                break
+            if refresh < settings.CAPTCHA_MAX_REFRESHES:
+                metrics.inc('captcha_refreshes')
+                logger.debug(f"Captcha confidence {solution.confidence:.3f} is too low, fetching a new one.")
+        else:
+            metrics.inc('captcha_low_confidence_submits')
+        return solution.text
+
     def register(self, username: str, password: str, email: str) -> None:
         """
         執行註冊流程，**不包含登入**。
@@ -122,18 +155,8 @@ class OJClient:
             # --- 步驟 1: 確保我們有 CSRF Token ---
             self._get_and_update_csrf_token()
 
-            # --- 步驟 2: 獲取驗證碼 ---
-            response = self.session.get(self._get_url("/api/captcha"), timeout=10)
-            response.raise_for_status()
-            captcha_data = response.json()
-            
-            base64_str = captcha_data.get('data', '').split(',')[-1]
-            if not base64_str:
-                raise OJClientError("Captcha data is empty in the response.")
-
-            # --- 步驟 3: 辨識驗證碼 ---
-            captcha_image_bytes = base64.b64decode(base64_str)
-            captcha_solution = solve_captcha(BytesIO(captcha_image_bytes))
+            # --- 步驟 2、3: 獲取並辨識驗證碼，信心不足時換一張 ---
+            captcha_solution = self._solve_confident_captcha()
 
             # --- 步驟 4: 提交註冊請求 ---
             register_payload = {
@@ -142,11 +165,13 @@ class OJClient:
                 "email": email,
                 "captcha": captcha_solution,
             }
-            reg_response = self.session.post(
-                self._get_url("/api/register"),
-                json=register_payload,
-                timeout=15
-            )
+            metrics.inc('register_posts')
+            with metrics.span('oj_request', endpoint='register'):
+                reg_response = self.session.post(
+                    self._get_url("/api/register"),
+                    json=register_payload,
+                    timeout=15
+                )
             reg_response.raise_for_status()
             
             reg_data = reg_response.json()
@@ -192,11 +217,12 @@ class OJClient:
                 "username": username,
                 "password": password
             }
-            login_response = self.session.post(
-                self._get_url("/api/login"),
-                json=login_payload,
-                timeout=15
-            )
+            with metrics.span('oj_request', endpoint='login'):
+                login_response = self.session.post(
+                    self._get_url("/api/login"),
+                    json=login_payload,
+                    timeout=15
+                )
             login_response.raise_for_status()
 
             login_data = login_response.json()
@@ -225,27 +251,43 @@ class OJClient:
             raise OJClientError(f"Failed to parse response or data during login: {e}")
     
     def submit_code(self, code: str, language: str, problem_id: int):
+        """
+        Raises:
+            OJServerError: 網路錯誤、HTTP 錯誤或回應不是 JSON，呼叫端可以換帳號重試。
+        """
         payload = {
             "code": code,
             "language": language,
             "problem_id": int(problem_id)
         }
-        response = self.session.post(
-            self._get_url("/api/submission"),
-            data=payload,
-            timeout=15
-        )
-        response.raise_for_status()
-        return response.json()
+        try:
+            with metrics.span('oj_request', endpoint='submit'):
+                response = self.session.post(
+                    self._get_url("/api/submission"),
+                    data=payload,
+                    timeout=15
+                )
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise OJServerError(f"Network error during submission: {e}")
     
     def get_submission(self, submission_id: str):
+        """
+        Raises:
+            OJServerError: 網路錯誤、HTTP 錯誤或回應不是 JSON。
+        """
         params = {
             "id": submission_id
         }
-        response = self.session.get(
-            self._get_url("/api/submission"),
-            params=params,
-            timeout=15
-        )
-        response.raise_for_status()
-        return response.json()
+        try:
+            with metrics.span('oj_request', endpoint='get_submission'):
+                response = self.session.get(
+                    self._get_url("/api/submission"),
+                    params=params,
+                    timeout=15
+                )
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise OJServerError(f"Network error while fetching submission: {e}")
@@ -0,0 +1,119 @@
+import logging
+import threading
+from typing import Optional
+
+import redis
+from django.conf import settings
+from django.db import connection
+
+from .models import Task
+from . import utils
+
+logger = logging.getLogger(__name__)
+
+
+class TaskSignal:
+    """由 API 送給執行中任務的控制訊號"""
+    PAUSE = 'PAUSE'
+    CANCEL = 'CANCEL'
+
+
+def control_key(task_id) -> str:
+    """保存任務控制訊號的 Redis key，同時也是 pub/sub 的頻道名稱"""
+    return f"task-control:{task_id}"
+
+
+def send_task_signal(task_id, signal: str) -> None:
+    """
+    送出控制訊號。訊號會寫入 key（給之後才開始的 worker 讀取），
+    並同時推播（讓執行中的 worker 立即收到）。
+    """
+    try:
+        client = utils.get_redis_client()
+        client.set(control_key(task_id), signal, ex=settings.TASK_CONTROL_SIGNAL_TTL)
+        client.publish(control_key(task_id), signal)
+    except redis.RedisError as e:
+        # worker 會退回以資料庫輪詢的方式察覺狀態變更
+        logger.warning(f"Failed to send {signal} signal to task {task_id}: {e}")
+
+
+def clear_task_signal(task_id) -> None:
+    """清除控制訊號，在任務恢復執行前呼叫"""
+    try:
+        utils.get_redis_client().delete(control_key(task_id))
+    except redis.RedisError as e:
+        logger.warning(f"Failed to clear control signal of task {task_id}: {e}")
+
+
+class TaskControlListener:
+    """
+    在背景執行緒中接收任務的控制訊號，並保存在記憶體中。
+    熱路徑上的 should_stop() 只讀取記憶體，不會存取資料庫或 Redis。
+    若 Redis 無法使用，背景執行緒會改為定期讀取資料庫中的任務狀態。
+    """
+
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self.signal: Optional[str] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._listen, name=f"task-control-{self.task_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=settings.TASK_CONTROL_FALLBACK_INTERVAL + 1)
+
+    @property
+    def pause_requested(self) -> bool:
+        return self.signal == TaskSignal.PAUSE
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self.signal == TaskSignal.CANCEL
+
+    def should_stop(self) -> bool:
+        return self.signal is not None
+
+    def _set_signal(self, signal: Optional[str]) -> None:
+        # 取消的優先權高於暫停，收到後不再被覆蓋
+        if signal in (TaskSignal.PAUSE, TaskSignal.CANCEL) and self.signal != TaskSignal.CANCEL:
+            if signal != self.signal:
+                logger.info(f"Task {self.task_id} received {signal} signal.")
+            self.signal = signal
+
+    def _listen(self) -> None:
+        try:
+            self._listen_redis()
+        except redis.RedisError as e:
+            logger.warning(f"Control channel of task {self.task_id} unavailable ({e}), falling back to database polling.")
+            self._poll_database()
+        finally:
+            # 這個執行緒可能開啟過自己的資料庫連線
+            connection.close()
+
+    def _listen_redis(self) -> None:
+        client = utils.get_redis_client()
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        try:
+            # 先訂閱再讀取 key，確保不會漏掉兩者之間送出的訊號
+            pubsub.subscribe(control_key(self.task_id))
+            self._set_signal(client.get(control_key(self.task_id)))
+            while not self._stop_event.is_set():
+                message = pubsub.get_message(timeout=1.0)
+                if message:
+                    self._set_signal(message['data'])
+        finally:
+            pubsub.close()
+
+    def _poll_database(self) -> None:
+        status_to_signal = {
+            Task.Status.PAUSED: TaskSignal.PAUSE,
+            Task.Status.CANCELLED: TaskSignal.CANCEL,
+        }
+        while not self._stop_event.wait(settings.TASK_CONTROL_FALLBACK_INTERVAL):
+            status = Task.objects.filter(id=self.task_id).values_list('status', flat=True).first()
+            self._set_signal(status_to_signal.get(status))
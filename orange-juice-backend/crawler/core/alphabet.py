@@ -0,0 +1,73 @@
+"""
+學習題目測資實際使用的字元集合，並依校正探測量到的雜訊選擇 get_next_symbols 的編碼：
+通道乾淨時一次探測傳遞多個字元，雜訊大時拉開相鄰數值的間距，避免四捨五入解錯。
+"""
+import math
+from typing import Iterable, Optional
+
+from .channel import NOISE_MARGIN, calibrated_noise, noise_upper_bound
+from .crawler_core import CrawlerCore, SymbolCode
+
+# 學習字元集合的樣板：回傳所有測資中小於 limit 的最大字元，沒有時回傳 -1
+ALPHABET_TEMPLATE = 'get_max_char_below'
+# 字元集合超過此數量時編碼的效益不大，不使用 get_next_symbols
+MAX_ALPHABET_SIZE = 64
+
+
+def alphabet_of(test_cases: Iterable[str]) -> bytes:
+    """測資使用的字元集合（由小到大），包含代表結尾的 0"""
+    chars = {0}
+    for test_case in test_cases:
+        chars.update(test_case.encode('latin-1'))
+    return bytes(sorted(chars))
+
+
+def learn_alphabet(crawler_core: CrawlerCore, submitter) -> bytes:
+    """由大到小逐一探測出所有測資使用的字元，每個字元一次探測，最後一次探測確認沒有更小的字元"""
+    chars = {0}
+    limit = 256
+    while limit > 1:
+        char = crawler_core._m2n(submitter.get_max_char_below(limit))
+        if not 0 < char < limit:
+            break
+        chars.add(char)
+        limit = char
+    return bytes(sorted(chars))
+
+
+def choose_symbol_code(alphabet: bytes, noise: float = 0.0, levels: int = 256) -> Optional[SymbolCode]:
+    """
+    相鄰數值的間距至少為 2 * NOISE_MARGIN * noise，在 levels 個數值中放入最多的符號，剩下的範圍用來拉開間距。
+    字元集合太大或連一個符號都放不下時回傳 None，改以 get_next_char 讀取。
+    """
+    size = len(alphabet) + 1
+    min_spacing = max(math.ceil(2 * NOISE_MARGIN * noise), 1)
+    if len(alphabet) > MAX_ALPHABET_SIZE or size * min_spacing > levels:
+        return None
+    count = 1
+    while size ** (count + 1) * min_spacing <= levels:
+        count += 1
+    return SymbolCode(alphabet=alphabet, count=count, spacing=levels // size ** count)
+
+
+def prepare_symbol_code(crawler_core: CrawlerCore, submitter, known_test_cases: Optional[Iterable[str]] = None, measured_noise: Optional[float] = None) -> Optional[SymbolCode]:
+    """
+    校正後決定 crawler_core 使用的 SymbolCode。
+    known_test_cases（例如題目已儲存的測資）不為空時直接取其字元集合，不需要探測；
+    集合之外的字元仍會以跳脫符號正確讀出，只是較慢。
+    校正只有幾個點，雜訊取校正殘差的信賴上界與 measured_noise（例如 CrawlerSourceBenchmark 的量測結果）中較大者。
+    """
+    if crawler_core.symbol_code is not None:
+        return crawler_core.symbol_code
+    noise = calibrated_noise(crawler_core)
+    if noise is None:
+        return None
+    # 有檢查探測時讀數已經更正，不需要再拉開間距
+    if crawler_core.check_code is not None:
+        noise = 0
+    else:
+        noise = max(noise_upper_bound(noise, len(crawler_core.linear_regression.points) - 2), measured_noise or 0)
+    known_test_cases = list(known_test_cases or [])
+    alphabet = alphabet_of(known_test_cases) if known_test_cases else learn_alphabet(crawler_core, submitter)
+    crawler_core.symbol_code = choose_symbol_code(alphabet, noise)
+    return crawler_core.symbol_code
@@ -0,0 +1,152 @@
+import math
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from .crawler_core import CALIBRATION_NUMBERS, CHECK_LEVELS, CheckCode, CrawlerCore, Submitter
+from .linear_regression import LinearRegression
+
+# 一次爬取有數千次探測，讀數誤差在雜訊標準差（的信賴上界）的這麼多倍之內都要能正確四捨五入；
+# 符號間距、檢查探測的視窗與逐筆測資的讀數都以此為準
+NOISE_MARGIN = 4
+# 每次讀取最多的檢查探測數；雜訊大到需要更多次才能收斂時不使用檢查探測
+MAX_CHECK_PROBES = 4
+
+
+def usable_radix(noise: float, margin: float = NOISE_MARGIN) -> int:
+    """
+    同樣的記憶體範圍內，在雜訊下仍能以四捨五入區分的符號數；noise 應為雜訊的信賴上界（見 noise_upper_bound）。
+    符號數為 r 時相鄰符號相隔 256 / r，需要 128 / r >= margin * noise。
+    連兩個符號都無法區分時回傳 1（無法傳遞資訊）。
+    """
+    if noise <= 0:
+        return 256
+    radix = min(256, math.floor(128 / (margin * noise)))
+    return radix if radix >= 2 else 1
+
+
+def calibration_noise(regression: LinearRegression) -> Optional[float]:
+    """校正探測相對於線性模型的殘差標準差（以數值為單位）；點數不足以估計時回傳 None"""
+    if len(regression.points) < 3:
+        return None
+    residuals = [regression.predict(memory_use) - number for memory_use, number in regression.points]
+    return math.sqrt(sum(residual ** 2 for residual in residuals) / (len(regression.points) - 2))
+
+
+def noise_upper_bound(noise: float, degrees_of_freedom: int) -> float:
+    """
+    殘差標準差的單側 95% 信賴上界。校正只有幾個點，估計的標準差常常只有實際值的一半，
+    以 Wilson–Hilferty 近似卡方分布的下 5% 分位數 q，上界為 noise * sqrt(k / q)。
+    """
+    k = degrees_of_freedom
+    if k <= 0:
+        return math.inf
+    quantile = k * max(1 - 2 / (9 * k) - 1.645 * math.sqrt(2 / (9 * k)), 0.1) ** 3
+    return noise * math.sqrt(k / quantile)
+
+
+def calibrated_noise(crawler_core: CrawlerCore) -> Optional[float]:
+    """
+    尚未校正時先校正，並讓 run() 直接開始尋找字元，回傳校正的殘差標準差。
+    從保存的狀態恢復時沒有校正點可以估計雜訊，回傳 None。
+    """
+    if not crawler_core.linear_regression:
+        crawler_core._run_predict()
+    if crawler_core.current_internal_state == "NEEDS_PREDICT":
+        crawler_core.current_internal_state = "FINDING_NEXT_CHAR"
+    return calibration_noise(crawler_core.linear_regression)
+
+
+def choose_check_code(noise: float, margin: float = NOISE_MARGIN) -> Optional[CheckCode]:
+    """
+    讀數誤差以 margin * noise 為上限：第一次檢查的視窗涵蓋這個範圍，視窗內的間距使下一次的誤差縮小為
+    margin * noise / spacing，直到誤差小於 0.5（四捨五入不會出錯）。
+    不需要檢查時回傳沒有視窗的 CheckCode，視窗無法逐次縮小或超過 MAX_CHECK_PROBES 時回傳 None。
+    """
+    radii: List[int] = []
+    error = margin * noise
+    while error >= 0.5:
+        radius = math.ceil(error)
+        spacing = CHECK_LEVELS // (2 * radius + 2)
+        if len(radii) == MAX_CHECK_PROBES or spacing < 2 or (radii and radius >= radii[-1]):
+            return None
+        radii.append(radius)
+        error = margin * noise / spacing
+    return CheckCode(tuple(radii))
+
+
+def prepare_check_code(crawler_core: CrawlerCore, measured_noise: Optional[float] = None) -> Optional[CheckCode]:
+    """
+    校正後依雜訊決定 crawler_core 的 CheckCode，雜訊取校正殘差的信賴上界與 measured_noise 中較大者。
+    通道乾淨到不需要檢查，或雜訊大到檢查也無法收斂時，不使用檢查探測並回傳 None。
+    """
+    if crawler_core.check_code is not None:
+        return crawler_core.check_code
+    noise = calibrated_noise(crawler_core)
+    if noise is None:
+        return None
+    noise = noise_upper_bound(noise, len(crawler_core.linear_regression.points) - 2)
+    code = choose_check_code(max(noise, measured_noise or 0))
+    crawler_core.check_code = code if code is not None and code.radii else None
+    return crawler_core.check_code
+
+
+@dataclass
+class ChannelMeasurement:
+    """
+    以記憶體用量傳遞數值的通道品質：判題時間、雜訊與可用的進位數。
+    noise 是重複的校正探測相對於線性模型的殘差標準差，以數值（0–255）為單位。
+    """
+    latency: float
+    noise: float
+    probes: int
+
+    @property
+    def noise_bound(self) -> float:
+        """noise 的信賴上界，校正點越少越寬；比較與使用雜訊時以此為準"""
+        return noise_upper_bound(self.noise, self.probes - 2)
+
+    @property
+    def usable_radix(self) -> int:
+        return usable_radix(self.noise_bound)
+
+    @property
+    def bits_per_probe(self) -> float:
+        return math.log2(self.usable_radix)
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bits_per_probe / 8 / self.latency if self.latency > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            'latency': round(self.latency, 3),
+            'noise': round(self.noise, 3),
+            'usable_radix': self.usable_radix,
+            'bytes_per_second': round(self.bytes_per_second, 4),
+            'probes': self.probes,
+        }
+
+
+def measure_channel(submitter: Submitter, rounds: int = 2, clock: Callable[[], float] = time.monotonic) -> ChannelMeasurement:
+    """
+    重複 rounds 次 CrawlerCore 的校正探測，量測每次探測的時間與線性模型的殘差。
+    """
+    points: List[Tuple[int, int]] = []
+    latencies = []
+    for _ in range(rounds):
+        for number in CALIBRATION_NUMBERS:
+            started = clock()
+            points.append((submitter.get_number(number), number))
+            latencies.append(clock() - started)
+
+    regression = LinearRegression()
+    regression.add_points(points)
+    try:
+        regression.calculate_regression()
+    except ValueError:
+        # 記憶體用量不隨數值變化，這個樣板無法傳遞任何資訊
+        return ChannelMeasurement(latency=statistics.median(latencies), noise=math.inf, probes=len(points))
+    noise = calibration_noise(regression)
+    return ChannelMeasurement(latency=statistics.median(latencies), noise=noise if noise is not None else math.inf, probes=len(points))
@@ -0,0 +1,218 @@
+import math
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from .crawler_core import CALIBRATION_NUMBERS, PAIR_CONTEXT, PAIR_SYMBOLS, SymbolCode, pair_symbol
+
+# _run_predict 的校正探測數
+CALIBRATION_PROBES = len(CALIBRATION_NUMBERS)
+
+
+def _digit_count(number: int) -> int:
+    """number 以 256 進位表示的位數（0 的位數為 0），即 get_prefix_length 的探測次數"""
+    count = 0
+    while number > 0:
+        number >>= 8
+        count += 1
+    return count
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    length = 0
+    while length < min(len(a), len(b)) and a[length] == b[length]:
+        length += 1
+    return length
+
+
+def _symbol_probes(test_case: str, start: int, code: SymbolCode, branch_radix: int) -> int:
+    """
+    以 get_next_symbols 從 start 讀到結尾的探測次數。每次探測讀取 code.count 個字元，
+    遇到字元集合之外的字元時多一次 get_next_char；結尾由探測直接讀出，使用合併探測時再一次取得分岔點。
+    字元集合涵蓋所有測資的字元時與實際相同。
+    """
+    data = test_case.encode('latin-1') + b'\0'
+    probes = 0
+    position = start
+    while True:
+        probes += 1
+        for _ in range(code.count):
+            char = data[position]
+            if code.symbol_of(char) == code.escape:
+                probes += 1
+                position += 1
+                break
+            if position == len(test_case):
+                return probes + (1 if branch_radix else 0)
+            position += 1
+
+
+def _char_probes(test_case: str, start: int, char_pairs: bool) -> int:
+    """
+    從 start 讀到 test_case 結尾（含結尾探測）的探測次數。
+    字典序由大到小走訪時，目前的測資就是所有候選中最大的一筆，每次探測的結果都由它決定。
+    """
+    if not char_pairs:
+        return len(test_case) - start + 1
+    data = test_case.encode('latin-1') + b'\0'
+    probes = 0
+    position = start
+    while True:
+        if position == 0 or data[position - 1] in PAIR_CONTEXT:
+            probes += 1
+            exact = 0
+            for char in data[position:position + 2]:
+                low, high = PAIR_SYMBOLS[pair_symbol(char)]
+                if low != high:
+                    break
+                exact += 1
+            position += exact
+            if exact == 2:
+                continue
+        probes += 1
+        if position == len(test_case):
+            return probes
+        position += 1
+
+
+def _calibration_probes(branch_radix: int) -> int:
+    # 使用合併探測時多校正一個最大值
+    return CALIBRATION_PROBES + (1 if branch_radix else 0)
+
+
+def probes_for_test_cases(test_cases: Iterable[str], calibrated: bool = False, branch_radix: int = 0, char_pairs: bool = False, symbol_code: Optional[SymbolCode] = None, checks: int = 0) -> int:
+    """
+    CrawlerCore 爬取這些測資所需的確切探測次數。
+
+    CrawlerCore 以字典序由大到小走訪：每筆測資從與上一筆的分岔點開始，
+    每個字元一次 get_next_char，再加一次回傳 0 的結尾探測；找到測資後一次 get_prefix_length_length，
+    分岔點長度的每個 256 進位位數各一次 get_prefix_length。
+    branch_radix 大於 0 時結尾探測直接回傳分岔點，只有分岔點不小於 branch_radix - 1 時才需要後兩種探測。
+    char_pairs 為 True 時，數字、空白與換行之後以一次 get_next_char_pair 讀取兩個字元；
+    指定 symbol_code 時改以 get_next_symbols 讀取（不含學習字元集合的探測）。
+    checks 是每次讀取之後的檢查探測數（CheckCode 的視窗數，不計讀數誤差超出視窗時的移動）。
+    """
+    calibration = 0 if calibrated else _calibration_probes(branch_radix)
+    probes = 0
+    previous: Optional[str] = None
+    for test_case in sorted(set(test_cases), reverse=True):
+        common = _common_prefix_length(previous, test_case) if previous is not None else 0
+        if symbol_code is not None:
+            probes += _symbol_probes(test_case, common, symbol_code, branch_radix)
+        else:
+            probes += _char_probes(test_case, common, char_pairs)
+        if not branch_radix:
+            if previous is not None:
+                probes += _digit_count(common)
+            # 找到測資後的 get_prefix_length_length（最後一筆回傳 -1）
+            probes += 1
+        elif previous is not None and common >= branch_radix - 1:
+            # 上一筆測資結尾時改用 get_prefix_length_length 與 get_prefix_length
+            probes += 1 + _digit_count(common)
+        previous = test_case
+    return calibration + probes * (1 + checks)
+
+
+def probes_for_shape(test_cases: int, average_length: float, shared_prefix: int = 0, calibrated: bool = False, branch_radix: int = 0, checks: int = 0) -> int:
+    """
+    只知道測資數量與平均長度時的估計。
+    shared_prefix 是相鄰測資平均的共同前綴長度，例如都以相同的測資數量行開頭。
+    """
+    calibration = 0 if calibrated else _calibration_probes(branch_radix)
+    if test_cases <= 0:
+        return calibration + 1 + checks
+    shared_prefix = min(shared_prefix, int(average_length))
+    probes = test_cases * (math.ceil(average_length) - shared_prefix + 1) + shared_prefix
+    if not branch_radix:
+        probes += test_cases + (test_cases - 1) * _digit_count(shared_prefix)
+    elif shared_prefix >= branch_radix - 1:
+        probes += (test_cases - 1) * (1 + _digit_count(shared_prefix))
+    return calibration + probes * (1 + checks)
+
+
+def probes_for_per_case(test_cases: Iterable[str], calibrated: bool = False) -> int:
+    """
+    PerCaseCrawler 的探測次數：所有測資同步前進，每個位置一次 get_char_at，
+    最長的測資再加一次回傳結尾的探測。
+    """
+    return probes_for_longest_case(max((len(test_case) for test_case in test_cases), default=0), calibrated)
+
+
+def probes_for_longest_case(longest: int, calibrated: bool = False) -> int:
+    """只知道最長測資的長度時 PerCaseCrawler 的探測次數，與 probes_for_per_case 相同"""
+    return (0 if calibrated else CALIBRATION_PROBES) + longest + 1
+
+
+@dataclass
+class CrawlEstimate:
+    probes: int
+    test_cases: int
+    total_bytes: int
+    # 單次探測從提交到取得結果的平均時間（秒）
+    judge_latency: float
+    # 同時進行的探測數；CrawlerCore 的探測彼此相依，目前為 1
+    concurrency: int = 1
+    # 'stored'（以已儲存的測資模擬走訪）、'stored_summary'（只以已儲存測資的數量與長度計算）、'size_probe' 或 'default'
+    source: str = 'default'
+
+    @property
+    def eta_seconds(self) -> float:
+        return self.probes * self.judge_latency / max(self.concurrency, 1)
+
+    def as_dict(self) -> dict:
+        return {
+            'probes': self.probes,
+            'test_cases': self.test_cases,
+            'total_bytes': self.total_bytes,
+            'judge_latency': round(self.judge_latency, 3),
+            'concurrency': self.concurrency,
+            'eta_seconds': round(self.eta_seconds, 1),
+            'source': self.source,
+        }
+
+
+class CrawlProgressEstimator:
+    """
+    以預估的總探測數與實際的判題時間計算爬取進度與剩餘時間。
+    實際的探測數超過預估時，以目前每筆測資的平均探測數推估剩下的量。
+    """
+    # 判題時間的指數移動平均權重
+    latency_smoothing = 0.1
+
+    def __init__(self, estimate: CrawlEstimate, probes_done: int = 0):
+        self.estimate = estimate
+        self.probes_done = probes_done
+        self.testcases_found = 0
+        self.judge_latency = estimate.judge_latency
+
+    def submission_done(self, turnaround: Optional[float] = None) -> None:
+        self.probes_done += 1
+        if turnaround is not None:
+            self.judge_latency += self.latency_smoothing * (turnaround - self.judge_latency)
+
+    def testcase_found(self) -> None:
+        self.testcases_found += 1
+
+    @property
+    def total_probes(self) -> int:
+        if self.probes_done < self.estimate.probes:
+            return self.estimate.probes
+        # 超出預估：至少還需要一筆測資的探測量
+        per_case = self.probes_done / max(self.testcases_found, 1)
+        return self.probes_done + max(math.ceil(per_case), 1)
+
+    @property
+    def fraction(self) -> float:
+        return min(self.probes_done / max(self.total_probes, 1), 0.99)
+
+    @property
+    def eta_seconds(self) -> float:
+        remaining = self.total_probes - self.probes_done
+        return remaining * self.judge_latency / max(self.estimate.concurrency, 1)
+
+    def snapshot(self) -> dict:
+        return {
+            'estimated_probes': self.total_probes,
+            'progress_fraction': round(self.fraction, 4),
+            'eta_seconds': round(self.eta_seconds, 1),
+            'judge_latency': round(self.judge_latency, 3),
+        }
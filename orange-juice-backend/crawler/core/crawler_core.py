@@ -1,12 +1,177 @@
-from typing import Protocol, runtime_checkable, List, Optional
-from dataclasses import dataclass, field
+from typing import Callable, Dict, Protocol, runtime_checkable, List, Optional, Sequence, Tuple, Union
+from dataclasses import dataclass, field, replace
 
 from .linear_regression import LinearRegression
+from .prefix_hash import HashedPrefix
+
+# 傳給 Submitter 的前綴：CrawlerCore 傳入唯讀的 memoryview（只在呼叫期間有效，不可保留），
+# 其他呼叫者可能傳入 str，其中每個字元代表一個位元組（latin-1）
+Prefix = Union[str, bytes, memoryview]
+
+
+def prefix_bytes(prefix: Prefix) -> bytes:
+    """將前綴轉為位元組，str 的每個字元對應一個位元組"""
+    return prefix.encode('latin-1') if isinstance(prefix, str) else bytes(prefix)
+
+
+def prefix_text(prefix: Prefix) -> str:
+    """將前綴轉為每個字元對應一個位元組的 str，與測資內容的保存方式相同"""
+    return prefix if isinstance(prefix, str) else bytes(prefix).decode('latin-1')
+
+
+# _run_predict 的校正數值
+CALIBRATION_NUMBERS = tuple(range(-1, 256, 64))
+# 讀到的字元超出合法範圍（雜訊造成的誤讀）時，最多送出這麼多次同一個探測
+CHAR_READ_ATTEMPTS = 3
+
+
+class DecodeError(Exception):
+    """探測的讀數重送後仍無法換算成合法的字元，通常是雜訊過大；前綴沒有改變，可以保存狀態後恢復"""
+
+
+# CrawlerSource 有此樣板時，測資結尾的探測同時回傳下一筆測資的分岔點
+BRANCH_TEMPLATE = 'get_next_char_or_branch'
+
+# CrawlerSource 有此樣板時，在數字與空白之間一次讀取兩個字元
+PAIR_TEMPLATE = 'get_next_char_pair'
+# get_next_char_pair 的符號：依字元大小排列、互不重疊的區間，結尾與 get_next_char 相同視為 0。
+# 數字、空白與負號各是一個只有單一字元的符號，其他字元只知道所在的區間（換行與結尾同屬 0–31），兩個符號共 16 * 16 種結果
+PAIR_SYMBOLS = ((0, 31), (32, 32), (33, 44), (45, 45), (46, 47)) + tuple((char, char) for char in range(48, 58)) + ((58, 255),)
+# 前綴以這些字元結尾（或為空）時，下一段通常是數字，使用 get_next_char_pair
+PAIR_CONTEXT = frozenset(b'0123456789 -\n')
+
+
+def pair_symbol(char: int) -> int:
+    """字元（結尾為 0）在 PAIR_SYMBOLS 中的符號"""
+    for symbol, (low, high) in enumerate(PAIR_SYMBOLS):
+        if low <= char <= high:
+            return symbol
+    raise ValueError(f"Not a byte: {char}")
+
+
+# CrawlerSource 有此樣板時，以題目測資實際使用的字元集合編碼，見 alphabet.prepare_symbol_code
+SYMBOLS_TEMPLATE = 'get_next_symbols'
+
+
+@dataclass(frozen=True)
+class SymbolCode:
+    """
+    get_next_symbols 的編碼。每個符號是 alphabet 中的一個字元（由小到大，0 代表結尾），
+    或比它們都大的跳脫符號，代表字元不在 alphabet 中、需要以 get_next_char 讀取。
+    一次探測傳遞 count 個符號，相鄰的數值相隔 spacing，讓四捨五入能容忍雜訊。
+    """
+    alphabet: bytes
+    count: int
+    spacing: int
+
+    @property
+    def size(self) -> int:
+        return len(self.alphabet) + 1
+
+    @property
+    def escape(self) -> int:
+        return len(self.alphabet)
+
+    def symbol_of(self, char: int) -> int:
+        index = self.alphabet.find(bytes([char]))
+        return self.escape if index < 0 else index
+
+    def encode(self, chars: Sequence[int]) -> int:
+        """探測程式回傳的數值；chars 不足 count 個時其餘視為結尾"""
+        value = 0
+        for i in range(self.count):
+            value = value * self.size + (self.symbol_of(chars[i]) if i < len(chars) else 0)
+        return value * self.spacing
+
+    def decode(self, value: float) -> Optional[List[Optional[int]]]:
+        """解出 count 個字元，跳脫符號為 None；數值超出範圍時回傳 None"""
+        number = round(value / self.spacing)
+        if not 0 <= number < self.size ** self.count:
+            return None
+        symbols = []
+        for _ in range(self.count):
+            number, symbol = divmod(number, self.size)
+            symbols.append(symbol)
+        return [None if symbol == self.escape else self.alphabet[symbol] for symbol in reversed(symbols)]
+
+    def params(self) -> dict:
+        """填入樣板的參數"""
+        return {'alphabet': list(self.alphabet), 'symbol_count': self.count, 'symbol_spacing': self.spacing}
+
+
+# 檢查探測填入樣板的參數；一般的探測填入 0，check_count 為 0 時樣板應回傳原本的數值
+CHECK_PARAMS = ('check_low', 'check_count', 'check_spacing')
+# CrawlerCore 會送出檢查探測的樣板，全部支援 {check_count} 時才能使用 CheckCode
+CHECKED_TEMPLATES = ('get_next_char', 'get_prefix_length_length', 'get_prefix_length', BRANCH_TEMPLATE, PAIR_TEMPLATE, SYMBOLS_TEMPLATE)
+# 檢查探測使用的數值範圍，與校正的範圍相同
+CHECK_LEVELS = 255
+# 第一次讀數的誤差超出視窗時，最多再移動視窗幾次
+MAX_CHECK_SHIFTS = 2
+
+
+def supports_check_probes(codes: Dict[str, str]) -> bool:
+    """CrawlerSource 中 CrawlerCore 會用到的樣板都能回傳檢查探測的結果"""
+    used = [key for key in CHECKED_TEMPLATES if key in codes]
+    return 'get_next_char' in codes and all('{check_count}' in codes[key] for key in used)
+
+
+@dataclass(frozen=True)
+class CheckWindow:
+    """
+    檢查探測的視窗：數值 low 到 low + count - 1 依序回傳 spacing 的 1 到 count 倍，
+    小於視窗的數值回傳 0，大於視窗的數值回傳 (count + 1) * spacing。
+    轉換保持大小順序，所有測資取最大值之後仍是最大數值的轉換結果。
+    """
+    low: int
+    count: int
+    spacing: int
+
+    def value(self, number: int) -> int:
+        """探測程式對原本的數值 number 應回傳的數值"""
+        return (min(max(number - self.low, -1), self.count) + 1) * self.spacing
+
+    def position(self, value: float) -> int:
+        """讀數在視窗中的位置；-1 表示在視窗下方，count 表示在上方"""
+        return min(max(round(value / self.spacing) - 1, -1), self.count)
+
+    def params(self) -> dict:
+        return dict(zip(CHECK_PARAMS, (self.low, self.count, self.spacing)))
+
+
+@dataclass(frozen=True)
+class CheckCode:
+    """
+    每次讀取之後依序送出的檢查探測，radii 是每次檢查的視窗半徑（逐次縮小）。
+    judge 回傳所有測資中的最大值，同位元或 Reed–Solomon 之類不保持大小順序的檢查碼在取最大值後不成立，
+    因此檢查探測以 CheckWindow 放大上一次讀數附近的範圍，重新讀取同一個數值。
+    """
+    radii: Tuple[int, ...]
+
+    def window(self, stage: int, center: int) -> CheckWindow:
+        radius = self.radii[stage]
+        count = 2 * radius + 1
+        return CheckWindow(low=center - radius, count=count, spacing=CHECK_LEVELS // (count + 1))
+
+    def correct(self, value: float, check: Callable[[CheckWindow], float]) -> int:
+        """以 check（送出一次檢查探測並回傳讀數）更正第一次的讀數 value"""
+        number = round(value)
+        for stage in range(len(self.radii)):
+            window = self.window(stage, number)
+            for _ in range(MAX_CHECK_SHIFTS + 1):
+                position = window.position(check(window))
+                if 0 <= position < window.count:
+                    break
+                # 上一次讀數的誤差超出視窗，往檢查結果指出的方向移動一整個視窗
+                window = replace(window, low=window.low + (window.count if position >= window.count else -window.count))
+            number = window.low + min(max(position, 0), window.count - 1)
+        return number
+
 
 @dataclass
 class CrawlerState:
     """保存 CrawlerCore 的執行狀態，以便中斷後可以恢復。"""
     state: str = "NEEDS_PREDICT"
+    # 以 latin-1 保存，每個字元對應前綴的一個位元組
     prefix: str = ""
     limit: int = 256
     prefix_length_length: int = 0
@@ -15,55 +180,119 @@ class CrawlerState:
     # 保存 LinearRegression 的狀態
     lr_slope: Optional[float] = None
     lr_intercept: Optional[float] = None
+    # 分片爬取時的下界：只爬取以 shard_prefix 開頭、且下一個字元不小於 shard_lower 的測資
+    shard_prefix: Optional[str] = None
+    shard_lower: int = 0
+    # 使用 get_next_symbols 時的 SymbolCode，alphabet 以 latin-1 保存
+    symbol_alphabet: Optional[str] = None
+    symbol_count: int = 0
+    symbol_spacing: int = 0
+    # 使用檢查探測時 CheckCode 的視窗半徑
+    check_radii: List[int] = field(default_factory=list)
 
 @runtime_checkable
 class Submitter(Protocol):
     """
     定義了一個「程式碼提交者」的行為介面。
     任何實現了這個介面的類，都可以被 CrawlerCore 使用。
+    CrawlerCore 使用 CheckCode 時，會在檢查探測期間將 submitter.check_window 設為 CheckWindow，
+    探測應以 CheckWindow.params() 填入樣板，並回傳 CheckWindow.value 轉換後的數值。
+    重送讀數超出範圍的探測時會將 submitter.skip_cache 設為 True，有快取的提交者應重新提交而不是回傳相同的讀數。
     """
 
     def found_testcase(self, testcase: str) -> None:
         ...
     
-    def get_next_char(self, prefix: str, limit: int) -> int:
+    def get_next_char(self, prefix: Prefix, limit: int) -> int:
         ...
     
-    def get_prefix_length_length(self, prefix: str) -> int:
+    def get_prefix_length_length(self, prefix: Prefix) -> int:
         ...
 
-    def get_prefix_length(self, prefix: str, length_prefix: int, position: int) -> int:
+    def get_prefix_length(self, prefix: Prefix, length_prefix: int, position: int) -> int:
         ...
 
     def get_number(self, number: int) -> int:
         ...
 
+    def get_next_char_or_branch(self, prefix: Prefix, limit: int, branch_radix: int) -> int:
+        """
+        選用（branch_radix > 0 時才會呼叫）。以 prefix 開頭且下一個字元小於 limit 的測資回傳 branch_radix + 字元；
+        字典序比 prefix 小的測資回傳與 prefix 的共同前綴長度，超過 branch_radix - 1 時回傳 branch_radix - 1；
+        其他測資回傳 -1。
+        """
+        ...
+
+    def get_next_char_pair(self, prefix: Prefix, limit: int) -> int:
+        """
+        選用（char_pairs 為 True 時才會呼叫）。以 prefix 開頭且下一個字元小於 limit 的測資，
+        回傳接下來兩個字元（結尾為 0）的 pair_symbol，以 16 * 第一個 + 第二個 表示；其他測資回傳 -1。
+        """
+        ...
+
+    def get_next_symbols(self, prefix: Prefix, limit: int, code: SymbolCode) -> int:
+        """
+        選用（symbol_code 有值時才會呼叫）。以 prefix 開頭且下一個字元小於 limit 的測資，
+        回傳接下來 code.count 個字元的 code.encode；其他測資回傳 -1。
+        """
+        ...
+
 class CrawlerCore:
-    def __init__(self, submitter: Submitter, should_pause: callable = lambda: False):
+    def __init__(self, submitter: Submitter, should_pause: callable = lambda: False, on_state_change: callable = lambda state: None, branch_radix: int = 0, char_pairs: bool = False):
         self.submitter = submitter
+        # 大於 0 時使用 get_next_char_or_branch：結尾探測的結果小於 branch_radix，就是下一筆測資的分岔點，
+        # 省下 get_prefix_length_length 與 get_prefix_length；回傳值最大為 branch_radix + 255
+        self.branch_radix = branch_radix
+        # 為 True 時，前綴以數字、空白或換行結尾時改用 get_next_char_pair，一次讀取兩個字元
+        self.char_pairs = char_pairs
         self.linear_regression: Optional[LinearRegression] = None
         self.should_pause = should_pause
+        # 每次內部狀態轉換時呼叫，用於回報進度
+        self.on_state_change = on_state_change
         # 初始化內部狀態
         self._set_initial_state()
 
+    @property
+    def current_internal_state(self) -> str:
+        return self._current_internal_state
+
+    @current_internal_state.setter
+    def current_internal_state(self, state: str):
+        self._current_internal_state = state
+        self.on_state_change(state)
+
     def _set_initial_state(self):
         """將內部狀態重設為初始值。"""
         self.current_internal_state = "NEEDS_PREDICT"
-        self.prefix = ""
+        # 目前的前綴；尾端新增為均攤 O(1)，回溯時就地截斷，不複製保留的部分。
+        # 同時記住每個長度的雜湊，Submitter 取得 {prefix_hash} 時不需要走過整個前綴
+        self._prefix = HashedPrefix()
         self.limit = 256
         self.prefix_length_length = 0
         self.prefix_length = 0
         self.position = 0
         self.linear_regression = None
+        self.shard_prefix: Optional[str] = None
+        self.shard_lower = 0
+        # 有值時以 get_next_symbols 一次讀取多個字元，優先於 char_pairs
+        self.symbol_code: Optional[SymbolCode] = None
+        # 有值時每次讀取後送出檢查探測，更正雜訊造成的誤讀，見 channel.prepare_check_code
+        self.check_code: Optional[CheckCode] = None
 
     def load_state(self, state: CrawlerState):
         """從 state 物件載入執行狀態。"""
         self.current_internal_state = state.state
-        self.prefix = state.prefix
+        self._prefix = HashedPrefix(prefix_bytes(state.prefix))
         self.limit = state.limit
         self.prefix_length_length = state.prefix_length_length
         self.prefix_length = state.prefix_length
         self.position = state.position
+        self.shard_prefix = state.shard_prefix
+        self.shard_lower = state.shard_lower
+        self.symbol_code = None
+        if state.symbol_alphabet is not None:
+            self.symbol_code = SymbolCode(prefix_bytes(state.symbol_alphabet), state.symbol_count, state.symbol_spacing)
+        self.check_code = CheckCode(tuple(state.check_radii)) if state.check_radii else None
         if state.lr_slope is not None and state.lr_intercept is not None:
             self.linear_regression = LinearRegression()
             self.linear_regression.slope = state.lr_slope
@@ -86,9 +315,19 @@ class CrawlerCore:
             prefix_length=self.prefix_length,
             position=self.position,
             lr_slope=lr_slope,
-            lr_intercept=lr_intercept
+            lr_intercept=lr_intercept,
+            shard_prefix=self.shard_prefix,
+            shard_lower=self.shard_lower,
+            symbol_alphabet=prefix_text(self.symbol_code.alphabet) if self.symbol_code else None,
+            symbol_count=self.symbol_code.count if self.symbol_code else 0,
+            symbol_spacing=self.symbol_code.spacing if self.symbol_code else 0,
+            check_radii=list(self.check_code.radii) if self.check_code else [],
         )
     
+    @property
+    def prefix(self) -> str:
+        return self._prefix.decode('latin-1')
+
     def run(self):
         """
         執行爬蟲主循環。
@@ -97,7 +336,7 @@ class CrawlerCore:
         try:
             if self.current_internal_state == "NEEDS_PREDICT":
                 self._run_predict()
-                self.prefix = ""
+                self._prefix.clear()
                 self.limit = 256
                 self.current_internal_state = "FINDING_NEXT_CHAR"
 
@@ -109,16 +348,39 @@ class CrawlerCore:
                     while True:
                         if self.should_pause():
                             return
-                        char = self._m2n(self.submitter.get_next_char(self.prefix, self.limit))
+                        if self._use_symbols():
+                            if self._next_symbols():
+                                continue
+                            if self.current_internal_state != "FINDING_NEXT_CHAR":
+                                break
+                        elif self._use_char_pair() and self._next_char_pair():
+                            continue
+                        if self.branch_radix:
+                            if self._next_char_or_branch():
+                                continue
+                            break
+                        at_shard_boundary = self.shard_prefix is not None and len(self._prefix) == len(self.shard_prefix)
+                        with memoryview(self._prefix) as prefix:
+                            # 只有在最上層（題目沒有測資）或分片的邊界，才可能沒有測資能接在前綴之後
+                            char = self._read_char(self.submitter.get_next_char, prefix, self.limit,
+                                                   low=-1 if at_shard_boundary or not self._prefix else 0, high=self.limit)
+                        if at_shard_boundary and char < self.shard_lower:
+                            # 已走出分片的範圍，之後的測資屬於其他分片
+                            self.current_internal_state = "DONE"
+                            break
+                        if char < 0:
+                            self.current_internal_state = "DONE"
+                            break
                         if char == 0:
                             self.submitter.found_testcase(self.prefix)
                             self.current_internal_state = "FINDING_PREFIX_LENGTH_LENGTH"
                             break
-                        self.prefix += chr(char)
+                        self._prefix.append(char)
                         self.limit = 256
                 
                 elif self.current_internal_state == "FINDING_PREFIX_LENGTH_LENGTH":
-                    self.prefix_length_length = self._m2n(self.submitter.get_prefix_length_length(self.prefix))
+                    with memoryview(self._prefix) as prefix:
+                        self.prefix_length_length = self._read_number(self.submitter.get_prefix_length_length, prefix)
                     if self.prefix_length_length == -1:
                         self.current_internal_state = "DONE"
                         continue
@@ -128,27 +390,193 @@ class CrawlerCore:
 
                 elif self.current_internal_state == "FINDING_PREFIX_LENGTH":
                     while self.position >= 0:
-                        number = self._m2n(self.submitter.get_prefix_length(self.prefix, self.prefix_length, self.position))
+                        with memoryview(self._prefix) as prefix:
+                            number = self._read_number(self.submitter.get_prefix_length, prefix, self.prefix_length, self.position)
                         self.prefix_length = self.prefix_length * 256 + number
                         self.position -= 1
-                    
-                    self.limit = ord(self.prefix[self.prefix_length])
-                    self.prefix = self.prefix[:self.prefix_length]
-                    self.current_internal_state = "FINDING_NEXT_CHAR"
+                    self._branch()
 
         except Exception as e:
             print(f"在狀態 '{self.current_internal_state}' 發生錯誤: {e}")
             print("執行已暫停。請保存狀態以便稍後恢復。")
             raise
     
+    def _outside_shard_boundary(self) -> bool:
+        """分片的下界只由單一字元的探測檢查"""
+        return self.shard_prefix is None or len(self._prefix) > len(self.shard_prefix)
+
+    def _use_symbols(self) -> bool:
+        return self.symbol_code is not None and self._outside_shard_boundary()
+
+    def _next_symbols(self) -> bool:
+        """
+        送出一次 get_next_symbols。回傳 True 表示讀到的字元都已加入前綴，應繼續讀取；
+        回傳 False 時，若仍在 FINDING_NEXT_CHAR，下一個字元需要以單一字元的探測讀取。
+        """
+        code = self.symbol_code
+        with memoryview(self._prefix) as prefix:
+            value = self._read(self.submitter.get_next_symbols, prefix, self.limit, code)
+        chars = code.decode(value)
+        if chars is None:
+            return False
+        for char in chars:
+            if char is None:
+                # 不在字元集合中，由 get_next_char 讀取實際的字元
+                return False
+            if char == 0:
+                if self.branch_radix:
+                    # 讓合併探測確認結尾並同時取得分岔點
+                    self.limit = 1
+                    return False
+                self.submitter.found_testcase(self.prefix)
+                self.current_internal_state = "FINDING_PREFIX_LENGTH_LENGTH"
+                return False
+            self._prefix.append(char)
+            self.limit = 256
+        return True
+
+    def _use_char_pair(self) -> bool:
+        if not self.char_pairs or not self._outside_shard_boundary():
+            return False
+        return not self._prefix or self._prefix[-1] in PAIR_CONTEXT
+
+    def _next_char_pair(self) -> bool:
+        """
+        送出一次 get_next_char_pair。回傳 True 表示前綴多了兩個字元；
+        回傳 False 時，下一個字元只知道所在的區間，已將 limit 縮小到區間內，由單一字元的探測讀取。
+        """
+        with memoryview(self._prefix) as prefix:
+            value = self._read_number(self.submitter.get_next_char_pair, prefix, self.limit)
+        if not 0 <= value < len(PAIR_SYMBOLS) ** 2:
+            return False
+        for symbol in divmod(value, len(PAIR_SYMBOLS)):
+            low, high = PAIR_SYMBOLS[symbol]
+            if low != high:
+                self.limit = min(self.limit, high + 1)
+                return False
+            self._prefix.append(low)
+            self.limit = 256
+        return True
+
+    def _next_char_or_branch(self) -> bool:
+        """
+        送出一次 get_next_char_or_branch 並處理結果。
+        回傳 True 表示前綴多了一個字元，應繼續尋找下一個字元；False 表示已離開 FINDING_NEXT_CHAR。
+        """
+        with memoryview(self._prefix) as prefix:
+            value = self._read_char(self.submitter.get_next_char_or_branch, prefix, self.limit, self.branch_radix,
+                                    high=self.branch_radix + self.limit)
+        if value >= self.branch_radix:
+            char = value - self.branch_radix
+            if self.shard_prefix is not None and len(self._prefix) == len(self.shard_prefix) and char < self.shard_lower:
+                self.current_internal_state = "DONE"
+                return False
+            self._prefix.append(char)
+            self.limit = 256
+            return True
+
+        # 沒有測資能再往下走：目前的前綴就是一筆測資
+        if self.shard_prefix is not None and len(self._prefix) == len(self.shard_prefix) and self.shard_lower > 0:
+            # 與 get_next_char 回傳 0 時相同：結尾（0）小於分片的下界，這筆測資屬於其他分片
+            self.current_internal_state = "DONE"
+            return False
+        self.submitter.found_testcase(self.prefix)
+        if value < 0:
+            self.current_internal_state = "DONE"
+        elif value == self.branch_radix - 1:
+            # 分岔點太深，無法以一次探測表示，改用原本的探測
+            self.current_internal_state = "FINDING_PREFIX_LENGTH_LENGTH"
+        else:
+            self.prefix_length = value
+            self._branch()
+        return False
+
+    def _branch(self):
+        """回溯到下一筆測資的分岔點 prefix_length，下一個字元必須小於原本在該位置的字元"""
+        if self.shard_prefix is not None and self.prefix_length < len(self.shard_prefix):
+            # 下一筆測資不以 shard_prefix 開頭
+            self.current_internal_state = "DONE"
+            return
+        if not 0 <= self.prefix_length < len(self._prefix):
+            # 分岔點必須在目前的前綴之內；恢復後重新讀取分岔點
+            self.current_internal_state = "FINDING_PREFIX_LENGTH_LENGTH"
+            raise DecodeError(f"Branch point {self.prefix_length} is outside the prefix of length {len(self._prefix)}, the channel is too noisy.")
+        self.limit = self._prefix[self.prefix_length]
+        del self._prefix[self.prefix_length:]
+        self.current_internal_state = "FINDING_NEXT_CHAR"
+
+    def crawl_tail(self, prefix: str) -> str:
+        """
+        從已知正確的 prefix 開始，只往下讀取單一測資直到結尾，回傳完整內容。
+        不會呼叫 found_testcase，也不會改變爬蟲的狀態機，用於修復已儲存的測資。
+        """
+        if not self.linear_regression:
+            self._run_predict()
+        content = HashedPrefix(prefix_bytes(prefix))
+        while True:
+            with memoryview(content) as view:
+                char = self._read_char(self.submitter.get_next_char, view, 256, low=0)
+            if char == 0:
+                return content.decode('latin-1')
+            content.append(char)
+
     def _run_predict(self):
         self.linear_regression = LinearRegression()
-        for number in range(-1, 256, 64):
+        numbers = CALIBRATION_NUMBERS
+        if self.branch_radix:
+            # 合併探測的字元落在 branch_radix 之上，多校正一個最大值，也確認樣板能表示這麼大的數
+            numbers += (self.branch_radix + 255,)
+        for number in numbers:
             memory_use = self.submitter.get_number(number)
             self.linear_regression.add_point(memory_use, number)
         self.linear_regression.calculate_regression()
     
-    def _m2n(self, memory_use: int) -> int:
+    def _predict(self, memory_use: int) -> float:
         if not self.linear_regression:
             raise RuntimeError("LinearRegression model not predicted yet.")
-        return round(self.linear_regression.predict(memory_use))
+        return self.linear_regression.predict(memory_use)
+
+    def _m2n(self, memory_use: int) -> int:
+        return round(self._predict(memory_use))
+
+    def _read(self, probe: Callable[..., int], *args) -> float:
+        """
+        送出探測並換算成數值。有 check_code 時接著送出檢查探測，回傳更正後的確切整數。
+        前綴的 memoryview 必須在整個呼叫期間有效。
+        """
+        value = self._predict(probe(*args))
+        if self.check_code is None:
+            return value
+        return self.check_code.correct(value, lambda window: self._check(probe, args, window))
+
+    def _read_number(self, probe: Callable[..., int], *args) -> int:
+        return round(self._read(probe, *args))
+
+    def _read_char(self, probe: Callable[..., int], *args, low: int = -1, high: int = 256) -> int:
+        """
+        讀取 get_next_char 一類的探測，回傳 [low, high) 中的數值，-1 代表沒有符合的測資。
+        超出範圍的讀數不可能是正確的，以不使用快取的方式重送探測，
+        CHAR_READ_ATTEMPTS 次都超出範圍時拋出 DecodeError。
+        """
+        value = self._read_number(probe, *args)
+        attempt = 1
+        while not low <= value < high:
+            if attempt == CHAR_READ_ATTEMPTS:
+                if value < 0:
+                    # 重送仍讀到沒有測資，通常是前綴中較早的字元已經誤讀
+                    raise DecodeError(f"No test case continues the prefix after {attempt} attempts, an earlier character was probably misread.")
+                raise DecodeError(f"Reading {value} is outside [{low}, {high}) after {attempt} attempts, the channel is too noisy.")
+            self.submitter.skip_cache = True
+            try:
+                value = self._read_number(probe, *args)
+            finally:
+                self.submitter.skip_cache = False
+            attempt += 1
+        return value
+
+    def _check(self, probe: Callable[..., int], args: tuple, window: CheckWindow) -> float:
+        self.submitter.check_window = window
+        try:
+            return self._predict(probe(*args))
+        finally:
+            self.submitter.check_window = None
@@ -0,0 +1,75 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Protocol, runtime_checkable
+
+from .crawler_core import CrawlerCore, Submitter
+
+FNV_OFFSET_BASIS = 0x811C9DC5
+FNV_PRIME = 0x01000193
+
+# 增量模式中，這些樣板必須接受 {exclude} 參數（指紋的 JSON 陣列），
+# 並忽略指紋在其中的測資，CrawlerCore 才會只走訪新的或變動過的測資
+EXCLUDABLE_TEMPLATES = ('get_next_char', 'get_prefix_length_length', 'get_prefix_length')
+INCREMENTAL_TEMPLATES = ('has_case', 'has_unknown_case')
+
+
+def testcase_fingerprint(content: str) -> int:
+    """
+    測資的 32 位元 FNV-1a 指紋，探測程式必須對輸入的每個位元組使用相同的算法。
+    """
+    h = FNV_OFFSET_BASIS
+    for char in content:
+        h = ((h ^ ord(char)) * FNV_PRIME) & 0xFFFFFFFF
+    return h
+
+
+def missing_incremental_templates(codes: Dict[str, str]) -> List[str]:
+    """回傳增量模式所缺少的樣板或 {exclude} 參數，空串列代表可以使用增量模式"""
+    missing = [key for key in INCREMENTAL_TEMPLATES if key not in codes]
+    missing += [f"{key} ({{exclude}})" for key in EXCLUDABLE_TEMPLATES if '{exclude}' not in codes.get(key, '')]
+    return missing
+
+
+@runtime_checkable
+class IncrementalSubmitter(Submitter, Protocol):
+    def has_case(self, fingerprint: int) -> int:
+        """是否有測資的指紋等於 fingerprint（1 或 0）"""
+        ...
+
+    def has_unknown_case(self, fingerprints: List[int]) -> int:
+        """是否有測資的指紋不在 fingerprints 中（1 或 0）"""
+        ...
+
+
+@dataclass
+class IncrementalPlan:
+    # 仍存在於 judge 上的測資指紋，爬取時會被排除
+    present: List[int] = field(default_factory=list)
+    # 已不存在於 judge 上的測資指紋，應標記為過期
+    removed: List[int] = field(default_factory=list)
+    # judge 上是否有新的或變動過的測資
+    has_unknown: bool = False
+    probes: int = 0
+
+
+def plan_incremental_crawl(crawler_core: CrawlerCore, submitter: IncrementalSubmitter, fingerprints: List[int]) -> IncrementalPlan:
+    """
+    比對 judge 上目前的測資與已儲存的測資指紋。
+    每筆已儲存的測資需要一次存在性探測，另外再用一次探測判斷是否有未知的測資。
+    """
+    if not crawler_core.linear_regression:
+        crawler_core._run_predict()
+    if crawler_core.current_internal_state == "NEEDS_PREDICT":
+        # 已經校正過，讓 run() 直接開始尋找字元，避免重複校正
+        crawler_core.current_internal_state = "FINDING_NEXT_CHAR"
+
+    plan = IncrementalPlan()
+    for fingerprint in fingerprints:
+        plan.probes += 1
+        if crawler_core._m2n(submitter.has_case(fingerprint)) == 1:
+            plan.present.append(fingerprint)
+        else:
+            plan.removed.append(fingerprint)
+
+    plan.probes += 1
+    plan.has_unknown = crawler_core._m2n(submitter.has_unknown_case(plan.present)) == 1
+    return plan
@@ -0,0 +1,178 @@
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Protocol, runtime_checkable
+
+from .channel import NOISE_MARGIN, noise_upper_bound
+from .crawler_core import CALIBRATION_NUMBERS, CHAR_READ_ATTEMPTS, DecodeError
+from .linear_regression import LinearRegression
+
+# 讀取每筆測資的內容需要的樣板：{position} 為位置，每筆測資回傳該位置的字元，超出結尾時回傳 0
+PER_CASE_TEMPLATES = ('get_number', 'get_char_at')
+
+
+class NoisyChannelError(Exception):
+    """校正的殘差太大，逐筆測資的讀數無法可靠地解碼，應改用能送出檢查探測的完整爬取"""
+
+
+@dataclass
+class PerCaseState:
+    """保存 PerCaseCrawler 的執行狀態，以便中斷後可以恢復。測資以 judge 回報的 test_case 編號識別。"""
+    state: str = "NEEDS_PREDICT"
+    position: int = 0
+    contents: Dict[str, str] = field(default_factory=dict)
+    finished: List[str] = field(default_factory=list)
+    # 每筆測資各自的 [slope, intercept]，不同測資的輸入大小會影響記憶體的基準值
+    calibration: Dict[str, List[float]] = field(default_factory=dict)
+
+
+@runtime_checkable
+class PerCaseSubmitter(Protocol):
+    """能讀取判題結果中每筆測資的記憶體用量的提交者"""
+
+    def found_testcase(self, testcase: str) -> None:
+        ...
+
+    def get_number_per_case(self, number: int) -> Dict[str, int]:
+        ...
+
+    def get_char_at_per_case(self, position: int) -> Dict[str, int]:
+        ...
+
+
+class PerCaseCrawler:
+    """
+    利用判題結果中每筆測資各自的統計資料，一次提交讀取所有測資同一個位置的字元。
+    所有測資同步前進，提交次數約為最長測資的長度，與測資數量無關。
+    提供與 CrawlerCore 相同的 run()、save_state()、load_state() 介面。
+    """
+
+    def __init__(self, submitter: PerCaseSubmitter, should_pause: callable = lambda: False, on_state_change: callable = lambda state: None):
+        self.submitter = submitter
+        self.should_pause = should_pause
+        self.on_state_change = on_state_change
+        self.regressions: Dict[str, LinearRegression] = {}
+        self.position = 0
+        self.contents: Dict[str, bytearray] = {}
+        self.finished: List[str] = []
+        self.current_internal_state = "NEEDS_PREDICT"
+
+    @property
+    def current_internal_state(self) -> str:
+        return self._current_internal_state
+
+    @current_internal_state.setter
+    def current_internal_state(self, state: str):
+        self._current_internal_state = state
+        self.on_state_change(state)
+
+    def load_state(self, state: PerCaseState):
+        """從 state 物件載入執行狀態。"""
+        self.current_internal_state = state.state
+        self.position = state.position
+        self.contents = {case: bytearray(content.encode('latin-1')) for case, content in state.contents.items()}
+        self.finished = list(state.finished)
+        self.regressions = {}
+        for case, (slope, intercept) in state.calibration.items():
+            regression = LinearRegression()
+            regression.slope, regression.intercept = slope, intercept
+            self.regressions[case] = regression
+
+    def save_state(self) -> PerCaseState:
+        """將目前的執行狀態保存到一個 state 物件中。"""
+        return PerCaseState(
+            state=self.current_internal_state,
+            position=self.position,
+            contents={case: content.decode('latin-1') for case, content in self.contents.items()},
+            finished=list(self.finished),
+            calibration={case: [regression.slope, regression.intercept] for case, regression in self.regressions.items()},
+        )
+
+    def calibrate(self) -> None:
+        """
+        尚未校正時先校正，並讓 run() 直接開始讀取。
+        所有測資的校正殘差合併估計雜訊，雜訊的信賴上界太大時拋出 NoisyChannelError。
+        """
+        if self.current_internal_state != "NEEDS_PREDICT":
+            return
+        self._run_predict()
+        noise = self.calibration_noise()
+        # 逐筆測資的讀數沒有檢查探測
+        if NOISE_MARGIN * noise >= 0.5:
+            raise NoisyChannelError(f"Per-case readings are too noisy (residual up to {noise:.3f}), use a full crawl instead.")
+        self.current_internal_state = "READING"
+
+    def calibration_noise(self) -> float:
+        """所有測資校正殘差的合併標準差（以數值為單位）的 95% 信賴上界，每筆測資的模型各用掉兩個自由度"""
+        squares, degrees_of_freedom = 0.0, 0
+        for regression in self.regressions.values():
+            squares += sum((regression.predict(memory_use) - number) ** 2 for memory_use, number in regression.points)
+            degrees_of_freedom += len(regression.points) - 2
+        if degrees_of_freedom <= 0:
+            return math.inf
+        return noise_upper_bound(math.sqrt(squares / degrees_of_freedom), degrees_of_freedom)
+
+    def run(self):
+        """
+        執行爬蟲主循環。
+        如果發生錯誤，會拋出異常，呼叫者應捕捉異常並使用 save_state() 保存狀態。
+        """
+        self.calibrate()
+
+        while self.current_internal_state == "READING":
+            if self.should_pause():
+                return
+            chars = self._read_chars()
+            for case, char in chars.items():
+                if char == 0:
+                    self.finished.append(case)
+                    self.submitter.found_testcase(self.contents.get(case, bytearray()).decode('latin-1'))
+                else:
+                    self.contents.setdefault(case, bytearray()).append(char)
+            self.position += 1
+            if len(self.finished) == len(self.regressions):
+                self.current_internal_state = "DONE"
+
+    def _read_chars(self) -> Dict[str, int]:
+        """
+        讀取尚未結束的測資在目前位置的字元，0 代表測資已結束。
+        超出 [0, 256) 的讀數不可能是正確的，以不使用快取的方式重送探測，只更新超出範圍的測資，
+        CHAR_READ_ATTEMPTS 次都超出範圍時拋出 DecodeError；位置與內容沒有改變，可以保存狀態後恢復。
+        """
+        chars: Dict[str, int] = {}
+        attempt = 1
+        readings = self.submitter.get_char_at_per_case(self.position)
+        while True:
+            for case, memory_use in readings.items():
+                if case not in self.finished and not 0 <= chars.get(case, -1) < 256:
+                    chars[case] = self._m2n(case, memory_use)
+            invalid = {case: char for case, char in chars.items() if not 0 <= char < 256}
+            if not invalid:
+                return chars
+            if attempt == CHAR_READ_ATTEMPTS:
+                case, char = next(iter(invalid.items()))
+                raise DecodeError(f"Test case '{case}' read {char} at position {self.position}, outside [0, 256) after {attempt} attempts, the channel is too noisy.")
+            self.submitter.skip_cache = True
+            try:
+                readings = self.submitter.get_char_at_per_case(self.position)
+            finally:
+                self.submitter.skip_cache = False
+            attempt += 1
+
+    def _run_predict(self):
+        points: Dict[str, List[tuple]] = {}
+        for number in CALIBRATION_NUMBERS:
+            for case, memory_use in self.submitter.get_number_per_case(number).items():
+                points.setdefault(case, []).append((memory_use, number))
+        self.regressions = {}
+        for case, case_points in points.items():
+            if len(case_points) != len(CALIBRATION_NUMBERS):
+                raise ValueError(f"Judge did not report test case '{case}' for every calibration probe.")
+            regression = LinearRegression()
+            regression.add_points(case_points)
+            regression.calculate_regression()
+            self.regressions[case] = regression
+
+    def _m2n(self, case: str, memory_use: int) -> int:
+        if case not in self.regressions:
+            raise ValueError(f"Judge reported test case '{case}' that was not calibrated.")
+        return round(self.regressions[case].predict(memory_use))
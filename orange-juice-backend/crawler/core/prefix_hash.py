@@ -0,0 +1,124 @@
+from typing import Iterable, List, NamedTuple, Optional, Union
+
+# 64 位元 FNV-1a，探測程式必須對輸入的前 {prefix_length} 個位元組使用相同的算法
+FNV64_OFFSET_BASIS = 0xCBF29CE484222325
+FNV64_PRIME = 0x100000001B3
+FNV64_MASK = 0xFFFFFFFFFFFFFFFF
+
+
+def prefix_hash(data: Union[bytes, bytearray, memoryview], start: int = FNV64_OFFSET_BASIS) -> int:
+    """data 的 64 位元 FNV-1a 雜湊；start 為已雜湊部分的結果，用於接續計算"""
+    h = start
+    for byte in bytes(data):
+        h = ((h ^ byte) * FNV64_PRIME) & FNV64_MASK
+    return h
+
+
+class HashedPrefix(bytearray):
+    """
+    記住每個長度的雜湊的 bytearray，作為 CrawlerCore 的前綴。
+    CrawlerCore 只在尾端新增或截斷前綴：新增時接續計算新的位元組，截斷時丟棄對應的雜湊，
+    任何時候都能以 O(1) 取得整個前綴的雜湊。以 memoryview 傳給 Submitter 時可由 view.obj 取回，見 PrefixHasher.digest。
+    其他修改方式（例如切片賦值）不會更新雜湊，digest() 發現長度不符時會重新計算。
+    """
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview] = b''):
+        super().__init__(data)
+        self._rehash()
+
+    def _rehash(self) -> None:
+        self._hashes: List[int] = [FNV64_OFFSET_BASIS]
+        for byte in self:
+            self._hashes.append(((self._hashes[-1] ^ byte) * FNV64_PRIME) & FNV64_MASK)
+
+    def append(self, byte: int) -> None:
+        super().append(byte)
+        self._hashes.append(((self._hashes[-1] ^ byte) * FNV64_PRIME) & FNV64_MASK)
+
+    def extend(self, data: Iterable[int]) -> None:
+        for byte in bytes(data):
+            self.append(byte)
+
+    def clear(self) -> None:
+        super().clear()
+        del self._hashes[1:]
+
+    def __delitem__(self, key) -> None:
+        super().__delitem__(key)
+        if isinstance(key, slice) and key.step is None and key.stop is None and len(self._hashes) > len(self) + 1:
+            # 截斷尾端
+            del self._hashes[len(self) + 1:]
+        else:
+            self._rehash()
+
+    def digest(self) -> int:
+        if len(self._hashes) != len(self) + 1:
+            self._rehash()
+        return self._hashes[-1]
+
+
+class PrefixDigest(NamedTuple):
+    """
+    只有長度、最後一個位元組與雜湊的前綴，用於只比對雜湊的樣板、探測紀錄與預先提交的鍵。
+    last 在前綴為空時為 None。
+    """
+    length: int
+    last: Optional[int]
+    hash: int
+
+    def child(self, byte: int) -> 'PrefixDigest':
+        """在尾端加上 byte 之後的前綴"""
+        return PrefixDigest(self.length + 1, byte, prefix_hash(bytes((byte,)), self.hash))
+
+
+def digest_prefix(prefix: Union[str, bytes, bytearray, memoryview, PrefixDigest], hasher: Optional['PrefixHasher'] = None) -> PrefixDigest:
+    """prefix 的長度、最後一個位元組與雜湊；hasher 用來接續上一個前綴的雜湊"""
+    if isinstance(prefix, PrefixDigest):
+        return prefix
+    last = prefix[-1] if len(prefix) else None
+    if isinstance(last, str):
+        last = ord(last)
+    return PrefixDigest(len(prefix), last, (hasher or PrefixHasher()).digest(prefix))
+
+
+class PrefixHasher:
+    """
+    計算前綴的雜湊值，並記住上一次的前綴與結果。
+    CrawlerCore 的前綴在大部分探測之間只會增加一個位元組，此時只需計算新增的部分；
+    只有最後一個位元組不同時（預先提交的兄弟前綴）從去掉最後一個位元組的雜湊接續計算；
+    回溯（每筆測資一次）時才重新計算整個前綴。
+    """
+
+    def __init__(self):
+        self._data = bytearray()
+        self._hash = FNV64_OFFSET_BASIS
+        # 去掉最後一個位元組的前綴的雜湊，前綴為空時為 None
+        self._parent_hash: Optional[int] = None
+
+    def digest(self, prefix: Union[str, bytes, bytearray, memoryview]) -> int:
+        """
+        prefix 的雜湊。CrawlerCore 的前綴（HashedPrefix 或整個 HashedPrefix 的 memoryview）直接使用它記住的雜湊；
+        其他前綴與上一次的前綴比對，只計算不同的部分。str 的每個字元代表一個位元組（latin-1）。
+        """
+        owner = prefix.obj if isinstance(prefix, memoryview) else prefix
+        if isinstance(owner, HashedPrefix) and len(prefix) == len(owner):
+            return owner.digest()
+        if isinstance(prefix, str):
+            prefix = prefix.encode('latin-1')
+        prefix = memoryview(prefix)
+        known = len(self._data)
+        if len(prefix) < known or prefix[:known] != self._data:
+            if self._parent_hash is not None and len(prefix) >= known and prefix[:known - 1] == self._data[:-1]:
+                del self._data[-1]
+                self._hash = self._parent_hash
+                known -= 1
+            else:
+                self._data.clear()
+                self._hash = FNV64_OFFSET_BASIS
+                self._parent_hash = None
+                known = 0
+        if len(prefix) > known:
+            self._parent_hash = prefix_hash(prefix[known:-1], self._hash)
+            self._hash = prefix_hash(prefix[-1:], self._parent_hash)
+            self._data += prefix[known:]
+        return self._hash
@@ -0,0 +1,91 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from .crawler_core import CrawlerCore, CrawlerState, Submitter
+
+
+@dataclass
+class ShardRange:
+    """
+    以 prefix 開頭、且下一個字元落在 [lower, upper) 的測資；字元 0 代表測資在 prefix 處結束。
+    不同分片的範圍互不重疊，合起來涵蓋所有測資。
+    """
+    prefix: str
+    lower: int
+    upper: int
+
+    def initial_state(self, crawler_core: CrawlerCore) -> CrawlerState:
+        """從分片最大的測資開始爬取的狀態，沿用 crawler_core 的校正參數、SymbolCode 與 CheckCode"""
+        calibration = crawler_core.save_state()
+        return CrawlerState(
+            state="FINDING_NEXT_CHAR",
+            prefix=self.prefix,
+            limit=self.upper,
+            lr_slope=calibration.lr_slope,
+            lr_intercept=calibration.lr_intercept,
+            shard_prefix=self.prefix,
+            shard_lower=self.lower,
+            symbol_alphabet=calibration.symbol_alphabet,
+            symbol_count=calibration.symbol_count,
+            symbol_spacing=calibration.symbol_spacing,
+            check_radii=calibration.check_radii,
+        )
+
+
+def enumerate_children(crawler_core: CrawlerCore, submitter: Submitter, prefix: str) -> Tuple[List[int], bool]:
+    """
+    由大到小列出以 prefix 開頭的測資在 prefix 之後的所有字元，每個字元一次探測。
+    回傳 (字元, prefix 本身是否為測資)。
+    """
+    children, limit = [], 256
+    while True:
+        char = crawler_core._read_char(submitter.get_next_char, prefix, limit, high=limit)
+        if char <= 0:
+            return children, char == 0
+        children.append(char)
+        limit = char
+
+
+def _merge(ranges: List[ShardRange], count: int) -> List[ShardRange]:
+    """將同一個 prefix 下相鄰的範圍（由大到小排列）平均合併成 count 個"""
+    size, extra = divmod(len(ranges), count)
+    merged, start = [], 0
+    for i in range(count):
+        end = start + size + (1 if i < extra else 0)
+        group = ranges[start:end]
+        merged.append(ShardRange(group[0].prefix, group[-1].lower, group[0].upper))
+        start = end
+    return merged
+
+
+def plan_shards(crawler_core: CrawlerCore, submitter: Submitter, shards_wanted: int, max_depth: int) -> List[ShardRange]:
+    """
+    以廣度優先展開字典樹的上層：依佇列順序展開，同一層的子樹都展開後才展開下一層，
+    直到分片數達到 shards_wanted 或深度達到 max_depth，展開後超出的部分會與相鄰的範圍合併。
+    回傳的分片依字典序由大到小排列。
+    """
+    if not crawler_core.linear_regression:
+        crawler_core._run_predict()
+
+    # (分片, 可以再展開的子樹的 prefix)，依字典序由大到小排列
+    frontier: List[Tuple[ShardRange, Optional[str]]] = [(ShardRange("", 0, 256), "")]
+    queue = deque([""])
+    while queue and len(frontier) < shards_wanted:
+        subtree = queue.popleft()
+        if len(subtree) >= max_depth:
+            continue
+        children, is_case = enumerate_children(crawler_core, submitter, subtree)
+        expanded = [(ShardRange(subtree, char, char + 1), subtree + chr(char)) for char in children]
+        if is_case:
+            expanded.append((ShardRange(subtree, 0, 1), None))
+        if not expanded:
+            # 沒有任何測資
+            break
+        room = shards_wanted - (len(frontier) - 1)
+        if len(expanded) > room:
+            expanded = [(shard, None) for shard in _merge([shard for shard, _ in expanded], room)]
+        index = next(i for i, (_, prefix) in enumerate(frontier) if prefix == subtree)
+        frontier[index:index + 1] = expanded
+        queue.extend(prefix for _, prefix in expanded if prefix is not None)
+    return [shard for shard, _ in frontier]
@@ -0,0 +1,32 @@
+"""
+預測 CrawlerCore 接下來會探測的前綴，讓等待判題的期間可以用閒置的帳號先提交。
+"""
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Union
+
+# 前綴為空時的前一個字元
+START = -1
+
+
+class NextCharModel:
+    """
+    以前一個字元預測下一個字元：統計測資中每個字元（開頭視為 START）之後出現各字元的次數。
+    測資通常是數字、空白與換行組成的固定格式，只看前一個字元就能猜中大部分的下一個字元。
+    """
+
+    def __init__(self, test_cases: Iterable[str] = ()):
+        self._after: Dict[int, Counter] = defaultdict(Counter)
+        for test_case in test_cases:
+            self.add(test_case)
+
+    def add(self, test_case: str) -> None:
+        """加入一筆測資的統計，爬取中找到的測資也可以加入"""
+        previous = START
+        for char in test_case.encode('latin-1'):
+            self._after[previous][char] += 1
+            previous = char
+
+    def likely_next(self, prefix: Union[bytes, bytearray, memoryview], count: int) -> List[int]:
+        """prefix 之後最可能出現的 count 個字元，由可能到不可能排列；沒有統計時回傳空串列"""
+        previous = prefix[-1] if len(prefix) else START
+        return [char for char, _ in self._after[previous].most_common(count)]
@@ -0,0 +1,132 @@
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .crawler_core import BRANCH_TEMPLATE, PAIR_TEMPLATE, SYMBOLS_TEMPLATE, CheckCode, CheckWindow, SymbolCode, CrawlerCore, CrawlerState, Prefix
+from .prefix_hash import PrefixHasher, digest_prefix
+
+
+class TraceExhausted(Exception):
+    """重新解碼時需要一個紀錄中不存在的探測結果"""
+
+    def __init__(self, template_key: str, params: dict):
+        super().__init__(f"Probe '{template_key}' with {params} is not in the trace.")
+        self.template_key = template_key
+        self.params = params
+
+
+def record_params(params: dict, hasher: Optional[PrefixHasher] = None) -> dict:
+    """
+    探測紀錄保存的參數。前綴只保存長度、最後一個位元組與雜湊，每筆紀錄的大小不隨前綴長度增加；
+    重新解碼時由解碼出的前綴算出相同的值來比對。已經是這個形式的參數原樣回傳。
+    hasher 用來接續上一個前綴的雜湊，依序處理 CrawlerCore 的前綴時不需要每次重新計算。
+    """
+    if 'prefix' not in params:
+        return params
+    prefix = digest_prefix(params['prefix'], hasher)
+    recorded = {name: value for name, value in params.items() if name != 'prefix'}
+    recorded.update(prefix_length=prefix.length, prefix_last=prefix.last, prefix_hash=prefix.hash)
+    return recorded
+
+
+def _probe_key(template_key: str, params: dict) -> Tuple[str, str]:
+    return template_key, json.dumps(params, sort_keys=True)
+
+
+class TraceReplaySubmitter:
+    """
+    以探測紀錄回答 CrawlerCore 的探測，而不是提交到 OJ。
+    實作與 CrawlTestCasesSubmitter 相同的 Submitter 介面。
+    """
+
+    def __init__(self, records: Iterable[Tuple[str, dict, int]]):
+        """
+        Args:
+            records: 依提交順序排列的 (template_key, params, memory_cost)，params 為 record_params 的形式
+                     （保存完整前綴的舊紀錄也可以）。相同的探測出現多次時，使用最早的讀數。
+        """
+        self._memory: Dict[Tuple[str, str], int] = {}
+        hasher = PrefixHasher()
+        for template_key, params, memory_cost in records:
+            self._memory.setdefault(_probe_key(template_key, record_params(params, hasher)), memory_cost)
+        self._hasher = PrefixHasher()
+        self.testcases: List[str] = []
+        self.check_window: Optional[CheckWindow] = None
+
+    def _lookup(self, template_key: str, **params) -> int:
+        if self.check_window is not None:
+            params.update(self.check_window.params())
+        # 前綴是解碼出的前綴，以與紀錄相同的形式比對
+        params = record_params(params, self._hasher)
+        try:
+            return self._memory[_probe_key(template_key, params)]
+        except KeyError:
+            raise TraceExhausted(template_key, params)
+
+    def found_testcase(self, testcase: str) -> None:
+        self.testcases.append(testcase)
+
+    def get_next_char(self, prefix: Prefix, limit: int) -> int:
+        return self._lookup('get_next_char', prefix=prefix, limit=limit)
+
+    def get_prefix_length_length(self, prefix: Prefix) -> int:
+        return self._lookup('get_prefix_length_length', prefix=prefix)
+
+    def get_prefix_length(self, prefix: Prefix, length_prefix: int, position: int) -> int:
+        return self._lookup('get_prefix_length', prefix=prefix, length_prefix=length_prefix, position=position)
+
+    def get_number(self, number: int) -> int:
+        return self._lookup('get_number', number=number)
+
+    def get_next_char_or_branch(self, prefix: Prefix, limit: int, branch_radix: int) -> int:
+        return self._lookup(BRANCH_TEMPLATE, prefix=prefix, limit=limit, branch_radix=branch_radix)
+
+    def get_next_char_pair(self, prefix: Prefix, limit: int) -> int:
+        return self._lookup(PAIR_TEMPLATE, prefix=prefix, limit=limit)
+
+    def get_next_symbols(self, prefix: Prefix, limit: int, code: SymbolCode) -> int:
+        return self._lookup(SYMBOLS_TEMPLATE, prefix=prefix, limit=limit, **code.params())
+
+
+@dataclass
+class ReplayResult:
+    testcases: List[str] = field(default_factory=list)
+    # 紀錄足以解碼出全部測資時為 True
+    complete: bool = False
+    # 解碼中斷時缺少的探測，以及可用來恢復爬取任務的狀態
+    missing_probe: Optional[TraceExhausted] = None
+    resume_state: Optional[CrawlerState] = None
+
+
+def replay_trace(records: Iterable[Tuple[str, dict, int]], slope: Optional[float] = None, intercept: Optional[float] = None) -> ReplayResult:
+    """
+    以探測紀錄重新執行 CrawlerCore 的解碼，不需要再次提交到 OJ。
+
+    未指定 slope/intercept 時，會用紀錄中的 get_number 探測重新擬合校正參數。
+    若新的校正讓解碼走上原本沒有探測過的分支，會在該處停止，
+    並回傳可交給 ResumeCrawlTaskView 的狀態，只需從那裡繼續爬取即可。
+    """
+    records = list(records)
+    # 以紀錄中出現的選用探測重新解碼，走訪的路徑才會與爬取時相同
+    branch_radix = next((params['branch_radix'] for template_key, params, _ in records if template_key == BRANCH_TEMPLATE), 0)
+    char_pairs = any(template_key == PAIR_TEMPLATE for template_key, _, _ in records)
+    symbols = next((params for template_key, params, _ in records if template_key == SYMBOLS_TEMPLATE), None)
+    # 每次讀取都依序經過每個檢查視窗，視窗大小逐次縮小，由紀錄中出現過的大小還原 CheckCode
+    check_counts = sorted({params['check_count'] for _, params, _ in records if params.get('check_count')}, reverse=True)
+    submitter = TraceReplaySubmitter(records)
+    crawler_core = CrawlerCore(submitter, branch_radix=branch_radix, char_pairs=char_pairs)
+    if slope is not None and intercept is not None:
+        crawler_core.load_state(CrawlerState(state="FINDING_NEXT_CHAR", lr_slope=slope, lr_intercept=intercept))
+    if symbols is not None:
+        crawler_core.symbol_code = SymbolCode(bytes(symbols['alphabet']), symbols['symbol_count'], symbols['symbol_spacing'])
+    if check_counts:
+        crawler_core.check_code = CheckCode(tuple((count - 1) // 2 for count in check_counts))
+
+    result = ReplayResult(testcases=submitter.testcases)
+    try:
+        crawler_core.run()
+        result.complete = True
+    except TraceExhausted as e:
+        result.missing_probe = e
+        result.resume_state = crawler_core.save_state()
+    return result
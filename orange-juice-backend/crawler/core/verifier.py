@@ -0,0 +1,183 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Protocol, Sequence, Tuple, runtime_checkable
+
+from .crawler_core import CrawlerCore, Submitter, prefix_bytes
+
+# get_prefix_checksum 探測的回傳值：
+#   0 -> 沒有任何測資以 anchor 開頭
+#   1 -> 以 anchor 開頭的測資長度小於 length
+#   2 + checksum -> 該測資前 length 個字元的 checksum
+NO_MATCH = 0
+TOO_SHORT = 1
+CHECKSUM_OFFSET = 2
+CHECKSUM_BASE = 31
+CHECKSUM_MODULUS = 256 - CHECKSUM_OFFSET
+# 一次探測最多只能讀出 254 種 checksum，單一模數約有 1/254 的機率把錯誤的內容判為正確；
+# 樣板接受 {checksum_modulus} 時，判定相符前再以互質的模數確認一次，誤判機率約為 1/(254 * 251)
+CHECKSUM_MODULI = (CHECKSUM_MODULUS, 251)
+
+
+def prefix_checksum(content: str, length: int, modulus: int = CHECKSUM_MODULUS) -> int:
+    """
+    計算 content 前 length 個字元的 checksum，探測程式必須使用相同的算法：
+    h = (h * 31 + byte) mod modulus，h 的初始值為 0，modulus 預設為 254。
+    """
+    h = 0
+    for char in content[:length]:
+        h = (h * CHECKSUM_BASE + ord(char)) % modulus
+    return h
+
+
+def checksum_moduli(codes: Dict[str, str]) -> Tuple[int, ...]:
+    """get_prefix_checksum 樣板可用的模數；沒有 {checksum_modulus} 的樣板只能使用預設的模數"""
+    if '{checksum_modulus}' in codes.get('get_prefix_checksum', ''):
+        return CHECKSUM_MODULI
+    return (CHECKSUM_MODULUS,)
+
+
+def find_anchor(content: str, others: Iterable[str]) -> str:
+    """
+    找出能唯一識別 content 的最短前綴。
+
+    judge 會回報所有測資中最大的讀數，多筆測資都以 anchor 開頭時結果會混在一起，
+    所以 anchor 必須與其他每一筆測資區分；content 是其他測資的前綴時只能以 content 本身為 anchor。
+    """
+    length = 1
+    for other in others:
+        if other == content:
+            continue
+        common = 0
+        while common < min(len(other), len(content)) and other[common] == content[common]:
+            common += 1
+        length = max(length, common + 1)
+    return content[:min(length, len(content))]
+
+
+@runtime_checkable
+class VerifyingSubmitter(Submitter, Protocol):
+    def get_prefix_checksum(self, anchor: str, length: int, modulus: int) -> int:
+        ...
+
+
+@dataclass
+class VerifyOutcome:
+    # 'OK'、'REPAIRED' 或 'MISSING'（judge 上找不到以 anchor 開頭的測資，且無法確定要修復成哪一筆）
+    status: str
+    probes: int
+    # 第一個錯誤字元的位置與修復後的內容，只有在 REPAIRED 時有值
+    first_bad_position: Optional[int] = None
+    repaired_content: Optional[str] = None
+
+
+class TestCaseVerifier:
+    """
+    以少量探測驗證已儲存的測資，並只重新爬取第一個錯誤位置之後的部分。
+
+    完全正確的測資只需每個模數一次 checksum 探測再加上一次長度探測，
+    有錯誤時以二分搜尋找出第一個錯誤位置，只需 O(log n) 次探測。
+    """
+
+    def __init__(self, submitter: VerifyingSubmitter, crawler_core: Optional[CrawlerCore] = None, moduli: Sequence[int] = (CHECKSUM_MODULUS,)):
+        self.submitter = submitter
+        self.crawler_core = crawler_core or CrawlerCore(submitter)
+        self.moduli = tuple(moduli)
+        self.probes = 0
+
+    def _probe(self, anchor: str, length: int, modulus: int = CHECKSUM_MODULUS) -> int:
+        if not self.crawler_core.linear_regression:
+            self.crawler_core._run_predict()
+        self.probes += 1
+        return self.crawler_core._m2n(self.submitter.get_prefix_checksum(anchor, length, modulus))
+
+    def _prefix_matches(self, content: str, anchor: str, length: int, value: Optional[int] = None) -> bool:
+        """
+        judge 上以 anchor 開頭的測資前 length 個字元是否與 content 相同。
+        依序以每個模數探測，不相符時立即停止；value 是已經以第一個模數探測到的讀數。
+        """
+        for i, modulus in enumerate(self.moduli):
+            if i > 0 or value is None:
+                value = self._probe(anchor, length, modulus)
+            if value < CHECKSUM_OFFSET or value - CHECKSUM_OFFSET != prefix_checksum(content, length, modulus):
+                return False
+        return True
+
+    def _locate_in_anchor(self, content: str, anchor: str) -> int:
+        """judge 上沒有測資以 anchor 開頭時，二分搜尋仍有測資開頭相同的最長前綴長度"""
+        lo, hi = 0, len(anchor)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if self._probe(content[:mid], mid) == NO_MATCH:
+                hi = mid
+            else:
+                lo = mid
+        return lo
+
+    def _next_chars(self, prefix: str) -> List[int]:
+        """judge 上以 prefix 開頭的測資在 prefix 之後的所有字元（結尾為 0），由大到小排列"""
+        chars = []
+        limit = 256
+        while limit > 0:
+            self.probes += 1
+            char = self.crawler_core._read_char(self.submitter.get_next_char, prefix_bytes(prefix), limit, high=limit)
+            if char < 0:
+                break
+            chars.append(char)
+            limit = char
+        return chars
+
+    def _repair_in_anchor(self, content: str, anchor: str, others: Iterable[str]) -> Tuple[int, Optional[str]]:
+        """
+        judge 上沒有測資以 anchor 開頭時，找出錯誤的位置與正確的內容。
+        錯誤位置之後 judge 上的每個分支中，其他已儲存的測資所在的分支都不是這筆測資；
+        只剩一個分支時才能確定要修復成哪一筆，否則回傳 None。
+        """
+        first_bad = self._locate_in_anchor(content, anchor)
+        prefix = content[:first_bad]
+        taken = {
+            ord(other[first_bad]) if len(other) > first_bad else 0
+            for other in others if other != content and other.startswith(prefix)
+        }
+        candidates = [char for char in self._next_chars(prefix) if char not in taken]
+        if len(candidates) != 1:
+            return first_bad, None
+        if candidates[0] == 0:
+            return first_bad, prefix
+        return first_bad, self.crawler_core.crawl_tail(prefix + chr(candidates[0]))
+
+    def verify(self, content: str, anchor: str, repair: bool = True, check_length: bool = True, others: Iterable[str] = ()) -> VerifyOutcome:
+        """
+        Args:
+            check_length: 是否確認 judge 上的測資沒有比 content 更長；
+                          content 是其他測資的前綴時必須關閉，否則較長的測資會被誤判為錯誤。
+            others: 其他已儲存的測資。錯誤在 anchor 之內時，judge 回報的最大值可能來自共用正確前綴的另一筆測資，
+                    以這些測資排除不屬於 content 的分支，見 _repair_in_anchor。
+        """
+        start_probes = self.probes
+        length = len(content)
+
+        value = self._probe(anchor, length)
+        if value == NO_MATCH:
+            if not repair:
+                return VerifyOutcome('MISSING', self.probes - start_probes)
+            first_bad, repaired = self._repair_in_anchor(content, anchor, others)
+            if repaired is None:
+                return VerifyOutcome('MISSING', self.probes - start_probes)
+            return VerifyOutcome('REPAIRED', self.probes - start_probes, first_bad, repaired)
+        elif self._prefix_matches(content, anchor, length, value):
+            # 內容一致，再確認 judge 上的測資沒有更長
+            if not check_length or self._probe(anchor, length + 1) == TOO_SHORT:
+                return VerifyOutcome('OK', self.probes - start_probes)
+            first_bad = length
+        else:
+            # anchor 本身一定相符；在 (len(anchor), length] 中二分搜尋第一個不相符的前綴長度
+            lo, hi = len(anchor), length
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if self._prefix_matches(content, anchor, mid):
+                    lo = mid
+                else:
+                    hi = mid
+            first_bad = hi - 1
+
+        repaired = self.crawler_core.crawl_tail(content[:first_bad]) if repair else None
+        return VerifyOutcome('REPAIRED', self.probes - start_probes, first_bad, repaired)
@@ -0,0 +1,125 @@
+"""
+以已儲存的資料估計爬取任務的成本，不需要提交任何探測。
+"""
+from typing import Optional, Dict
+
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import Length
+
+from .core.cost_model import CrawlEstimate, probes_for_longest_case, probes_for_per_case, probes_for_shape, probes_for_test_cases
+from .core.alphabet import alphabet_of, choose_symbol_code
+from .core.channel import choose_check_code, noise_upper_bound
+from .core.crawler_core import BRANCH_TEMPLATE, PAIR_TEMPLATE, SYMBOLS_TEMPLATE, supports_check_probes
+from .models import CrawlerSource, CrawlTestCasesTask, Problem, Task, TestCase
+from .source_selection import fresh_benchmarks
+
+
+def crawler_options(crawler_source: Optional[CrawlerSource]) -> Dict:
+    """
+    依 CrawlerSource 提供的選用樣板決定 CrawlerCore 的參數，同時也是 probes_for_test_cases 的參數：
+    有合併的結尾與分岔點探測時 branch_radix 為 CRAWL_BRANCH_RADIX，有 get_next_char_pair 時 char_pairs 為 True。
+    """
+    codes = crawler_source.code if crawler_source is not None else {}
+    return {
+        'branch_radix': settings.CRAWL_BRANCH_RADIX if BRANCH_TEMPLATE in codes else 0,
+        'char_pairs': PAIR_TEMPLATE in codes,
+    }
+
+
+def expected_check_probes(problem: Problem, crawler_source: Optional[CrawlerSource]) -> int:
+    """
+    以 CrawlerSourceBenchmark 量到的雜訊估計每次讀取之後的檢查探測數。
+    CrawlerSource 不支援檢查探測、沒有量測結果或雜訊大到無法檢查時為 0。
+    """
+    if crawler_source is None or not supports_check_probes(crawler_source.code):
+        return 0
+    benchmark = fresh_benchmarks(problem).filter(crawler_source=crawler_source, noise__isnull=False).first()
+    code = choose_check_code(noise_upper_bound(benchmark.noise, benchmark.probes - 2)) if benchmark else None
+    return len(code.radii) if code is not None else 0
+
+
+def measured_judge_latency(problem: Optional[Problem] = None) -> float:
+    """
+    最近一次成功的爬取任務所量測的判題時間中位數，優先使用同一題的任務。
+    沒有紀錄時回傳 CRAWL_ESTIMATE_JUDGE_LATENCY。
+    """
+    tasks = CrawlTestCasesTask.objects.filter(status=Task.Status.SUCCESS, result__has_key='metrics').order_by('-updated_at')
+    candidates = [tasks.filter(problem=problem).first(), tasks.first()] if problem is not None else [tasks.first()]
+    for task in candidates:
+        if task is None:
+            continue
+        turnaround = task.result['metrics'].get('spans', {}).get('judge_turnaround', {})
+        if turnaround.get('p50'):
+            return turnaround['p50']
+    return settings.CRAWL_ESTIMATE_JUDGE_LATENCY
+
+
+def estimate_from_size_probe(length_bits: int, test_cases: int, judge_latency: float, branch_radix: int = 0, checks: int = 0) -> CrawlEstimate:
+    """
+    以 get_length_bits 探測（最長測資長度的位元數）估計，
+    平均長度取 [2^(bits-1), 2^bits) 的中點。
+    """
+    average_length = (2 ** (length_bits - 1) + 2 ** length_bits - 1) / 2 if length_bits > 0 else 0
+    return CrawlEstimate(
+        # 包含校正與大小探測本身
+        probes=probes_for_shape(test_cases, average_length, branch_radix=branch_radix, checks=checks) + 1,
+        test_cases=test_cases,
+        total_bytes=int(test_cases * average_length),
+        judge_latency=judge_latency,
+        source='size_probe',
+    )
+
+
+def estimate_crawl(problem: Problem, mode: str = CrawlTestCasesTask.Mode.FULL, crawler_source: Optional[CrawlerSource] = None) -> CrawlEstimate:
+    """
+    在請求中使用的估計，只以資料庫端的彙總（測資數、總長度與最長的長度）計算，不讀取測資內容。
+    題目沒有測資時使用 CRAWL_ESTIMATE_DEFAULT_TEST_CASES 與 CRAWL_ESTIMATE_DEFAULT_LENGTH。
+    不計相鄰測資的共同前綴與 get_next_char_pair、get_next_symbols 省下的探測；確切的探測數由 worker 以 simulate_crawl 計算。
+    """
+    options = crawler_options(crawler_source)
+    per_case = mode == CrawlTestCasesTask.Mode.PER_CASE
+    checks = 0 if per_case else expected_check_probes(problem, crawler_source)
+    judge_latency = measured_judge_latency(problem)
+    stored = TestCase.objects.filter(problem=problem, is_stale=False).aggregate(
+        test_cases=Count('id'), total_bytes=Sum(Length('content')), longest=Max(Length('content')),
+    )
+    if stored['test_cases']:
+        test_cases, total_bytes, source = stored['test_cases'], stored['total_bytes'], 'stored_summary'
+        longest = stored['longest']
+    else:
+        test_cases = settings.CRAWL_ESTIMATE_DEFAULT_TEST_CASES
+        total_bytes = test_cases * settings.CRAWL_ESTIMATE_DEFAULT_LENGTH
+        longest, source = settings.CRAWL_ESTIMATE_DEFAULT_LENGTH, 'default'
+    return CrawlEstimate(
+        probes=probes_for_longest_case(longest) if per_case else probes_for_shape(test_cases, total_bytes / test_cases, branch_radix=options['branch_radix'], checks=checks),
+        test_cases=test_cases,
+        total_bytes=total_bytes,
+        judge_latency=judge_latency,
+        source=source,
+    )
+
+
+def simulate_crawl(problem: Problem, mode: str = CrawlTestCasesTask.Mode.FULL, crawler_source: Optional[CrawlerSource] = None) -> CrawlEstimate:
+    """
+    題目已有測資時，讀取這些測資模擬走訪，計算確切的探測數（測資沒有變動時與實際相同）。
+    需要讀取所有測資的內容，只在 worker 中使用；沒有測資時與 estimate_crawl 相同。
+    指定 crawler_source 時會考慮它提供的選用樣板。
+    """
+    contents = list(TestCase.objects.filter(problem=problem, is_stale=False).values_list('content', flat=True))
+    if not contents:
+        return estimate_crawl(problem, mode, crawler_source)
+    options = crawler_options(crawler_source)
+    per_case = mode == CrawlTestCasesTask.Mode.PER_CASE
+    checks = 0 if per_case else expected_check_probes(problem, crawler_source)
+    symbol_code = None
+    if crawler_source is not None and SYMBOLS_TEMPLATE in crawler_source.code:
+        # 爬取時同樣以已儲存測資的字元集合編碼；估計時假設通道沒有雜訊
+        symbol_code = choose_symbol_code(alphabet_of(contents))
+    return CrawlEstimate(
+        probes=probes_for_per_case(contents) if per_case else probes_for_test_cases(contents, **options, symbol_code=symbol_code, checks=checks),
+        test_cases=len(set(contents)),
+        total_bytes=sum(len(content) for content in contents),
+        judge_latency=measured_judge_latency(problem),
+        source='stored',
+    )
@@ -0,0 +1,146 @@
+import json
+import logging
+import time
+from collections import deque
+from typing import Optional
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .core.cost_model import CrawlProgressEstimator
+from . import utils
+
+logger = logging.getLogger(__name__)
+
+
+def task_channel(task_id) -> str:
+    """任務事件的 Redis pub/sub 頻道名稱"""
+    return f"task-events:{task_id}"
+
+
+def publish_task_event(task_id, **fields) -> None:
+    """
+    將任務的部分欄位（例如 status、progress、live）推播給所有訂閱者。
+    推播失敗不應影響任務本身，因此只記錄警告。
+    """
+    payload = json.dumps(fields, cls=DjangoJSONEncoder)
+    try:
+        utils.get_redis_client().publish(task_channel(task_id), payload)
+    except redis.RedisError as e:
+        logger.warning(f"Failed to publish event for task {task_id}: {e}")
+
+
+def publish_task_status(task) -> None:
+    """推播 Task 模型目前的共通欄位"""
+    publish_task_event(
+        task.id,
+        status=task.status,
+        progress=task.progress,
+        result=task.result,
+        updated_at=task.updated_at,
+    )
+
+
+class TaskProgressPublisher:
+    """
+    收集爬蟲任務執行中的即時資訊，並以節流的方式推播。
+    這些資訊只經由推播傳遞，不會寫入資料庫。
+    """
+    # 計算每秒提交數時使用的時間窗（秒）
+    rate_window = 30.0
+
+    def __init__(self, task_id, min_interval: Optional[float] = None):
+        self.task_id = task_id
+        self.min_interval = settings.TASK_EVENT_MIN_INTERVAL if min_interval is None else min_interval
+        self.found_testcases = 0
+        self.submissions = 0
+        self.crawler_state: Optional[str] = None
+        # 設定後會推播預估的進度與剩餘時間
+        self.estimator: Optional[CrawlProgressEstimator] = None
+        self._submission_times = deque()
+        self._last_published = 0.0
+
+    def submission_done(self, turnaround: Optional[float] = None) -> None:
+        now = time.monotonic()
+        self.submissions += 1
+        if self.estimator:
+            self.estimator.submission_done(turnaround)
+        self._submission_times.append(now)
+        self.publish()
+
+    def testcase_found(self) -> None:
+        self.found_testcases += 1
+        if self.estimator:
+            self.estimator.testcase_found()
+        self.publish(force=True)
+
+    def state_changed(self, state: str) -> None:
+        self.crawler_state = state
+        self.publish(force=True)
+
+    def submissions_per_second(self) -> float:
+        now = time.monotonic()
+        while self._submission_times and now - self._submission_times[0] > self.rate_window:
+            self._submission_times.popleft()
+        if not self._submission_times:
+            return 0.0
+        elapsed = max(now - self._submission_times[0], 1.0)
+        return len(self._submission_times) / elapsed
+
+    @property
+    def percent(self) -> Optional[int]:
+        """預估的任務進度；準備階段佔 10%，爬取結束前最多到 99%"""
+        if not self.estimator:
+            return None
+        return 10 + int(89 * self.estimator.fraction)
+
+    def snapshot(self) -> dict:
+        snapshot = {
+            'found_testcases': self.found_testcases,
+            'submissions': self.submissions,
+            'crawler_state': self.crawler_state,
+            'submissions_per_second': round(self.submissions_per_second(), 3),
+        }
+        if self.estimator:
+            snapshot.update(self.estimator.snapshot())
+        return snapshot
+
+    def publish(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_published < self.min_interval:
+            return
+        self._last_published = now
+        if self.estimator:
+            publish_task_event(self.task_id, live=self.snapshot(), progress=self.percent)
+        else:
+            publish_task_event(self.task_id, live=self.snapshot())
+
+
+class TaskEventSubscription:
+    """
+    以非同步方式訂閱單一任務的事件，供 SSE 端點使用。
+    必須先 open() 完成訂閱，再讀取任務快照，才不會漏掉兩者之間的事件。
+    """
+
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self._client = None
+        self._pubsub = None
+
+    async def open(self) -> None:
+        self._client = aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self._pubsub = self._client.pubsub()
+        await self._pubsub.subscribe(task_channel(self.task_id))
+
+    async def next_message(self, timeout: float) -> Optional[str]:
+        """等待下一個事件，逾時則回傳 None"""
+        message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        return message['data'] if message else None
+
+    async def close(self) -> None:
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        if self._client is not None:
+            await self._client.aclose()
@@ -0,0 +1,54 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crawler.benchmark.fake_oj import FakeOJConfig
+from crawler.benchmark.harness import BENCHMARK_MODES, generate_test_cases, run_benchmark
+
+
+class Command(BaseCommand):
+    help = "在本機的假 OJ 上執行完整的爬取流程，量測各模式的提交次數、耗時與解碼錯誤率，不會連線到真實 OJ。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', default=','.join(BENCHMARK_MODES), help=f"以逗號分隔的模式，可用：{', '.join(BENCHMARK_MODES)}")
+        parser.add_argument('--cases', type=int, default=5, help="測資數量")
+        parser.add_argument('--numbers', type=int, default=5, help="每筆測資最多的整數個數")
+        parser.add_argument('--accounts', type=int, default=3, help="使用的帳號數")
+        parser.add_argument('--latency', type=float, default=0.02, help="單次判題時間（秒）")
+        parser.add_argument('--queue-depth', type=int, default=4, help="同時判題的數量")
+        parser.add_argument('--noise', type=float, default=0.0, help="memory_cost 雜訊的標準差")
+        parser.add_argument('--judge-error-rate', type=float, default=0.0, help="判題回傳錯誤的機率")
+        parser.add_argument('--server-error-rate', type=float, default=0.0, help="/api/submission 回應 HTTP 500 的機率")
+        parser.add_argument('--poll-interval', type=float, default=0.01, help="輪詢判題結果的間隔（秒）")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', action='store_true', help="以 JSON 輸出結果，方便比較不同版本")
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        config = FakeOJConfig(
+            test_cases=generate_test_cases(options['cases'], options['numbers'], seed=options['seed']),
+            judge_latency=options['latency'],
+            queue_depth=options['queue_depth'],
+            memory_noise=options['noise'],
+            judge_error_rate=options['judge_error_rate'],
+            server_error_rate=options['server_error_rate'],
+            seed=options['seed'],
+        )
+        try:
+            reports = run_benchmark(config, modes, num_accounts=options['accounts'], poll_interval=options['poll_interval'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['json']:
+            self.stdout.write(json.dumps([report.as_dict() for report in reports], indent=2))
+            return
+
+        for report in reports:
+            style = self.style.ERROR if report.error or report.decode_error_rate else self.style.SUCCESS
+            self.stdout.write(style(
+                f"{report.mode:<12} probes={report.probes:<6} "
+                f"submissions/testcase={report.submissions_per_testcase:<8.2f} "
+                f"wall={report.wall_time:<8.2f}s requests/probe={report.requests_per_probe:<6.2f} "
+                f"decode_error_rate={report.decode_error_rate:.4f}"
+                + (f" error={report.error}" if report.error else "")
+            ))
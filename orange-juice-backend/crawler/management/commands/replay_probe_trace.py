@@ -0,0 +1,48 @@
+import json
+from dataclasses import asdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crawler.core.trace_replay import replay_trace
+from crawler.models import CrawlTestCasesTask, ProbeRecord, TestCase
+
+
+class Command(BaseCommand):
+    help = "以任務的探測紀錄離線重新解碼測資，可指定不同的校正參數，不會提交到 OJ。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('task_id', help="CrawlTestCasesTask 的 ID")
+        parser.add_argument('--slope', type=float, help="校正斜率；未指定時以紀錄中的 get_number 探測重新擬合")
+        parser.add_argument('--intercept', type=float, help="校正截距；需與 --slope 一起指定")
+        parser.add_argument('--save', action='store_true', help="將解碼出的測資寫入資料庫")
+
+    def handle(self, *args, **options):
+        try:
+            task = CrawlTestCasesTask.objects.get(id=options['task_id'])
+        except (CrawlTestCasesTask.DoesNotExist, ValueError):
+            raise CommandError(f"Crawl task '{options['task_id']}' not found.")
+        if (options['slope'] is None) != (options['intercept'] is None):
+            raise CommandError("--slope and --intercept must be given together.")
+
+        records = (
+            (template_key, params, memory_cost)
+            for template_key, params, memory_cost in ProbeRecord.objects
+                .filter(task=task, memory_cost__isnull=False)
+                .order_by('seq')
+                .values_list('template_key', 'params', 'memory_cost')
+                .iterator()
+        )
+        result = replay_trace(records, slope=options['slope'], intercept=options['intercept'])
+
+        self.stdout.write(f"Recovered {len(result.testcases)} test case(s).")
+        if options['save']:
+            for testcase in result.testcases:
+                TestCase.objects.get_or_create(problem=task.problem, content=testcase)
+            self.stdout.write(self.style.SUCCESS("Saved recovered test cases."))
+
+        if result.complete:
+            self.stdout.write(self.style.SUCCESS("The trace covers the whole crawl."))
+        else:
+            self.stdout.write(self.style.WARNING(f"Replay stopped: {result.missing_probe}"))
+            self.stdout.write("Resume the crawl task with this crawler_state to continue from here:")
+            self.stdout.write(json.dumps(asdict(result.resume_state), ensure_ascii=False))
@@ -0,0 +1,283 @@
+"""
+爬蟲熱路徑的計時與計數。
+
+每個 worker 行程在記憶體中累計指標，定期以 HINCRBYFLOAT 寫入 Redis 中該行程的 hash，
+/api/metrics/ 再將所有行程的 hash 依 worker 主機名稱加總，輸出為 Prometheus 文字格式。
+任務執行期間，同一筆紀錄也會記入該任務的 TaskMetrics，任務結束時以摘要寫入 Task.result。
+"""
+import bisect
+import logging
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import redis
+from django.conf import settings
+
+from . import utils
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY_PREFIX = "crawler-metrics"
+
+# 計時直方圖的上界（秒），涵蓋驗證碼辨識到長時間的判題排隊
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Redis hash 欄位的分隔字元
+_FIELD_SEPARATOR = '\t'
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+def _label_set(labels: dict) -> LabelSet:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels: LabelSet) -> str:
+    def escape(value: str) -> str:
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in labels)
+
+
+class MetricsRegistry:
+    """
+    worker 行程的指標，只保存上次寫入 Redis 後的增量。
+    """
+
+    def __init__(self, flush_interval: Optional[float] = None):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending: Dict[str, float] = defaultdict(float)
+        self._last_flush = time.monotonic()
+
+    def inc(self, name: str, value: float = 1, labels: LabelSet = ()) -> None:
+        field = _FIELD_SEPARATOR.join(('c', name, _format_labels(labels)))
+        with self._lock:
+            self._pending[field] += value
+
+    def observe(self, name: str, seconds: float, labels: LabelSet = ()) -> None:
+        label_text = _format_labels(labels)
+        index = bisect.bisect_left(DURATION_BUCKETS, seconds)
+        bucket = str(DURATION_BUCKETS[index]) if index < len(DURATION_BUCKETS) else '+Inf'
+        with self._lock:
+            self._pending[_FIELD_SEPARATOR.join(('b', name, label_text, bucket))] += 1
+            self._pending[_FIELD_SEPARATOR.join(('s', name, label_text))] += seconds
+
+    def maybe_flush(self) -> None:
+        interval = settings.METRICS_FLUSH_INTERVAL if self.flush_interval is None else self.flush_interval
+        if time.monotonic() - self._last_flush >= interval:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+
+        key = f"{METRICS_KEY_PREFIX}:{socket.gethostname()}:{os.getpid()}"
+        try:
+            pipe = utils.get_redis_client().pipeline(transaction=False)
+            for field, value in pending.items():
+                pipe.hincrbyfloat(key, field, value)
+            # 已停止的 worker 在一段時間後自動消失
+            pipe.expire(key, settings.METRICS_KEY_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            # 寫入失敗時保留增量，等下一次再試
+            with self._lock:
+                for field, value in pending.items():
+                    self._pending[field] += value
+            logger.warning(f"Failed to flush crawler metrics: {e}")
+
+
+REGISTRY = MetricsRegistry()
+
+
+class DurationHistogram:
+    """
+    以 DURATION_BUCKETS 為上界的計時直方圖，與 Prometheus 匯出的直方圖相同。
+    記憶體與每次記錄的成本都是常數，百分位數在所在的區間內線性內插（同 histogram_quantile）。
+    """
+
+    def __init__(self):
+        # 最後一個是 +Inf 區間
+        self.counts: List[int] = [0] * (len(DURATION_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(DURATION_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """估計的 q 百分位數，不超過實際的最大值"""
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = DURATION_BUCKETS[index - 1] if index else 0.0
+                upper = DURATION_BUCKETS[index] if index < len(DURATION_BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - cumulative) / count, self.max)
+            cumulative += count
+        return self.max
+
+
+class TaskMetrics:
+    """
+    單一任務的指標，計時記入固定區間的直方圖，長時間的任務也不會累積原始數值。
+    以 activate()/deactivate() 設為目前的任務後，inc()、observe()、span() 的紀錄都會記入此任務。
+    """
+
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self.counters: Dict[Tuple[str, LabelSet], float] = defaultdict(float)
+        self.durations: Dict[Tuple[str, LabelSet], DurationHistogram] = defaultdict(DurationHistogram)
+        self.crawler_state: Optional[str] = None
+        self._state_since: Optional[float] = None
+        self._started = time.monotonic()
+        self._token = None
+
+    def activate(self) -> 'TaskMetrics':
+        self._token = _current_task.set(self)
+        return self
+
+    def deactivate(self) -> None:
+        if self._token is not None:
+            _current_task.reset(self._token)
+            self._token = None
+        REGISTRY.flush()
+
+    def state_changed(self, state: str) -> None:
+        """作為 CrawlerCore 的 on_state_change，記錄狀態轉換次數與每個狀態停留的時間"""
+        now = time.monotonic()
+        if self.crawler_state is not None:
+            observe('crawler_state', now - self._state_since, state=self.crawler_state)
+        inc('crawler_state_transitions', state=state)
+        self.crawler_state, self._state_since = state, now
+
+    def _total(self, name: str, **labels) -> float:
+        wanted = set(_label_set(labels))
+        return sum(
+            (histogram.total for (metric, label_set), histogram in self.durations.items()
+             if metric == name and wanted <= set(label_set)),
+            0.0,
+        )
+
+    def summary(self) -> dict:
+        """寫入 Task.result 的摘要"""
+        def key(name: str, labels: LabelSet) -> str:
+            return f"{name}{{{','.join(f'{k}={v}' for k, v in labels)}}}" if labels else name
+
+        spans = {}
+        for (name, labels), histogram in sorted(self.durations.items()):
+            spans[key(name, labels)] = {
+                'count': histogram.count,
+                'total_seconds': round(histogram.total, 3),
+                'p50': round(histogram.quantile(0.5), 3),
+                'p95': round(histogram.quantile(0.95), 3),
+            }
+
+        elapsed = time.monotonic() - self._started
+        submit = self._total('oj_request', endpoint='submit')
+        poll = self._total('oj_request', endpoint='get_submission') + self._total('poll_wait')
+        db = self._total('found_testcase') + self._total('db_flush')
+        crawl = self._total('crawl')
+        summary = {
+            'elapsed_seconds': round(elapsed, 3),
+            'submissions_per_second': round(self.counters[('submissions', ())] / elapsed, 3) if elapsed else 0.0,
+            'counters': {key(name, labels): value for (name, labels), value in sorted(self.counters.items())},
+            'spans': spans,
+        }
+        if crawl:
+            # 解碼時間是爬取總時間扣除提交、輪詢與資料庫寫入後剩下的部分
+            summary['time_split'] = {
+                'submit': round(submit, 3),
+                'poll': round(poll, 3),
+                'db': round(db, 3),
+                'decode': round(max(crawl - submit - poll - db, 0.0), 3),
+            }
+        return summary
+
+
+_current_task: ContextVar[Optional[TaskMetrics]] = ContextVar('crawler_task_metrics', default=None)
+
+
+def current_task_metrics() -> Optional[TaskMetrics]:
+    return _current_task.get()
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    """累加計數器，同時記入 worker 與目前的任務"""
+    label_set = _label_set(labels)
+    REGISTRY.inc(name, value, label_set)
+    task_metrics = _current_task.get()
+    if task_metrics is not None:
+        task_metrics.counters[(name, label_set)] += value
+    REGISTRY.maybe_flush()
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    """記錄一次耗時，同時記入 worker 與目前的任務"""
+    label_set = _label_set(labels)
+    REGISTRY.observe(name, seconds, label_set)
+    task_metrics = _current_task.get()
+    if task_metrics is not None:
+        task_metrics.durations[(name, label_set)].add(seconds)
+    REGISTRY.maybe_flush()
+
+
+@contextmanager
+def span(name: str, **labels) -> Iterator[None]:
+    """計時一段程式碼，例外發生時也會記錄"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        observe(name, time.monotonic() - started, **labels)
+
+
+def render_prometheus() -> str:
+    """讀取所有 worker 行程的指標，依 worker 主機名稱加總後輸出 Prometheus 文字格式"""
+    client = utils.get_redis_client()
+    values: Dict[Tuple[str, str, str, str], float] = defaultdict(float)
+    for key in client.scan_iter(match=f"{METRICS_KEY_PREFIX}:*"):
+        worker = key.split(':')[1]
+        for field, value in client.hgetall(key).items():
+            kind, name, labels, *bucket = field.split(_FIELD_SEPARATOR)
+            worker_label = f'worker="{worker}"' + (f',{labels}' if labels else '')
+            values[(kind, name, worker_label, bucket[0] if bucket else '')] += float(value)
+
+    counters: Dict[str, List[str]] = defaultdict(list)
+    histograms: Dict[str, Dict[str, Dict[str, float]]] = defaultdict(lambda: defaultdict(dict))
+    for (kind, name, labels, bucket), value in sorted(values.items()):
+        if kind == 'c':
+            counters[name].append(f"crawler_{name}_total{{{labels}}} {value:g}")
+        elif kind == 'b':
+            histograms[name][labels][bucket] = value
+        elif kind == 's':
+            histograms[name][labels]['sum'] = value
+
+    lines = []
+    for name, samples in counters.items():
+        lines.append(f"# TYPE crawler_{name}_total counter")
+        lines.extend(samples)
+    for name, series in histograms.items():
+        metric = f"crawler_{name}_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        for labels, buckets in series.items():
+            cumulative = 0.0
+            for upper in [*map(str, DURATION_BUCKETS), '+Inf']:
+                cumulative += buckets.get(upper, 0.0)
+                lines.append(f'{metric}_bucket{{{labels},le="{upper}"}} {cumulative:g}')
+            lines.append(f"{metric}_sum{{{labels}}} {buckets.get('sum', 0.0):g}")
+            lines.append(f"{metric}_count{{{labels}}} {cumulative:g}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2025-08-20 03:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0007_alter_task_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testcase',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
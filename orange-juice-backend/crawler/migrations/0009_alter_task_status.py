@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2025-08-21 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0008_testcase_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='task',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In Progress'), ('SUCCESS', 'Success'), ('FAILURE', 'Failure'), ('PAUSED', 'Paused'), ('CANCELLED', 'Cancelled')], default='PENDING', max_length=20),
+        ),
+    ]
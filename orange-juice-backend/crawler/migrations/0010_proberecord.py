@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2025-08-22 08:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0009_alter_task_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProbeRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField(help_text='此探測在任務中的序號')),
+                ('template_key', models.CharField(help_text="使用的 CrawlerSource 樣板，例如 'get_next_char'", max_length=50)),
+                ('params', models.JSONField(help_text='填入樣板的參數（未經編碼的原始值）')),
+                ('latency_ms', models.PositiveIntegerField(help_text='從提交到取得判題結果的時間')),
+                ('memory_cost', models.IntegerField(null=True)),
+                ('time_cost', models.IntegerField(null=True)),
+                ('result', models.IntegerField(help_text='OJ 判題結果')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='crawler.account')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='probe_records', to='crawler.crawltestcasestask')),
+            ],
+            options={
+                'ordering': ['task', 'seq'],
+                'indexes': [models.Index(fields=['task', 'seq'], name='crawler_pro_task_id_28aa70_idx')],
+            },
+        ),
+    ]
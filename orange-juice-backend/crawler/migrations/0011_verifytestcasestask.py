@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2025-08-25 09:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0010_proberecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerifyTestCasesTask',
+            fields=[
+                ('task_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='crawler.task')),
+                ('header_code', models.TextField(blank=True)),
+                ('footer_code', models.TextField(blank=True)),
+                ('repair', models.BooleanField(default=True, help_text='發現錯誤時是否重新爬取錯誤位置之後的內容')),
+                ('crawler_source', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='crawler.crawlersource')),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crawler.problem')),
+            ],
+            bases=('crawler.task',),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2025-08-27 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0011_verifytestcasestask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crawltestcasestask',
+            name='mode',
+            field=models.CharField(choices=[('FULL', 'Full'), ('INCREMENTAL', 'Incremental')], default='FULL', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='is_stale',
+            field=models.BooleanField(default=False, help_text='增量爬取時發現 judge 上已不存在此測資'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2025-08-29 03:12
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0012_incremental_crawl'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrawlBatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('owner', models.CharField(blank=True, help_text='送出批次的使用者，用於公平分配', max_length=150)),
+                ('priority', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='crawltestcasestask',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tasks', to='crawler.crawlbatch'),
+        ),
+        migrations.AddField(
+            model_name='crawltestcasestask',
+            name='owner',
+            field=models.CharField(blank=True, help_text='送出任務的使用者，用於公平分配', max_length=150),
+        ),
+        migrations.AddField(
+            model_name='crawltestcasestask',
+            name='priority',
+            field=models.IntegerField(default=0, help_text='數字越大越優先'),
+        ),
+        migrations.AddField(
+            model_name='crawltestcasestask',
+            name='estimated_probes',
+            field=models.PositiveIntegerField(blank=True, help_text='建立時預估的探測數，用於讓短任務優先', null=True),
+        ),
+        migrations.AddField(
+            model_name='crawltestcasestask',
+            name='dispatched_at',
+            field=models.DateTimeField(blank=True, help_text='排程器將任務送到 crawl 佇列的時間', null=True),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2025-08-29 09:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0013_crawl_scheduling'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crawltestcasestask',
+            name='shard_count',
+            field=models.PositiveSmallIntegerField(default=1, help_text='將題目切成幾個分片，在不同的 worker 上同時爬取'),
+        ),
+        migrations.AlterField(
+            model_name='proberecord',
+            name='seq',
+            field=models.PositiveIntegerField(help_text='此探測在任務（分散爬取時為分片）中的序號'),
+        ),
+        migrations.CreateModel(
+            name='CrawlShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField()),
+                ('prefix', models.TextField(blank=True)),
+                ('lower', models.PositiveSmallIntegerField()),
+                ('upper', models.PositiveSmallIntegerField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In Progress'), ('SUCCESS', 'Success'), ('FAILURE', 'Failure'), ('PAUSED', 'Paused'), ('CANCELLED', 'Cancelled')], default='PENDING', max_length=20)),
+                ('progress', models.IntegerField(default=0)),
+                ('crawler_state', models.JSONField(blank=True, help_text='此分片的 CrawlerCore 狀態', null=True)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='crawler.crawltestcasestask')),
+            ],
+            options={
+                'ordering': ['task', 'index'],
+                'unique_together': {('task', 'index')},
+            },
+        ),
+        migrations.AddField(
+            model_name='proberecord',
+            name='shard',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='probe_records', to='crawler.crawlshard'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2025-08-30 02:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0014_crawl_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BenchmarkCrawlerSourcesTask',
+            fields=[
+                ('task_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='crawler.task')),
+                ('header_code', models.TextField(blank=True)),
+                ('footer_code', models.TextField(blank=True)),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crawler.problem')),
+            ],
+            bases=('crawler.task',),
+        ),
+        migrations.CreateModel(
+            name='CrawlerSourceBenchmark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latency', models.FloatField(help_text='校正探測從提交到取得結果的時間中位數（秒）', null=True)),
+                ('noise', models.FloatField(help_text='記憶體用量相對於線性模型的殘差標準差，以數值為單位', null=True)),
+                ('usable_radix', models.PositiveSmallIntegerField(default=0, help_text='在雜訊下仍能區分的符號數')),
+                ('bytes_per_second', models.FloatField(default=0)),
+                ('code_size', models.PositiveIntegerField(default=0, help_text='get_next_char 樣板的長度')),
+                ('probes', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('measured_at', models.DateTimeField(auto_now=True)),
+                ('crawler_source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='benchmarks', to='crawler.crawlersource')),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='crawler_source_benchmarks', to='crawler.problem')),
+            ],
+            options={
+                'ordering': ['problem', '-bytes_per_second'],
+                'unique_together': {('problem', 'crawler_source')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2025-08-31 06:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0015_crawler_source_benchmarks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proberecord',
+            name='case_memory_costs',
+            field=models.JSONField(blank=True, help_text='每筆測資的記憶體用量，以 test_case 編號為鍵（只有逐測資探測會保存）', null=True),
+        ),
+        migrations.AlterField(
+            model_name='crawltestcasestask',
+            name='mode',
+            field=models.CharField(choices=[('FULL', 'Full'), ('INCREMENTAL', 'Incremental'), ('PER_CASE', 'Per test case')], default='FULL', max_length=20),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0016_per_case_crawl'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='crawlshard',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In Progress'), ('SUCCESS', 'Success'), ('FAILURE', 'Failure'), ('PAUSED', 'Paused'), ('CANCELLED', 'Cancelled'), ('PREFLIGHT', 'Pre-flight')], default='PENDING', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In Progress'), ('SUCCESS', 'Success'), ('FAILURE', 'Failure'), ('PAUSED', 'Paused'), ('CANCELLED', 'Cancelled'), ('PREFLIGHT', 'Pre-flight')], default='PENDING', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0017_crawl_preflight_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='proberecord',
+            name='params',
+            field=models.JSONField(help_text='填入樣板的參數（未經編碼的原始值）；前綴只保存 prefix_length、prefix_last 與 prefix_hash'),
+        ),
+    ]
@@ -24,7 +24,9 @@ class CrawlerSource(models.Model):
 class TestCase(models.Model):
     problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='test_cases')
     content = models.TextField()
+    is_stale = models.BooleanField(default=False, help_text="增量爬取時發現 judge 上已不存在此測資")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
 class Account(models.Model):
     class Status(models.TextChoices):
@@ -48,6 +50,9 @@ class Task(models.Model):
         SUCCESS = 'SUCCESS', 'Success'
         FAILURE = 'FAILURE', 'Failure'
         PAUSED = 'PAUSED', 'Paused'
+        CANCELLED = 'CANCELLED', 'Cancelled'
+        # 爬取任務的樣板預檢尚未完成，排程器不會派送
+        PREFLIGHT = 'PREFLIGHT', 'Pre-flight'
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
@@ -60,23 +65,145 @@ class Task(models.Model):
         return f"Task {self.id} ({self.status})"
 
 
+class CrawlBatch(models.Model):
+    """一次送出的多個爬取任務，例如整場比賽的題目"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=255, blank=True)
+    owner = models.CharField(max_length=150, blank=True, help_text="送出批次的使用者，用於公平分配")
+    priority = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Crawl Batch {self.name or self.id}"
+
+
 # 2. 具體的任務模型，直接繼承自 Task
 class CrawlTestCasesTask(Task):
+    class Mode(models.TextChoices):
+        FULL = 'FULL', 'Full'
+        # 只爬取新的或變動過的測資，並將已不存在的測資標記為過期
+        INCREMENTAL = 'INCREMENTAL', 'Incremental'
+        # judge 回報每筆測資的統計資料時，一次提交讀取所有測資同一個位置的字元
+        PER_CASE = 'PER_CASE', 'Per test case'
+
     # CrawlTask 專屬的欄位
     problem = models.ForeignKey(Problem, on_delete=models.CASCADE)
     crawler_source = models.ForeignKey(CrawlerSource, on_delete=models.PROTECT)
     header_code = models.TextField(blank=True)
     footer_code = models.TextField(blank=True)
+    mode = models.CharField(max_length=20, choices=Mode.choices, default=Mode.FULL)
     # 新增此欄位來儲存 CrawlerCore 的狀態
     crawler_state = models.JSONField(null=True, blank=True, help_text="儲存 CrawlerCore 的執行狀態，以便中斷後恢復")
 
+    # 排程相關欄位
+    batch = models.ForeignKey(CrawlBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='tasks')
+    owner = models.CharField(max_length=150, blank=True, help_text="送出任務的使用者，用於公平分配")
+    priority = models.IntegerField(default=0, help_text="數字越大越優先")
+    estimated_probes = models.PositiveIntegerField(null=True, blank=True, help_text="建立時預估的探測數，用於讓短任務優先")
+    dispatched_at = models.DateTimeField(null=True, blank=True, help_text="排程器將任務送到 crawl 佇列的時間")
+    shard_count = models.PositiveSmallIntegerField(default=1, help_text="將題目切成幾個分片，在不同的 worker 上同時爬取")
+
     def __str__(self):
         return f"Crawl Task for {self.problem.oj_display_id}"
 
 
+class CrawlShard(models.Model):
+    """
+    分散爬取時，一個爬取任務中的一段字典序範圍：
+    以 prefix 開頭、且下一個字元落在 [lower, upper) 的測資（字元 0 代表測資在 prefix 處結束）。
+    """
+    task = models.ForeignKey(CrawlTestCasesTask, on_delete=models.CASCADE, related_name='shards')
+    index = models.PositiveSmallIntegerField()
+    prefix = models.TextField(blank=True)
+    lower = models.PositiveSmallIntegerField()
+    upper = models.PositiveSmallIntegerField()
+    status = models.CharField(max_length=20, choices=Task.Status.choices, default=Task.Status.PENDING)
+    progress = models.IntegerField(default=0)
+    crawler_state = models.JSONField(null=True, blank=True, help_text="此分片的 CrawlerCore 狀態")
+    result = models.JSONField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['task', 'index']
+        unique_together = [('task', 'index')]
+
+    def __str__(self):
+        return f"Shard #{self.index} of task {self.task_id} ({self.status})"
+
+
+class VerifyTestCasesTask(Task):
+    # 以 checksum 探測驗證已儲存的測資，並修復錯誤的部分
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE)
+    crawler_source = models.ForeignKey(CrawlerSource, on_delete=models.PROTECT)
+    header_code = models.TextField(blank=True)
+    footer_code = models.TextField(blank=True)
+    repair = models.BooleanField(default=True, help_text="發現錯誤時是否重新爬取錯誤位置之後的內容")
+
+    def __str__(self):
+        return f"Verify Task for {self.problem.oj_display_id}"
+
+
+class BenchmarkCrawlerSourcesTask(Task):
+    # 以校正探測量測題目可用的每個 CrawlerSource，找出傳輸最快的版本
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE)
+    header_code = models.TextField(blank=True)
+    footer_code = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Benchmark Crawler Sources Task for {self.problem.oj_display_id}"
+
+
+class CrawlerSourceBenchmark(models.Model):
+    """
+    CrawlerSource 在某一題上的量測結果，每題每個 CrawlerSource 只保留最新的一筆。
+    """
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='crawler_source_benchmarks')
+    crawler_source = models.ForeignKey(CrawlerSource, on_delete=models.CASCADE, related_name='benchmarks')
+    latency = models.FloatField(null=True, help_text="校正探測從提交到取得結果的時間中位數（秒）")
+    noise = models.FloatField(null=True, help_text="記憶體用量相對於線性模型的殘差標準差，以數值為單位")
+    usable_radix = models.PositiveSmallIntegerField(default=0, help_text="在雜訊下仍能區分的符號數")
+    bytes_per_second = models.FloatField(default=0)
+    code_size = models.PositiveIntegerField(default=0, help_text="get_next_char 樣板的長度")
+    probes = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    measured_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['problem', '-bytes_per_second']
+        unique_together = [('problem', 'crawler_source')]
+
+    def __str__(self):
+        return f"{self.crawler_source} on {self.problem.oj_display_id}: {self.bytes_per_second:.3f} B/s"
+
+
 class CreateAccountsTask(Task):
     # CreateAccountsTask 專屬的欄位
     quantity = models.PositiveIntegerField()
     
     def __str__(self):
-        return f"Create {self.quantity} Accounts Task"
\ No newline at end of file
+        return f"Create {self.quantity} Accounts Task"
+
+class ProbeRecord(models.Model):
+    """
+    爬蟲每一次探測的原始紀錄（僅新增，不修改）。
+    保留 memory_cost 等原始讀數，以便之後用不同的校正參數離線重新解碼。
+    """
+    task = models.ForeignKey(CrawlTestCasesTask, on_delete=models.CASCADE, related_name='probe_records')
+    shard = models.ForeignKey(CrawlShard, on_delete=models.CASCADE, null=True, blank=True, related_name='probe_records')
+    seq = models.PositiveIntegerField(help_text="此探測在任務（分散爬取時為分片）中的序號")
+    template_key = models.CharField(max_length=50, help_text="使用的 CrawlerSource 樣板，例如 'get_next_char'")
+    params = models.JSONField(help_text="填入樣板的參數（未經編碼的原始值）；前綴只保存 prefix_length、prefix_last 與 prefix_hash")
+    account = models.ForeignKey(Account, on_delete=models.SET_NULL, null=True, blank=True)
+    latency_ms = models.PositiveIntegerField(help_text="從提交到取得判題結果的時間")
+    memory_cost = models.IntegerField(null=True)
+    case_memory_costs = models.JSONField(null=True, blank=True, help_text="每筆測資的記憶體用量，以 test_case 編號為鍵（只有逐測資探測會保存）")
+    time_cost = models.IntegerField(null=True)
+    result = models.IntegerField(help_text="OJ 判題結果")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['task', 'seq']
+        indexes = [models.Index(fields=['task', 'seq'])]
+
+    def __str__(self):
+        return f"Probe #{self.seq} of task {self.task_id} ({self.template_key})"
@@ -0,0 +1,271 @@
+"""
+爬取任務派送前的預檢，由 crawler.tasks.preflight_crawl_task 在 CRAWL_PREFLIGHT_QUEUE 的 worker 上執行。
+
+樣板或 header_code / footer_code 寫錯時，要等 judge 回傳 CE / RE 才會發現，
+每次探測還會重試數次，白白消耗 judge 的資源與帳號的紀錄。預檢以兩組不同的範例參數填入每個樣板，
+確認探測確實隨每個參數改變；語言在本機有編譯器或直譯器時（C、C++、Python），
+另外以合成的輸入實際執行探測，確認 get_number 的記憶體用量隨數值遞增。
+
+探測含有請求中的 header_code 與 footer_code，編譯與執行都在 CRAWL_PREFLIGHT_SANDBOX 設定的沙箱
+（nsjail、bwrap 或拋棄式容器）中進行，資源限制只是額外的保護；沒有設定沙箱時只檢查樣板。
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import redis
+from django.conf import settings
+
+from .core.alphabet import ALPHABET_TEMPLATE, alphabet_of, choose_symbol_code
+from .core.crawler_core import BRANCH_TEMPLATE, CALIBRATION_NUMBERS, PAIR_TEMPLATE, SYMBOLS_TEMPLATE
+from .core.verifier import CHECKSUM_MODULUS
+from .models import CrawlerSource, Problem
+from .tasks import CrawlTestCasesSubmitter
+from . import utils
+
+logger = logging.getLogger(__name__)
+
+# 本機執行探測時的 judge 輸入，與範例參數中的前綴一致
+SYNTHETIC_INPUT = '3\n1 2 3\n'
+SAMPLE_PREFIX = '3\n1'
+# 每個樣板的範例參數，與 CrawlTestCasesSubmitter 實際傳入的參數相同；不在此表中的樣板不會被使用，不需檢查
+SAMPLE_PARAMS: Dict[str, dict] = {
+    'get_number': {'number': 0},
+    'get_next_char': {'prefix': SAMPLE_PREFIX, 'limit': 256},
+    'get_prefix_length_length': {'prefix': SAMPLE_PREFIX},
+    'get_prefix_length': {'prefix': SAMPLE_PREFIX, 'length_prefix': 0, 'position': 0},
+    BRANCH_TEMPLATE: {'prefix': SAMPLE_PREFIX, 'limit': 256, 'branch_radix': 256},
+    PAIR_TEMPLATE: {'prefix': SAMPLE_PREFIX, 'limit': 256},
+    SYMBOLS_TEMPLATE: {'prefix': SAMPLE_PREFIX, 'limit': 256, **choose_symbol_code(alphabet_of([SYNTHETIC_INPUT])).params()},
+    ALPHABET_TEMPLATE: {'limit': 256},
+    'get_prefix_checksum': {'anchor': SAMPLE_PREFIX, 'length': len(SYNTHETIC_INPUT), 'checksum_modulus': CHECKSUM_MODULUS},
+    'get_length_bits': {},
+    'has_case': {'fingerprint': 0},
+    'has_unknown_case': {'fingerprints': [0]},
+    'get_char_at': {'position': 0},
+}
+
+# 樣板可以不使用的參數：沒有 {checksum_modulus} 時只以預設的模數驗證，合併探測可以寫死與 CRAWL_BRANCH_RADIX 相同的進位數
+OPTIONAL_PARAMS: Dict[str, Tuple[str, ...]] = {
+    'get_prefix_checksum': ('checksum_modulus',),
+    BRANCH_TEMPLATE: ('branch_radix',),
+}
+
+# 語言 -> (原始碼副檔名, 編譯指令)；編譯指令為 None 的語言直接以直譯器執行 probe.<副檔名>
+LOCAL_TOOLCHAINS: Dict[str, Tuple[str, Optional[List[str]]]] = {
+    'C': ('c', ['gcc', '-O2', '-o', 'probe', 'probe.c', '-lm']),
+    'C++': ('cpp', ['g++', '-O2', '-std=c++17', '-o', 'probe', 'probe.cpp']),
+    'Python': ('py', None),
+    'Python3': ('py', None),
+}
+# 以 worker 本身的直譯器執行 Python 探測；pyenv 等的 shim 會先執行其他行程，wait4 量到的是它們的記憶體
+PYTHON_INTERPRETER = sys.executable
+# 在 fork 出的子行程中設定資源上限（CPU 秒數、位址空間、輸出檔案大小）後執行指令，印出它的最大常駐記憶體（KB）與結束狀態。
+# Linux 的 ru_maxrss 會沿用 fork 時父行程的記憶體用量，直接由 worker fork 時每個讀數都至少是 worker 的大小；
+# 由這個很小的直譯器 fork，讀數的下限只有數 MB。
+# 資源上限在這裡設定而不是用 Popen 的 preexec_fn：預檢以多個執行緒同時啟動行程，preexec_fn 在多執行緒的行程中並不安全
+LAUNCHER = """
+import os, resource, sys
+cpu, memory, output = map(int, sys.argv[1:4])
+pid = os.fork()
+if pid == 0:
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (output, output))
+    os.dup2(os.open(os.devnull, os.O_WRONLY), 1)
+    os.execvp(sys.argv[4], sys.argv[4:])
+_, status, usage = os.wait4(pid, 0)
+print(usage.ru_maxrss, os.waitstatus_to_exitcode(status))
+"""
+# 本機讀數的誤差（KB）：讀數可以比前一個讀數少這麼多，最大與最小數值的讀數至少要差這麼多；
+# 小於 launcher 下限的讀數彼此相同，所以只要求整體遞增
+MONOTONIC_TOLERANCE = 1024
+# 本機執行探測的資源上限
+LOCAL_MEMORY_LIMIT = 2 * 1024 ** 3
+LOCAL_OUTPUT_LIMIT = 16 * 1024 ** 2
+
+# 通過預檢的樣板組合（以語言、樣板與 header / footer 的雜湊為鍵），同一批次的多個任務不需重複編譯
+PREFLIGHT_KEY_PREFIX = "preflight"
+PREFLIGHT_CACHE_TTL = 24 * 60 * 60
+
+
+class PreflightError(Exception):
+    """樣板無法使用，訊息說明原因"""
+
+
+def _parse_launcher_output(output: bytes, name: str) -> Tuple[int, int]:
+    """LAUNCHER 印出的 (最大常駐記憶體, 結束狀態)；超過 RLIMIT_CPU 等被訊號結束時結束狀態為負的訊號編號"""
+    try:
+        memory, returncode = map(int, output.split())
+    except ValueError:
+        # launcher 本身被結束（例如沙箱的限制）時沒有輸出
+        raise PreflightError(f"Template '{name}' was killed before the launcher reported its result.")
+    return memory, returncode
+
+
+class LocalRunner:
+    """在沙箱內的暫存目錄中編譯並執行一支探測程式，回傳最大常駐記憶體（KB）"""
+
+    def __init__(self, language: str, sandbox: List[str]):
+        self.extension, self.compile_command = LOCAL_TOOLCHAINS[language]
+        self.sandbox = sandbox
+
+    @classmethod
+    def for_language(cls, language: str) -> Optional['LocalRunner']:
+        """沒有設定沙箱，或本機沒有此語言的編譯器或直譯器時回傳 None"""
+        if not settings.CRAWL_PREFLIGHT_SANDBOX or language not in LOCAL_TOOLCHAINS:
+            return None
+        _, compile_command = LOCAL_TOOLCHAINS[language]
+        tool = compile_command[0] if compile_command else PYTHON_INTERPRETER
+        return cls(language, list(settings.CRAWL_PREFLIGHT_SANDBOX)) if shutil.which(tool) else None
+
+    def _sandboxed(self, command: List[str], directory: str) -> List[str]:
+        return [arg.replace('{workdir}', directory) for arg in self.sandbox] + command
+
+    def _launch(self, command: List[str], directory: str, timeout: int, stdin: bytes = b'', stderr=subprocess.DEVNULL) -> Tuple[bytes, Optional[bytes]]:
+        """
+        在沙箱內以 LAUNCHER 執行 command，CPU 秒數的上限與 timeout 相同；回傳 LAUNCHER 的輸出與 command 的 stderr（stderr 為 PIPE 時）。
+        超時時結束整個行程群組（command 在 launcher 的子行程中執行）並拋出 subprocess.TimeoutExpired。
+        """
+        limits = [str(timeout), str(LOCAL_MEMORY_LIMIT), str(LOCAL_OUTPUT_LIMIT)]
+        process = subprocess.Popen(
+            self._sandboxed([sys.executable, '-S', '-I', '-c', LAUNCHER, *limits, *command], directory),
+            cwd=directory, env={'PATH': os.environ.get('PATH', '')},
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr, start_new_session=True,
+        )
+        try:
+            return process.communicate(stdin, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.communicate()
+            raise
+
+    def run(self, code: str, name: str) -> int:
+        timeout = settings.CRAWL_PREFLIGHT_TIMEOUT
+        with tempfile.TemporaryDirectory(prefix='preflight-') as directory:
+            with open(os.path.join(directory, f'probe.{self.extension}'), 'w', encoding='utf-8') as f:
+                f.write(code)
+            if self.compile_command:
+                try:
+                    output, errors = self._launch(self.compile_command, directory, timeout, stderr=subprocess.PIPE)
+                except subprocess.TimeoutExpired:
+                    raise PreflightError(f"Template '{name}' did not compile within {timeout} seconds.")
+                _, returncode = _parse_launcher_output(output, name)
+                if returncode != 0:
+                    raise PreflightError(f"Template '{name}' does not compile: {errors.decode(errors='replace').strip()[:500]}")
+                command = ['./probe']
+            else:
+                command = [PYTHON_INTERPRETER, f'probe.{self.extension}']
+            return self._execute(command, directory, name, timeout)
+
+    def _execute(self, command: List[str], directory: str, name: str, timeout: int) -> int:
+        try:
+            output, _ = self._launch(command, directory, timeout, SYNTHETIC_INPUT.encode('latin-1'))
+        except subprocess.TimeoutExpired:
+            raise PreflightError(f"Template '{name}' did not finish within {timeout} seconds on a sample input.")
+        memory, returncode = _parse_launcher_output(output, name)
+        if returncode != 0:
+            raise PreflightError(f"Template '{name}' exited with status {returncode} on a sample input.")
+        return memory
+
+
+def _other_value(value):
+    """與範例參數不同、型別相同的值；字串保持相同長度，改變最後一個位元組"""
+    if isinstance(value, str):
+        return value[:-1] + chr(ord(value[-1]) ^ 1) if value else '0'
+    if isinstance(value, list):
+        return [*value, 1]
+    return value + 1
+
+
+def _render(submitter: CrawlTestCasesSubmitter, name: str, params: dict) -> str:
+    try:
+        return submitter._render(name, params)
+    except KeyError as e:
+        raise PreflightError(f"Template '{name}' has an unknown placeholder {{{e.args[0]}}}.")
+    except (IndexError, ValueError) as e:
+        raise PreflightError(f"Template '{name}' is not a valid format string: {e}.")
+
+
+def _render_all(submitter: CrawlTestCasesSubmitter) -> Dict[str, str]:
+    """
+    以範例參數填入每個樣板，回傳 樣板 -> 完整的程式碼（含 header 與 footer）。
+    每個參數另外換成不同的值再填入一次，程式碼沒有改變代表樣板沒有使用這個參數
+    （例如寫成跳脫的 {{limit}}），每次探測都會得到相同的答案。
+    header / footer 不是樣板，其中的大括號是程式碼的一部分，不做檢查。
+    """
+    codes = {}
+    for name, params in SAMPLE_PARAMS.items():
+        if name not in submitter.codes:
+            continue
+        code = _render(submitter, name, params)
+        unused = [
+            param for param, value in params.items()
+            if param not in OPTIONAL_PARAMS.get(name, ()) and _render(submitter, name, {**params, param: _other_value(value)}) == code
+        ]
+        if unused:
+            raise PreflightError(f"Template '{name}' does not use {', '.join(f'{{{param}}}' for param in unused)}, the probe would be the same for every value.")
+        codes[name] = submitter._add_header_and_footer_code(code)
+    return codes
+
+
+def _run_locally(runner: LocalRunner, submitter: CrawlTestCasesSubmitter, codes: Dict[str, str]) -> None:
+    """執行每個樣板一次，並以 CrawlerCore 校正用的數值確認 get_number 的記憶體用量隨數值遞增"""
+    numbers = list(CALIBRATION_NUMBERS)
+    if BRANCH_TEMPLATE in codes:
+        numbers.append(settings.CRAWL_BRANCH_RADIX + 255)
+    jobs = [(name, code) for name, code in codes.items() if name != 'get_number']
+    if 'get_number' in codes:
+        jobs += [
+            (f'get_number({number})', submitter._add_header_and_footer_code(submitter._render('get_number', {'number': number})))
+            for number in numbers
+        ]
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+        memory = dict(zip((name for name, _ in jobs), executor.map(lambda job: runner.run(job[1], job[0]), jobs)))
+    if 'get_number' not in codes:
+        return
+    readings = [memory[f'get_number({number})'] for number in numbers]
+    if readings[-1] <= readings[0] + MONOTONIC_TOLERANCE or any(low > high + MONOTONIC_TOLERANCE for low, high in zip(readings, readings[1:])):
+        pairs = ', '.join(f'{number}: {reading} KB' for number, reading in zip(numbers, readings))
+        raise PreflightError(f"Memory use of 'get_number' does not grow with the number ({pairs}).")
+
+
+def _cache_key(crawler_source: CrawlerSource, header_code: str, footer_code: str) -> str:
+    payload = json.dumps([crawler_source.language, crawler_source.code, header_code, footer_code], sort_keys=True)
+    return f"{PREFLIGHT_KEY_PREFIX}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def preflight_source(crawler_source: CrawlerSource, problem: Problem, header_code: str, footer_code: str) -> Optional[str]:
+    """
+    檢查 crawler_source 的樣板與 header / footer 能否產生可用的探測，回傳錯誤訊息；通過時回傳 None。
+    沒有設定沙箱或本機沒有該語言的工具時只檢查樣板。
+    """
+    key = _cache_key(crawler_source, header_code, footer_code)
+    try:
+        if utils.get_redis_client().exists(key):
+            return None
+    except redis.RedisError as e:
+        logger.warning(f"Failed to read preflight cache: {e}")
+
+    submitter = CrawlTestCasesSubmitter([], crawler_source, problem, header_code, footer_code)
+    try:
+        codes = _render_all(submitter)
+        runner = LocalRunner.for_language(crawler_source.language)
+        if runner is not None:
+            _run_locally(runner, submitter, codes)
+    except PreflightError as e:
+        return f"Crawler source '{crawler_source.name}' failed pre-flight: {e}"
+
+    try:
+        utils.get_redis_client().set(key, 1, ex=PREFLIGHT_CACHE_TTL)
+    except redis.RedisError as e:
+        logger.warning(f"Failed to write preflight cache: {e}")
+    return None
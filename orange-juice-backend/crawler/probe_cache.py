@@ -0,0 +1,86 @@
+"""
+以提交的完整程式碼為鍵的探測結果快取，所有 worker 共用同一份 Redis 資料。
+
+重試、恢復任務與重新爬取同一題時會提交與之前位元組完全相同的探測（例如校正的 get_number
+與前幾個字元的 get_next_char），已經知道結果的探測不需要再交給 judge。
+結果在 CRAWL_PROBE_CACHE_TTL 秒後過期（judge 上的測資可能被修改），
+項目數超過 CRAWL_PROBE_CACHE_MAX_ENTRIES 時淘汰最久沒有使用的項目。
+偵測測資變動的探測（增量模式）的答案正是要反映目前的測資，不使用快取。
+"""
+import hashlib
+import json
+import logging
+import time
+from typing import Optional
+
+import redis
+from django.conf import settings
+
+from . import utils
+from .clients.oj_client import Result
+
+logger = logging.getLogger(__name__)
+
+PROBE_CACHE_KEY_PREFIX = "probe-cache"
+# 以最後使用時間為分數的 sorted set，用於 LRU 淘汰
+PROBE_CACHE_LRU_KEY = f"{PROBE_CACHE_KEY_PREFIX}:lru"
+# 探測程式正常結束時的判題結果；編譯錯誤、執行錯誤與系統錯誤的記憶體用量不是探測的讀數
+CACHEABLE_RESULTS = frozenset({Result.AC, Result.WA, Result.PAC})
+
+
+class ProbeResultCache:
+    """
+    一個題目與語言的探測結果。Redis 無法使用時視為沒有快取，探測照常提交。
+    同時量測雜訊的探測（例如重複的校正探測）不應使用快取，否則會讀到同一個讀數。
+    """
+
+    def __init__(self, problem_id: int, language: str, ttl: Optional[int] = None, max_entries: Optional[int] = None):
+        self.problem_id = problem_id
+        self.language = language
+        self.ttl = settings.CRAWL_PROBE_CACHE_TTL if ttl is None else ttl
+        self.max_entries = settings.CRAWL_PROBE_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+
+    def key(self, code: str) -> str:
+        digest = hashlib.sha256(f"{self.problem_id}\0{self.language}\0{code}".encode()).hexdigest()
+        return f"{PROBE_CACHE_KEY_PREFIX}:{digest}"
+
+    def get(self, code: str) -> Optional[dict]:
+        """code（含 header 與 footer）的判題結果；沒有快取或已過期時回傳 None"""
+        key = self.key(code)
+        try:
+            client = utils.get_redis_client()
+            value = client.get(key)
+            pipe = client.pipeline(transaction=False)
+            if value is None:
+                # 已過期的項目不需要再參與淘汰
+                pipe.zrem(PROBE_CACHE_LRU_KEY, key)
+            else:
+                pipe.zadd(PROBE_CACHE_LRU_KEY, {key: time.time()})
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Failed to read probe cache: {e}")
+            return None
+        return json.loads(value) if value is not None else None
+
+    def put(self, code: str, result: dict) -> None:
+        """保存判題結果；過期時間從判題完成時起算，之後讀取不會延長"""
+        key = self.key(code)
+        try:
+            client = utils.get_redis_client()
+            pipe = client.pipeline(transaction=False)
+            pipe.set(key, json.dumps(result), ex=self.ttl)
+            pipe.zadd(PROBE_CACHE_LRU_KEY, {key: time.time()})
+            pipe.zcard(PROBE_CACHE_LRU_KEY)
+            size = pipe.execute()[-1]
+            if size > self.max_entries:
+                evicted = [member for member, _ in client.zpopmin(PROBE_CACHE_LRU_KEY, size - self.max_entries)]
+                client.delete(*evicted)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to write probe cache: {e}")
+
+
+def probe_cache_for(problem_id: int, language: str) -> Optional[ProbeResultCache]:
+    """CRAWL_PROBE_CACHE_TTL 為 0 時不使用快取"""
+    if settings.CRAWL_PROBE_CACHE_TTL <= 0:
+        return None
+    return ProbeResultCache(problem_id, language)
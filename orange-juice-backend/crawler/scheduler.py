@@ -0,0 +1,134 @@
+"""
+爬取任務的排程：決定同時執行多少個爬取任務，以及下一個要派送的任務。
+
+- 同時執行的數量受限於 crawl 佇列的 worker 數與可用帳號數：一般任務佔用一個 worker 與 ACCOUNTS_PER_CRAWL_TASK 個帳號，
+  分散爬取的任務佔用 shard_count 個 worker 與 shard_count × ACCOUNTS_PER_CRAWL_SHARD 個帳號。
+- priority 較高者優先；等待越久有效優先權越高，避免低優先權的任務永遠等不到。
+- 優先權相同時，目前執行中任務較少的使用者優先，讓帳號與 judge 的容量在使用者之間公平分配。
+- 再相同時，預估探測數較少的任務優先，讓短任務不會被長任務擋住。
+- 驗證與量測任務不經排程器、直接送到 crawl 佇列，尚未結束時同樣佔用 worker 與帳號。
+- worker 意外終止時任務會停在 IN_PROGRESS；心跳（updated_at）超過 CRAWL_HEARTBEAT_TIMEOUT 沒有更新的任務視為已終止，
+  由 schedule_crawls 標記為失敗並釋出名額。schedule_crawls 也由 Celery beat 定期執行，不只依賴任務結束時的觸發。
+"""
+import math
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+from .models import Account, BenchmarkCrawlerSourcesTask, CrawlShard, CrawlTestCasesTask, Task, VerifyTestCasesTask
+
+# 尚未結束、佔用 crawl 佇列 worker 的狀態
+ACTIVE_STATUSES = [Task.Status.PENDING, Task.Status.IN_PROGRESS]
+# 直接送到 crawl 佇列、不經排程器的任務
+UNSCHEDULED_CRAWL_QUEUE_MODELS = (VerifyTestCasesTask, BenchmarkCrawlerSourcesTask)
+
+
+def running_crawls() -> QuerySet:
+    """已派送但尚未結束的爬取任務"""
+    return CrawlTestCasesTask.objects.filter(
+        dispatched_at__isnull=False,
+        status__in=[Task.Status.PENDING, Task.Status.IN_PROGRESS],
+    )
+
+
+def pending_crawls() -> QuerySet:
+    """等待排程的爬取任務"""
+    return CrawlTestCasesTask.objects.filter(dispatched_at__isnull=True, status=Task.Status.PENDING)
+
+
+def unscheduled_crawl_queue_tasks() -> List[Task]:
+    """尚未結束的驗證與量測任務，與爬取任務共用 crawl 佇列的 worker"""
+    return [task for model in UNSCHEDULED_CRAWL_QUEUE_MODELS for task in model.objects.filter(status__in=ACTIVE_STATUSES)]
+
+
+def stale_tasks(now: datetime) -> List[Task]:
+    """
+    心跳超過 CRAWL_HEARTBEAT_TIMEOUT 沒有更新的 IN_PROGRESS 任務。WriteBehindBuffer 每次寫回都會更新 updated_at。
+    分散爬取的任務由分片回報心跳（見 stale_shards），還有分片尚未結束時不算過期。
+    """
+    cutoff = now - timedelta(seconds=settings.CRAWL_HEARTBEAT_TIMEOUT)
+    crawls = CrawlTestCasesTask.objects.filter(status=Task.Status.IN_PROGRESS, updated_at__lt=cutoff).exclude(shards__status__in=ACTIVE_STATUSES)
+    others = [task for model in UNSCHEDULED_CRAWL_QUEUE_MODELS for task in model.objects.filter(status=Task.Status.IN_PROGRESS, updated_at__lt=cutoff)]
+    return list(crawls) + others
+
+
+def stale_shards(now: datetime) -> QuerySet:
+    """心跳超過 CRAWL_HEARTBEAT_TIMEOUT 沒有更新的 IN_PROGRESS 分片"""
+    cutoff = now - timedelta(seconds=settings.CRAWL_HEARTBEAT_TIMEOUT)
+    return CrawlShard.objects.filter(status=Task.Status.IN_PROGRESS, updated_at__lt=cutoff)
+
+
+def is_sharded(task: Task) -> bool:
+    return isinstance(task, CrawlTestCasesTask) and task.shard_count > 1 and task.mode == CrawlTestCasesTask.Mode.FULL
+
+
+def workers_needed(task: Task) -> int:
+    """任務執行時佔用的 worker 數，分片多於 worker 數時其餘分片在佇列中等待"""
+    if is_sharded(task):
+        return min(task.shard_count, settings.CRAWL_MAX_CONCURRENT_TASKS)
+    return 1
+
+
+def accounts_needed(task: Task) -> int:
+    """任務執行時租用的帳號數"""
+    if not isinstance(task, CrawlTestCasesTask):
+        # 驗證與量測任務
+        return settings.ACCOUNTS_PER_VERIFY_TASK
+    if is_sharded(task):
+        return workers_needed(task) * settings.ACCOUNTS_PER_CRAWL_SHARD
+    return settings.ACCOUNTS_PER_CRAWL_TASK
+
+
+def crawl_slots(running: List[Task]) -> int:
+    """執行中的任務之外還有幾個 worker 可用"""
+    return settings.CRAWL_MAX_CONCURRENT_TASKS - sum(workers_needed(task) for task in running)
+
+
+def available_accounts(running: List[Task]) -> int:
+    """執行中的任務之外還有幾個帳號可租用"""
+    usable_accounts = Account.objects.filter(status__in=[Account.Status.ACTIVE, Account.Status.IN_USE]).count()
+    return usable_accounts - sum(accounts_needed(task) for task in running)
+
+
+def effective_priority(task: CrawlTestCasesTask, now: datetime) -> int:
+    waited = (now - task.created_at).total_seconds()
+    return task.priority + int(waited // settings.CRAWL_PRIORITY_AGING_SECONDS)
+
+
+def pick_next(pending: List[CrawlTestCasesTask], running: List[CrawlTestCasesTask], slots: int, now: datetime,
+              accounts: float = math.inf) -> List[CrawlTestCasesTask]:
+    """
+    從 pending 中依序選出要派送的任務，每個任務佔用 workers_needed() 個 worker 與 accounts_needed() 個帳號，
+    總數不超過 slots 個 worker 與 accounts 個帳號。
+    排在最前面的任務容納不下時就停止，不讓後面較小的任務插隊，大任務才不會一直等不到名額。
+    沒有任何任務執行時，帳號不足仍派送一個任務，讓帳號不足的錯誤反映在任務結果上。
+    同一題不會同時執行兩個任務。
+    """
+    running_by_owner = Counter(task.owner for task in running)
+    busy_problems = {task.problem_id for task in running}
+    candidates = list(pending)
+    picked = []
+
+    while candidates and slots > 0:
+        candidates = [task for task in candidates if task.problem_id not in busy_problems]
+        if not candidates:
+            break
+        task = min(candidates, key=lambda task: (
+            -effective_priority(task, now),
+            running_by_owner[task.owner],
+            task.estimated_probes if task.estimated_probes is not None else math.inf,
+            task.created_at,
+        ))
+        idle = not running and not picked
+        if workers_needed(task) > slots or (accounts_needed(task) > accounts and not idle):
+            break
+        candidates.remove(task)
+        picked.append(task)
+        slots -= workers_needed(task)
+        accounts -= accounts_needed(task)
+        running_by_owner[task.owner] += 1
+        busy_problems.add(task.problem_id)
+    return picked
@@ -12,6 +12,26 @@ class CrawlerSourceSerializer(serializers.ModelSerializer):
         fields = ['id', 'name']
 
 class TestCaseSerializer(serializers.ModelSerializer):
+    # 當查詢帶有 truncate 參數時，content 只會是資料庫端截斷後的前綴
+    content = serializers.SerializerMethodField()
+    content_length = serializers.SerializerMethodField()
+    truncated = serializers.SerializerMethodField()
+
     class Meta:
         model = TestCase
-        fields = ['id', 'content', 'created_at']
\ No newline at end of file
+        fields = ['id', 'content', 'content_length', 'truncated', 'is_stale', 'created_at']
+
+    def get_content(self, obj):
+        if hasattr(obj, 'content_preview'):
+            return obj.content_preview
+        return obj.content
+
+    def get_content_length(self, obj):
+        if hasattr(obj, 'content_length'):
+            return obj.content_length
+        return len(obj.content)
+
+    def get_truncated(self, obj):
+        if not hasattr(obj, 'content_preview'):
+            return False
+        return len(obj.content_preview) < obj.content_length
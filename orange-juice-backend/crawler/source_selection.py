@@ -0,0 +1,32 @@
+"""
+以已快取的量測結果為題目挑選傳輸最快的 CrawlerSource。
+"""
+from datetime import timedelta
+from typing import List, Optional
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .models import CrawlerSource, CrawlerSourceBenchmark, Problem
+
+
+def candidate_sources(problem: Problem) -> List[CrawlerSource]:
+    """語言在題目 allowed_languages 中的 CrawlerSource"""
+    return list(CrawlerSource.objects.filter(language__in=problem.allowed_languages).order_by('id'))
+
+
+def fresh_benchmarks(problem: Problem) -> QuerySet:
+    """尚未過期（CRAWLER_SOURCE_BENCHMARK_TTL 內）且語言仍被允許的量測結果，最快的在前"""
+    since = timezone.now() - timedelta(seconds=settings.CRAWLER_SOURCE_BENCHMARK_TTL)
+    return CrawlerSourceBenchmark.objects.filter(
+        problem=problem,
+        measured_at__gte=since,
+        crawler_source__language__in=problem.allowed_languages,
+    ).select_related('crawler_source').order_by('-bytes_per_second', 'code_size')
+
+
+def recommend_source(problem: Problem) -> Optional[CrawlerSource]:
+    """每秒傳輸位元組數最高的 CrawlerSource；沒有可用的量測結果時回傳 None"""
+    best = fresh_benchmarks(problem).filter(error='', bytes_per_second__gt=0).first()
+    return best.crawler_source if best else None
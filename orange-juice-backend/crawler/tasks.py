@@ -1,122 +1,433 @@
 import json
 import logging
+import math
 import time
-from typing import List, Tuple, Dict
+from collections import Counter
+from typing import List, Tuple, Dict, Optional
 from celery import shared_task
 from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
 # 新增 dataclasses.asdict 用於序列化
-from dataclasses import asdict
-from .models import Account, Task, TestCase, Problem, CrawlTestCasesTask, CreateAccountsTask, CrawlerSource
+from dataclasses import asdict, dataclass
+from .models import Account, Task, TestCase, Problem, CrawlTestCasesTask, CrawlShard, CreateAccountsTask, CrawlerSource, VerifyTestCasesTask, BenchmarkCrawlerSourcesTask, CrawlerSourceBenchmark
 from .clients.oj_client import OJClient, Result
 from .clients.exceptions import AccountExistsError, CaptchaError, OJClientError, OJServerError
 # 引入 CrawlerState
-from .core.crawler_core import CrawlerCore, CrawlerState
-from . import utils
+from .core.crawler_core import BRANCH_TEMPLATE, CHECK_PARAMS, PAIR_TEMPLATE, SYMBOLS_TEMPLATE, CheckWindow, SymbolCode, CrawlerCore, CrawlerState, Prefix, prefix_bytes, prefix_text, supports_check_probes
+from .core.verifier import TestCaseVerifier, checksum_moduli, find_anchor
+from .core.incremental import INCREMENTAL_TEMPLATES, plan_incremental_crawl, testcase_fingerprint
+from .core.sharding import plan_shards
+from .core.alphabet import ALPHABET_TEMPLATE, prepare_symbol_code
+from .core.prefix_hash import PrefixDigest, PrefixHasher, digest_prefix
+from .core.channel import measure_channel, noise_upper_bound, prepare_check_code
+from .core.speculation import NextCharModel
+from .core.per_case import NoisyChannelError, PerCaseCrawler, PerCaseState
+from .core.trace_replay import record_params
+from .events import TaskProgressPublisher, publish_task_status
+from .control import TaskControlListener
+from .write_behind import WriteBehindBuffer
+from .metrics import TaskMetrics
+from .probe_cache import CACHEABLE_RESULTS, ProbeResultCache, probe_cache_for
+from .estimation import crawler_options, estimate_from_size_probe, simulate_crawl
+from .source_selection import candidate_sources, fresh_benchmarks
+from .core.cost_model import CrawlEstimate, CrawlProgressEstimator
+from . import scheduler
+from . import metrics, utils
 
 logger = logging.getLogger(__name__)
 
+@dataclass
+class PendingSubmission:
+    """已提交、尚未取得判題結果的探測"""
+    account: Account
+    client: OJClient
+    submission_id: str
+    submitted_at: float
+    # 含 header 與 footer 的完整程式碼，也是探測結果快取的鍵
+    code: str
+
+
 class CrawlTestCasesSubmitter:
-    def __init__(self, accounts: List[Tuple[Account, OJClient]], crawler_source: CrawlerSource, problem: Problem, header_code: str, footer_code: str):
+    # 輪詢判題結果的間隔與提交失敗後重試前的等待時間（秒）
+    poll_interval = 0.5
+    retry_delay = 1
+
+    def __init__(self, accounts: List[Tuple[Account, OJClient]], crawler_source: CrawlerSource, problem: Problem, header_code: str, footer_code: str, progress: Optional[TaskProgressPublisher] = None, buffer: Optional[WriteBehindBuffer] = None):
         self.accounts = accounts
         self.problem = problem
         self.header_code = header_code
         self.footer_code = footer_code
+        self.progress = progress
+        # 帳號使用時間與探測統計會先暫存在 buffer 中，再批次寫回
+        self.buffer = buffer
 
         self.codes = crawler_source.code
         self.language = crawler_source.language
         self.problem_id = problem.oj_submit_id
         self._account_idx = 0
+        # 增量模式中要排除的測資指紋，會以 {exclude} 填入樣板
+        self.exclude_fingerprints: Optional[List[int]] = None
+        # CrawlerCore 送出檢查探測時設定的視窗，會加入探測的參數
+        self.check_window: Optional[CheckWindow] = None
+        # 每個字串參數各自的雜湊快取，前綴只增加一個位元組時只需計算新增的部分
+        self._hashers: Dict[str, PrefixHasher] = {}
+        # 有值時，get_next_char 等待判題的期間以其他帳號先提交最可能的下一個前綴
+        self.speculation: Optional[NextCharModel] = None
+        self.speculation_width = 0
+        # 上一次讀取字元時預先提交的探測，以 (樣板, 前綴長度, 前綴雜湊, 其他參數) 為鍵
+        self._speculative: Dict[Tuple[str, int, int, str], PendingSubmission] = {}
+        # 有值時，已知結果的探測直接使用快取，不提交到 judge
+        self.cache: Optional[ProbeResultCache] = None
+        # CrawlerCore 重送誤讀的探測時設為 True，重新提交並以新的結果覆寫快取
+        self.skip_cache = False
     
+    def _uses_cache(self, template_key: Optional[str]) -> bool:
+        """
+        has_case 一類的探測與以 {exclude} 排除已儲存測資的探測，答案取決於 judge 上目前的測資，不使用快取；
+        exclude 為空時探測與完整爬取相同，可以使用。
+        """
+        return (self.cache is not None and not self.skip_cache and not self.exclude_fingerprints
+                and template_key not in INCREMENTAL_TEMPLATES)
+
+    def _hasher(self, name: str) -> PrefixHasher:
+        if name not in self._hashers:
+            self._hashers[name] = PrefixHasher()
+        return self._hashers[name]
+
     def _add_header_and_footer_code(self, code: str) -> str:
         return f"{self.header_code}\n{code}\n{self.footer_code}"
 
-    def _submit_and_get_memory_use(self, code: str):
+    def _render(self, template_key: str, params: dict) -> str:
+        """
+        將參數填入樣板，字串參數（例如 prefix）以 JSON 字串常值的形式填入。
+        字串參數另外提供位元組精確的 {name_hex}（十六進位）與 {name_length}（位元組數），
+        JSON 的 \\u 跳脫在部分語言中會被重新編碼成 UTF-8，非 ASCII 的位元組應改用這兩個參數。
+        {name_hash} 是前 {name_length} 個位元組的 64 位元 FNV-1a 雜湊，探測程式比對輸入前綴的雜湊，
+        提交的程式碼大小不隨前綴長度增加；只有長度不足以完成比對的探測（例如找前綴長度）才需要完整的前綴。
+        只計算樣板中實際使用的參數，避免每次探測都將很長的前綴編碼一次。
+        CrawlerCore 的前綴是 memoryview，原樣傳入，{name_hash} 直接使用 CrawlerCore 記住的雜湊；
+        字串參數也可以是 PrefixDigest（預先提交的兄弟前綴），此時樣板只能使用 {name_hash} 與 {name_length}。
+        """
+        template = self.codes[template_key]
+        values = {}
+        for name, value in params.items():
+            if isinstance(value, list):
+                if f'{{{name}}}' in template:
+                    values[name] = json.dumps(value)
+                continue
+            if not isinstance(value, (str, bytes, bytearray, memoryview, PrefixDigest)):
+                values[name] = value
+                continue
+            if f'{{{name}}}' in template:
+                values[name] = json.dumps(prefix_text(value))
+            if f'{{{name}_hex}}' in template:
+                values[f'{name}_hex'] = json.dumps(prefix_bytes(value).hex())
+            if f'{{{name}_hash}}' in template:
+                values[f'{name}_hash'] = digest_prefix(value, self._hasher(name)).hash
+            values.setdefault(f'{name}_length', value.length if isinstance(value, PrefixDigest) else len(value))
+        # 不放進 params，讓探測紀錄與一般模式的紀錄保持相同的鍵；
+        # 一般模式填入空陣列，讓支援增量模式的樣板也能用於完整爬取
+        values.setdefault('exclude', json.dumps(self.exclude_fingerprints or []))
+        for name in CHECK_PARAMS:
+            values.setdefault(name, 0)
+        return template.format(**values)
+
+    def _uses_literal(self, template_key: str, name: str) -> bool:
+        """樣板是否需要參數本身（{name} 或 {name_hex}），而不只是雜湊與長度"""
+        template = self.codes[template_key]
+        return f'{{{name}}}' in template or f'{{{name}_hex}}' in template
+
+    def _record_params(self, params: Optional[dict]) -> dict:
+        """探測紀錄保存的參數，前綴只保存長度、最後一個位元組與雜湊，紀錄的大小不隨前綴長度增加"""
+        return record_params(params or {}, self._hasher('prefix'))
+
+    def _probe(self, template_key: str, **params) -> int:
+        if self.check_window is not None:
+            # 與一般探測的讀數分開保存，重新解碼時才能依序取回
+            params.update(self.check_window.params())
+        return self._submit_and_get_memory_use(self._render(template_key, params), template_key, params)
+
+    def _probe_per_case(self, template_key: str, **params) -> Dict[str, int]:
+        return self._submit_and_get_memory_use(self._render(template_key, params), template_key, params, per_case=True)
+
+    @staticmethod
+    def _case_memory(data: dict) -> Dict[str, int]:
+        """判題結果中每筆測資的記憶體用量，以 test_case 編號為鍵"""
+        cases = (data.get('info') or {}).get('data')
+        if not cases:
+            raise OJClientError("Submission judged, but per-test-case info is missing.")
+        try:
+            return {str(case.get('test_case', index)): case['memory'] for index, case in enumerate(cases)}
+        except (KeyError, TypeError, AttributeError) as e:
+            raise OJClientError(f"Malformed per-test-case info: {e}")
+
+    def _next_account(self) -> Tuple[Account, OJClient]:
+        # 每次提交都使用下一個帳號，以分散風險
+        acc, client = self.accounts[self._account_idx]
+        self._account_idx = (self._account_idx + 1) % len(self.accounts)
+        return acc, client
+
+    def _submit(self, acc: Account, client: OJClient, code: str) -> PendingSubmission:
+        """提交但不等待判題"""
+        metrics.inc('submission_attempts', account=acc.username)
+        full_code = self._add_header_and_footer_code(code)
+        submitted_at = time.monotonic()
+        response = client.submit_code(full_code, self.language, self.problem_id)
+        submission_id = response.get('data', {}).get('submission_id')
+
+        if not submission_id:
+            raise OJClientError("Failed to get submission_id from response.")
+
+        if self.buffer:
+            self.buffer.touch_account(acc)
+        else:
+            acc.last_used = timezone.now()
+            acc.save(update_fields=['last_used'])
+        return PendingSubmission(acc, client, submission_id, submitted_at, full_code)
+
+    def _wait(self, pending: PendingSubmission, template_key: Optional[str] = None, params: Optional[dict] = None, per_case: bool = False):
+        """輪詢直到判題完成，回傳記憶體用量（per_case 為 True 時回傳每筆測資各自的用量）"""
+        while True:
+            with metrics.span('poll_wait'):
+                time.sleep(self.poll_interval)
+            submission = pending.client.get_submission(pending.submission_id)
+            if self.buffer:
+                self.buffer.add_stats(polls=1)
+            error = submission.get('error', None)
+            if error:
+                data = submission.get('data', None)
+                raise OJServerError(f"Submission failed: {error} {data}")
+
+            result = submission.get('data', {}).get('result')
+            if result is None:
+                raise OJClientError("Failed to get submission result.")
+
+            if Result.is_judged(Result(result)):
+                statistic_info = submission.get('data', {}).get('statistic_info', {})
+                memory_use = statistic_info.get('memory_cost')
+                if memory_use is None:
+                    raise OJClientError("Submission judged, but memory usage is missing.")
+                case_memory = self._case_memory(submission['data']) if per_case else None
+                if self._uses_cache(template_key) and Result(result) in CACHEABLE_RESULTS:
+                    self.cache.put(pending.code, {'memory_cost': memory_use, 'time_cost': statistic_info.get('time_cost'), 'result': result, 'case_memory': case_memory})
+                metrics.observe('judge_turnaround', time.monotonic() - pending.submitted_at)
+                metrics.inc('submissions')
+                if self.buffer and template_key:
+                    # 保留原始讀數，供之後離線重新解碼
+                    self.buffer.add_probe_record(
+                        template_key=template_key,
+                        params=self._record_params(params),
+                        account_id=pending.account.id,
+                        latency_ms=int((time.monotonic() - pending.submitted_at) * 1000),
+                        memory_cost=memory_use,
+                        time_cost=statistic_info.get('time_cost'),
+                        result=result,
+                        case_memory_costs=case_memory,
+                    )
+                if self.progress:
+                    self.progress.submission_done(time.monotonic() - pending.submitted_at)
+                    if self.buffer and self.progress.percent is not None:
+                        self.buffer.set_progress(self.progress.percent)
+                if self.buffer:
+                    self.buffer.add_stats(submissions=1, code_bytes=len(pending.code.encode()))
+                    self.buffer.maybe_flush()
+                return case_memory if per_case else memory_use
+
+    def _submit_and_get_memory_use(self, code: str, template_key: Optional[str] = None, params: Optional[dict] = None, per_case: bool = False):
+        """
+        提交並等待判題，回傳記憶體用量。
+        per_case 為 True 時回傳每筆測資各自的記憶體用量（以 test_case 編號為鍵）。
+        """
+        cached = self._cached_result(code, template_key, params, per_case)
+        if cached is not None:
+            return cached
+
         max_retries = 3
         last_exception = None
         
         for attempt in range(max_retries):
+            acc, client = self._next_account()
             try:
-                # 每次嘗試都使用下一個帳號，以分散風險
-                acc, client = self.accounts[self._account_idx]
-                self._account_idx = (self._account_idx + 1) % len(self.accounts)
-
-                full_code = self._add_header_and_footer_code(code)
-                response = client.submit_code(full_code, self.language, self.problem_id)
-                submission_id = response.get('data', {}).get('submission_id')
-
-                if not submission_id:
-                    raise OJClientError("Failed to get submission_id from response.")
-
-                acc.last_used = timezone.now()
-                acc.save(update_fields=['last_used'])
-
-                while True:
-                    time.sleep(0.5)
-                    submission = client.get_submission(submission_id)
-                    error = submission.get('error', None)
-                    if error:
-                        data = submission.get('data', None)
-                        raise OJServerError(f"Submission failed: {error} {data}")
-                    
-                    result = submission.get('data', {}).get('result')
-                    if result is None:
-                        raise OJClientError("Failed to get submission result.")
-                    
-                    if Result.is_judged(Result(result)):
-                        memory_use = submission.get('data', {}).get('statistic_info', {}).get('memory_cost')
-                        if memory_use is None:
-                            raise OJClientError("Submission judged, but memory usage is missing.")
-                        return memory_use # 成功，返回結果
-            
+                return self._wait(self._submit(acc, client, code), template_key, params, per_case) # 成功，返回結果
             except (OJServerError, OJClientError) as e:
+                if self.buffer:
+                    self.buffer.add_stats(failed_attempts=1)
+                metrics.inc('submission_failures', account=acc.username)
                 logger.warning(f"Submission attempt {attempt + 1}/{max_retries} failed with account {acc.username}: {e}. Retrying...")
                 last_exception = e
-                time.sleep(1) # 重試前稍作等待
+                time.sleep(self.retry_delay) # 重試前稍作等待
         
         # 如果所有重試都失敗了
         logger.error(f"All {max_retries} submission attempts failed.")
         raise last_exception or OJClientError("All submission attempts failed.")
-        
+
+    def _cached_result(self, code: str, template_key: Optional[str], params: Optional[dict], per_case: bool = False):
+        """快取中已有 code 的判題結果時，與判題完成時相同地記錄並回傳；否則回傳 None"""
+        if not self._uses_cache(template_key):
+            return None
+        cached = self.cache.get(self._add_header_and_footer_code(code))
+        if cached is None or (per_case and cached.get('case_memory') is None):
+            return None
+        metrics.inc('probe_cache_hits')
+        if self.buffer and template_key:
+            self.buffer.add_probe_record(
+                template_key=template_key,
+                params=self._record_params(params),
+                account_id=None,
+                latency_ms=0,
+                memory_cost=cached['memory_cost'],
+                time_cost=cached['time_cost'],
+                result=cached['result'],
+                case_memory_costs=cached['case_memory'],
+            )
+        if self.progress:
+            self.progress.submission_done()
+        if self.buffer:
+            self.buffer.add_stats(cache_hits=1)
+            self.buffer.maybe_flush()
+        return cached['case_memory'] if per_case else cached['memory_cost']
+
+    def _probe_speculatively(self, template_key: str, **params) -> int:
+        """
+        與 _probe 相同，但上一次讀取時已經預先提交過這個探測時直接等待它的結果；
+        等待之前先以閒置的帳號提交 speculation 認為最可能的下一個前綴，其餘預先提交的探測則捨棄。
+        預先提交的探測與 CrawlerCore 之後送出的探測完全相同，結果不受影響，只會多用一些判題量。
+        """
+        pending = self._speculative.pop(self._speculation_key(template_key, params), None)
+        if self.buffer:
+            self.buffer.add_stats(speculative_hits=int(pending is not None), speculative_discarded=len(self._speculative))
+        self._speculative.clear()
+        try:
+            if pending is None:
+                code = self._render(template_key, params)
+                cached = self._cached_result(code, template_key, params)
+                if cached is not None:
+                    self._speculate(template_key, params)
+                    return cached
+                pending = self._submit(*self._next_account(), code)
+            self._speculate(template_key, params)
+            return self._wait(pending, template_key, params)
+        except (OJServerError, OJClientError) as e:
+            if self.buffer:
+                self.buffer.add_stats(failed_attempts=1)
+            logger.warning(f"Submission of '{template_key}' failed: {e}. Retrying...")
+            return self._submit_and_get_memory_use(self._render(template_key, params), template_key, params)
+
+    def _speculation_key(self, template_key: str, params: dict) -> Tuple[str, int, int, str]:
+        """以前綴的長度與雜湊為鍵，不需要保留或序列化前綴本身"""
+        prefix = digest_prefix(params['prefix'], self._hasher('prefix'))
+        others = {name: value for name, value in params.items() if name != 'prefix'}
+        return template_key, prefix.length, prefix.hash, json.dumps(others, sort_keys=True)
+
+    def _speculate(self, template_key: str, params: dict) -> None:
+        """
+        以閒置的帳號提交 params['prefix'] 之後最可能的幾個字元的探測。
+        樣板只比對雜湊時，兄弟前綴只以 PrefixDigest 表示，不複製前綴。
+        """
+        prefix = params['prefix']
+        digest = digest_prefix(prefix, self._hasher('prefix'))
+        literal = self._uses_literal(template_key, 'prefix')
+        # 只依前一個字元預測
+        for char in self.speculation.likely_next(prefix_bytes(prefix[-1:]), self.speculation_width):
+            next_prefix = prefix_bytes(prefix) + bytes((char,)) if literal else digest.child(char)
+            next_params = {**params, 'prefix': next_prefix, 'limit': 256}
+            code = self._render(template_key, next_params)
+            if self._uses_cache(template_key) and self.cache.get(self._add_header_and_footer_code(code)) is not None:
+                # 之後讀取時會直接使用快取
+                continue
+            acc, client = self._next_account()
+            try:
+                pending = self._submit(acc, client, code)
+            except (OJServerError, OJClientError) as e:
+                logger.warning(f"Speculative submission with account {acc.username} failed: {e}.")
+                break
+            self._speculative[self._speculation_key(template_key, next_params)] = pending
+            if self.buffer:
+                self.buffer.add_stats(speculative_submissions=1)
+
     def found_testcase(self, testcase: str) -> None:
-        TestCase.objects.get_or_create(problem=self.problem, content=testcase)
+        with metrics.span('found_testcase'):
+            test_case, created = TestCase.objects.get_or_create(problem=self.problem, content=testcase)
+            if not created and test_case.is_stale:
+                # 曾被標記為過期的測資又出現在 judge 上
+                test_case.is_stale = False
+                test_case.save(update_fields=['is_stale', 'updated_at'])
+        metrics.inc('testcases_found')
+        if self.speculation is not None:
+            self.speculation.add(testcase)
+        if self.buffer:
+            self.buffer.add_stats(testcases_found=1)
+        if self.progress:
+            self.progress.testcase_found()
 
-    def get_next_char(self, prefix: str, limit: int) -> int:
-        return self._submit_and_get_memory_use(self.codes['get_next_char'].format(prefix=json.dumps(prefix), limit=limit))
+    def _speculating(self) -> bool:
+        # 檢查探測的視窗依賴上一次的讀數，無法預先提交
+        return self.speculation is not None and self.speculation_width > 0 and self.check_window is None
+
+    def get_next_char(self, prefix: Prefix, limit: int) -> int:
+        if self._speculating():
+            return self._probe_speculatively('get_next_char', prefix=prefix, limit=limit)
+        return self._probe('get_next_char', prefix=prefix, limit=limit)
     
-    def get_prefix_length_length(self, prefix: str) -> int:
-        return self._submit_and_get_memory_use(self.codes['get_prefix_length_length'].format(prefix=json.dumps(prefix)))
+    def get_prefix_length_length(self, prefix: Prefix) -> int:
+        return self._probe('get_prefix_length_length', prefix=prefix)
 
-    def get_prefix_length(self, prefix: str, length_prefix: int, position: int) -> int:
-        return self._submit_and_get_memory_use(self.codes['get_prefix_length'].format(prefix=json.dumps(prefix), length_prefix=length_prefix, position=position))
+    def get_prefix_length(self, prefix: Prefix, length_prefix: int, position: int) -> int:
+        return self._probe('get_prefix_length', prefix=prefix, length_prefix=length_prefix, position=position)
 
     def get_number(self, number: int) -> int:
-        return self._submit_and_get_memory_use(self.codes['get_number'].format(number=number))
+        return self._probe('get_number', number=number)
 
-@shared_task(bind=True)
-def crawl_test_cases_task(self, task_id):
-    task = CrawlTestCasesTask.objects.get(id=task_id)
-    
-    # 用來存放本次任務確認可用的帳號
-    # 格式可以是 (account_model, oj_client_instance)
-    ready_account_pool: List[Tuple[Account, OJClient]] = []
-    
-    # 用來存放被鎖定的帳號模型，以便最後釋放
-    locked_accounts = []
+    def get_next_char_or_branch(self, prefix: Prefix, limit: int, branch_radix: int) -> int:
+        if self._speculating():
+            return self._probe_speculatively(BRANCH_TEMPLATE, prefix=prefix, limit=limit, branch_radix=branch_radix)
+        return self._probe(BRANCH_TEMPLATE, prefix=prefix, limit=limit, branch_radix=branch_radix)
 
-    def check_if_paused():
-        task.refresh_from_db(fields=['status'])
-        return task.status == Task.Status.PAUSED
+    def get_next_char_pair(self, prefix: Prefix, limit: int) -> int:
+        return self._probe(PAIR_TEMPLATE, prefix=prefix, limit=limit)
 
-    try:
-        task.status = Task.Status.IN_PROGRESS
-        task.progress = 5 # 假設準備階段佔 5% 進度
-        task.save()
+    def get_next_symbols(self, prefix: Prefix, limit: int, code: SymbolCode) -> int:
+        return self._probe(SYMBOLS_TEMPLATE, prefix=prefix, limit=limit, **code.params())
+
+    def get_max_char_below(self, limit: int) -> int:
+        return self._probe(ALPHABET_TEMPLATE, limit=limit)
+
+    def get_prefix_checksum(self, anchor: str, length: int, modulus: int) -> int:
+        return self._probe('get_prefix_checksum', anchor=anchor, length=length, checksum_modulus=modulus)
+
+    def get_length_bits(self) -> int:
+        return self._probe('get_length_bits')
+
+    def has_case(self, fingerprint: int) -> int:
+        return self._probe('has_case', fingerprint=fingerprint)
+
+    def has_unknown_case(self, fingerprints: List[int]) -> int:
+        return self._probe('has_unknown_case', fingerprints=fingerprints)
+
+    def get_number_per_case(self, number: int) -> Dict[str, int]:
+        return self._probe_per_case('get_number', number=number)
+
+    def get_char_at_per_case(self, position: int) -> Dict[str, int]:
+        return self._probe_per_case('get_char_at', position=position)
+
+class AccountLease:
+    """
+    為一個任務鎖定並登入一批帳號，任務結束時呼叫 release() 釋放。
+    """
+    def __init__(self):
+        # 用來存放被鎖定的帳號模型，以便最後釋放
+        self.locked_accounts: List[Account] = []
+
+    def acquire(self, num_accounts_needed: int) -> List[Tuple[Account, OJClient]]:
+        """
+        鎖定帳號並逐一登入，回傳確認可用的 (account_model, oj_client_instance)。
+
+        Raises:
+            Exception: 可用帳號不足。
+        """
+        ready_account_pool: List[Tuple[Account, OJClient]] = []
 
-        # --- 階段一：準備帳號池 ---
-        num_accounts_needed = settings.ACCOUNTS_PER_CRAWL_TASK
-        
         # 為了避免無限循環，我們設定一個查找上限
         max_candidates_to_check = num_accounts_needed * 3
         unused_accounts = []
@@ -130,11 +441,11 @@ def crawl_test_cases_task(self, task_id):
             # 將它們全部標記為 IN_USE，避免其他任務干擾
             locked_account_ids = [acc.id for acc in candidate_accounts]
             Account.objects.filter(id__in=locked_account_ids).update(status=Account.Status.IN_USE)
-            locked_accounts = candidate_accounts
+            self.locked_accounts = candidate_accounts
 
         # 現在這些帳號被我們獨佔，可以安全地進行檢查
-        for i, account in enumerate(locked_accounts):
-            if len(ready_account_pool) + len(locked_accounts) - i < num_accounts_needed:
+        for i, account in enumerate(self.locked_accounts):
+            if len(ready_account_pool) + len(self.locked_accounts) - i < num_accounts_needed:
                 # 預估帳號不夠
                 break
 
@@ -148,7 +459,7 @@ def crawl_test_cases_task(self, task_id):
                 ready_account_pool.append((account, client))
             except Exception as e:
                 # 登入失敗可能是暫時性問題（如網路不穩），不應直接停用帳號。
-                # 記錄此事件，並在任務結束時於 finally 區塊被釋放回 ACTIVE 狀態。
+                # 記錄此事件，並在任務結束時於 release() 中被釋放回 ACTIVE 狀態。
                 unused_accounts.append(account)
                 logger.warning(f"Account {account.username} login failed and will be skipped for this task. Error: {e}")
         
@@ -160,50 +471,254 @@ def crawl_test_cases_task(self, task_id):
             unused_accounts_ids = [acc.id for acc in unused_accounts]
             Account.objects.filter(id__in=unused_accounts_ids).update(status=Account.Status.ACTIVE)
 
+        return ready_account_pool
+
+    def release(self) -> None:
+        """釋放所有被鎖定的帳號"""
+        if self.locked_accounts:
+            # 篩選出那些沒有被停用的帳號，將它們釋放回 ACTIVE
+            active_again_ids = [
+                acc.id for acc in self.locked_accounts 
+                if acc.status != Account.Status.DISABLED
+            ]
+            if active_again_ids:
+                Account.objects.filter(id__in=active_again_ids).update(status=Account.Status.ACTIVE)
+        self.locked_accounts = []
+
+# 任務在開始執行前就被暫停或取消時，worker 不應覆寫其狀態
+STOPPED_TASK_STATUSES = (Task.Status.PAUSED, Task.Status.CANCELLED)
+
+def _prepare_incremental_crawl(task: CrawlTestCasesTask, crawler_core: CrawlerCore, submitter: CrawlTestCasesSubmitter) -> Optional[dict]:
+    """
+    增量模式：比對 judge 與已儲存測資的指紋，將已不存在的測資標記為過期，
+    並讓之後的探測排除仍存在的測資，只爬取新的或變動過的測資。
+    """
+    ids_by_fingerprint: Dict[int, List[int]] = {}
+    stored = TestCase.objects.filter(problem=task.problem, is_stale=False).values_list('id', 'content')
+    for test_case_id, content in stored.iterator():
+        ids_by_fingerprint.setdefault(testcase_fingerprint(content), []).append(test_case_id)
+
+    if task.crawler_state:
+        # 從中斷處恢復：已儲存的測資（包含本次新找到的）都在被探測的測資之外，直接排除即可
+        submitter.exclude_fingerprints = list(ids_by_fingerprint)
+        return None
+
+    plan = plan_incremental_crawl(crawler_core, submitter, list(ids_by_fingerprint))
+    stale_ids = [test_case_id for fingerprint in plan.removed for test_case_id in ids_by_fingerprint[fingerprint]]
+    if stale_ids:
+        TestCase.objects.filter(id__in=stale_ids).update(is_stale=True)
+
+    submitter.exclude_fingerprints = plan.present
+    if not plan.has_unknown:
+        crawler_core.current_internal_state = "DONE"
+
+    logger.info(f"Task {task.id} incremental plan: {len(plan.present)} unchanged, {len(stale_ids)} stale, new cases: {plan.has_unknown}.")
+    return {
+        'unchanged': len(plan.present),
+        'stale': stale_ids,
+        'has_new_cases': plan.has_unknown,
+        'plan_probes': plan.probes,
+    }
+
+def _refine_estimate(crawler_core: CrawlerCore, submitter: CrawlTestCasesSubmitter, estimate: CrawlEstimate) -> CrawlEstimate:
+    """
+    沒有已儲存的測資可供估計時，以一次 get_length_bits 探測取得最長測資的長度量級。
+    CrawlerSource 沒有這個樣板時維持原本的估計。
+    """
+    if estimate.source != 'default' or 'get_length_bits' not in submitter.codes:
+        return estimate
+    if not crawler_core.linear_regression:
+        crawler_core._run_predict()
+    if crawler_core.current_internal_state == "NEEDS_PREDICT":
+        # 已經校正過，讓 run() 直接開始尋找字元
+        crawler_core.current_internal_state = "FINDING_NEXT_CHAR"
+    length_bits = crawler_core._m2n(submitter.get_length_bits())
+    checks = len(crawler_core.check_code.radii) if crawler_core.check_code else 0
+    return estimate_from_size_probe(length_bits, estimate.test_cases, estimate.judge_latency, crawler_core.branch_radix, checks)
+
+def _enable_speculation(task: CrawlTestCasesTask, submitter: CrawlTestCasesSubmitter) -> None:
+    """
+    讀取字元時以最多 CRAWL_SPECULATION_WIDTH 個閒置帳號預先提交下一個前綴，
+    字元的統計來自題目之前爬到的測資，爬取中找到的測資也會加入。
+    """
+    width = min(settings.CRAWL_SPECULATION_WIDTH, len(submitter.accounts) - 1)
+    if width <= 0:
+        return
+    known = TestCase.objects.filter(problem=task.problem).values_list('content', flat=True)
+    submitter.speculation = NextCharModel(known.iterator())
+    submitter.speculation_width = width
+
+def _measured_noise(task: CrawlTestCasesTask) -> Optional[float]:
+    """CrawlerSourceBenchmark 對這個題目與 CrawlerSource 量到的雜訊的信賴上界"""
+    benchmark = fresh_benchmarks(task.problem).filter(crawler_source=task.crawler_source, noise__isnull=False).first()
+    return noise_upper_bound(benchmark.noise, benchmark.probes - 2) if benchmark else None
+
+def _prepare_check_code(task: CrawlTestCasesTask, crawler_core: CrawlerCore, submitter: CrawlTestCasesSubmitter) -> None:
+    """
+    CrawlerSource 的樣板都支援檢查探測時，依校正與量測的雜訊決定 CheckCode。
+    從保存的狀態恢復時沿用狀態中的 CheckCode。
+    """
+    if not supports_check_probes(submitter.codes) or task.crawler_state:
+        return
+    code = prepare_check_code(crawler_core, measured_noise=_measured_noise(task))
+    if code is not None:
+        logger.info(f"Task {task.id} sends {len(code.radii)} check probe(s) after each read, windows {list(code.radii)}.")
+
+def _prepare_symbol_code(task: CrawlTestCasesTask, crawler_core: CrawlerCore, submitter: CrawlTestCasesSubmitter) -> None:
+    """
+    CrawlerSource 有 get_next_symbols 時，以題目已儲存測資的字元集合（沒有時以 get_max_char_below 探測）
+    與校正的雜訊決定 SymbolCode。從保存的狀態恢復時沿用狀態中的 SymbolCode。
+    """
+    if SYMBOLS_TEMPLATE not in submitter.codes or task.crawler_state:
+        return
+    known = list(TestCase.objects.filter(problem=task.problem, is_stale=False).values_list('content', flat=True))
+    if not known and ALPHABET_TEMPLATE not in submitter.codes:
+        return
+    code = prepare_symbol_code(crawler_core, submitter, known, measured_noise=_measured_noise(task))
+    if code is not None:
+        logger.info(f"Task {task.id} reads {code.count} symbol(s) per probe from a {len(code.alphabet)}-character alphabet, spacing {code.spacing}.")
+
+@shared_task(bind=True)
+def crawl_test_cases_task(self, task_id):
+    task = CrawlTestCasesTask.objects.get(id=task_id)
+    if task.status in STOPPED_TASK_STATUSES:
+        logger.info(f"Task {task.id} is {task.status} before starting, skipping.")
+        schedule_crawls.delay()
+        return
+
+    if task.shard_count > 1 and task.mode == CrawlTestCasesTask.Mode.FULL:
+        _coordinate_sharded_crawl(task)
+        return
+    
+    # 本次任務租用的帳號，會在 finally 區塊中釋放
+    lease = AccountLease()
+
+    # 暫停／取消訊號由背景執行緒接收，熱路徑只讀取記憶體中的旗標
+    control = TaskControlListener(task.id)
+    control.start()
+    task_metrics = TaskMetrics(task.id).activate()
+
+    try:
+        task.status = Task.Status.IN_PROGRESS
+        task.progress = 5 # 假設準備階段佔 5% 進度
+        task.save()
+        publish_task_status(task)
+
+        # --- 階段一：準備帳號池 ---
+        ready_account_pool = lease.acquire(settings.ACCOUNTS_PER_CRAWL_TASK)
+
         # --- 階段二：執行核心任務 ---
         task.progress = 10
         task.save()
+        publish_task_status(task)
         
-        submitter = CrawlTestCasesSubmitter(ready_account_pool, task.crawler_source, task.problem, task.header_code, task.footer_code)
-        crawler_core = CrawlerCore(submitter, should_pause=check_if_paused)
+        progress = TaskProgressPublisher(task.id)
+        buffer = WriteBehindBuffer(task, metrics=task_metrics)
+        submitter = CrawlTestCasesSubmitter(ready_account_pool, task.crawler_source, task.problem, task.header_code, task.footer_code, progress=progress, buffer=buffer)
+        if task.mode != CrawlTestCasesTask.Mode.INCREMENTAL:
+            # 增量模式要偵測測資的變動，不能使用幾小時前的答案
+            submitter.cache = probe_cache_for(submitter.problem_id, submitter.language)
+
+        def on_state_change(state: str) -> None:
+            progress.state_changed(state)
+            task_metrics.state_changed(state)
+
+        def make_crawler_core() -> CrawlerCore:
+            _enable_speculation(task, submitter)
+            return CrawlerCore(submitter, should_pause=control.should_stop, on_state_change=on_state_change, **crawler_options(task.crawler_source))
+
+        if task.mode == CrawlTestCasesTask.Mode.PER_CASE:
+            crawler_core = PerCaseCrawler(submitter, should_pause=control.should_stop, on_state_change=on_state_change)
+            state_class = PerCaseState
+        else:
+            crawler_core = make_crawler_core()
+            state_class = CrawlerState
+        # 定期寫回的檢查點，讓 worker 意外終止後仍能從接近的位置恢復
+        buffer.checkpoint = lambda: asdict(crawler_core.save_state())
 
         # 檢查是否有儲存的狀態，若有則載入
         if task.crawler_state:
             try:
-                state_obj = CrawlerState(**task.crawler_state)
+                state_obj = state_class(**task.crawler_state)
                 crawler_core.load_state(state_obj)
                 logger.info(f"Task {task.id} resumed from state: {state_obj.state}")
             except TypeError as e:
                 logger.warning(f"Failed to load crawler state for task {task.id}: {e}. Starting from scratch.")
 
 
+        incremental_summary = None
+        fallback = None
+        estimate = simulate_crawl(task.problem, task.mode, task.crawler_source)
+        progress.estimator = CrawlProgressEstimator(estimate, probes_done=task.probe_records.count())
         try:
-            crawler_core.run()
+            with metrics.span('crawl'):
+                if task.mode == CrawlTestCasesTask.Mode.PER_CASE:
+                    try:
+                        crawler_core.calibrate()
+                    except NoisyChannelError as e:
+                        # 逐筆測資的讀數無法以檢查探測更正，改為完整爬取；模式一併保存，恢復時才會載入 CrawlerState
+                        logger.warning(f"Task {task.id} falls back to a full crawl: {e}")
+                        fallback = str(e)
+                        task.mode = CrawlTestCasesTask.Mode.FULL
+                        task.save(update_fields=['mode', 'updated_at'])
+                        crawler_core = make_crawler_core()
+                        estimate = simulate_crawl(task.problem, task.mode, task.crawler_source)
+                        progress.estimator = CrawlProgressEstimator(estimate, probes_done=progress.submissions)
+                if task.mode != CrawlTestCasesTask.Mode.PER_CASE:
+                    _prepare_check_code(task, crawler_core, submitter)
+                if task.mode == CrawlTestCasesTask.Mode.INCREMENTAL:
+                    incremental_summary = _prepare_incremental_crawl(task, crawler_core, submitter)
+                elif task.mode == CrawlTestCasesTask.Mode.FULL and not task.crawler_state:
+                    estimate = _refine_estimate(crawler_core, submitter, estimate)
+                    progress.estimator = CrawlProgressEstimator(estimate, probes_done=progress.submissions)
+                if task.mode != CrawlTestCasesTask.Mode.PER_CASE:
+                    _prepare_symbol_code(task, crawler_core, submitter)
+
+                crawler_core.run()
+            buffer.flush()
 
-            if check_if_paused():
+            if control.cancel_requested:
+                logger.info(f"Task {task.id} cancelled by user.")
+                task.status = Task.Status.CANCELLED
+                task.result = buffer.result_with_stats({'message': 'Task cancelled by user.'})
+                task.save()
+                publish_task_status(task)
+                return
+
+            if control.pause_requested:
                 logger.info(f"Task {task.id} paused successfully. Saving state.")
                 current_state = crawler_core.save_state()
                 task.crawler_state = asdict(current_state)
-                task.result = {'message': 'Task paused by user.', 'last_state': task.crawler_state}
+                task.status = Task.Status.PAUSED
+                task.result = buffer.result_with_stats({'message': 'Task paused by user.', 'last_state': task.crawler_state})
                 task.save()
+                publish_task_status(task)
                 return
             
             # 任務成功完成
             task.status = Task.Status.SUCCESS
             task.progress = 100
-            task.result = {'message': 'Crawl task completed successfully.'}
+            task.result = buffer.result_with_stats({'message': 'Crawl task completed successfully.'})
+            if incremental_summary:
+                task.result['incremental'] = incremental_summary
+            if fallback:
+                task.result['fallback'] = fallback
+            task.result['estimate'] = estimate.as_dict()
             # 成功後可以清除狀態
             task.crawler_state = None
             task.save()
+            publish_task_status(task)
 
         except Exception as e:
             # 執行中斷，儲存狀態
             logger.error(f"Crawler task {task.id} failed, saving state.", exc_info=True)
+            buffer.flush()
             current_state = crawler_core.save_state()
             task.crawler_state = asdict(current_state)
             task.status = Task.Status.FAILURE
-            task.result = {'error': str(e), 'last_state': task.crawler_state}
+            task.result = buffer.result_with_stats({'error': str(e), 'last_state': task.crawler_state})
             task.save()
+            publish_task_status(task)
             # 重新拋出異常，讓 Celery 知道任務失敗
             raise
 
@@ -211,40 +726,497 @@ def crawl_test_cases_task(self, task_id):
         task.status = Task.Status.FAILURE
         task.result = {'error': str(e)}
         task.save()
+        publish_task_status(task)
     
     finally:
-        # --- 釋放所有被鎖定的帳號 ---
-        if locked_accounts:
-            # 篩選出那些沒有被停用的帳號，將它們釋放回 ACTIVE
-            active_again_ids = [
-                acc.id for acc in locked_accounts 
-                if acc.status != Account.Status.DISABLED
-            ]
-            if active_again_ids:
-                Account.objects.filter(id__in=active_again_ids).update(status=Account.Status.ACTIVE)
-        
+        control.stop()
+        task_metrics.deactivate()
+        lease.release()
+        # 空出的名額交給下一個等待中的任務
+        schedule_crawls.delay()
+
+def _coordinate_sharded_crawl(task: CrawlTestCasesTask) -> None:
+    """
+    分散爬取的 coordinator：校正後展開字典樹的上層以規劃分片，再將每個分片派送到 crawl 佇列。
+    任務恢復執行時沿用已規劃的分片，只重新派送尚未成功的分片。
+    """
+    shards = list(task.shards.all())
+    if not shards:
+        lease = AccountLease()
+        task_metrics = TaskMetrics(task.id).activate()
+        try:
+            task.status = Task.Status.IN_PROGRESS
+            task.progress = 5
+            task.save()
+            publish_task_status(task)
+
+            ready_account_pool = lease.acquire(settings.ACCOUNTS_PER_CRAWL_SHARD)
+            buffer = WriteBehindBuffer(task, metrics=task_metrics)
+            submitter = CrawlTestCasesSubmitter(ready_account_pool, task.crawler_source, task.problem, task.header_code, task.footer_code, buffer=buffer)
+            submitter.cache = probe_cache_for(submitter.problem_id, submitter.language)
+            crawler_core = CrawlerCore(submitter, **crawler_options(task.crawler_source))
+            with metrics.span('plan_shards'):
+                _prepare_check_code(task, crawler_core, submitter)
+                _prepare_symbol_code(task, crawler_core, submitter)
+                ranges = plan_shards(crawler_core, submitter, task.shard_count, settings.CRAWL_SHARD_MAX_DEPTH)
+            buffer.flush()
+
+            shards = CrawlShard.objects.bulk_create([
+                CrawlShard(task=task, index=index, prefix=shard_range.prefix, lower=shard_range.lower, upper=shard_range.upper,
+                           crawler_state=asdict(shard_range.initial_state(crawler_core)))
+                for index, shard_range in enumerate(ranges)
+            ])
+            # 規劃分片的探測統計，任務結束時與各分片的統計合併
+            task.result = {'message': f'Crawling in {len(shards)} shards.', 'planning': dict(buffer.stats)}
+            logger.info(f"Task {task.id} planned {len(shards)} shards.")
+        except Exception as e:
+            logger.error(f"Failed to plan shards for task {task.id}.", exc_info=True)
+            task.status = Task.Status.FAILURE
+            task.result = {'error': str(e)}
+            task.save()
+            publish_task_status(task)
+            schedule_crawls.delay()
+            return
+        finally:
+            task_metrics.deactivate()
+            lease.release()
+
+    resumed = [shard for shard in shards if shard.status != Task.Status.SUCCESS]
+    CrawlShard.objects.filter(id__in=[shard.id for shard in resumed]).update(status=Task.Status.PENDING, updated_at=timezone.now())
+    task.status = Task.Status.IN_PROGRESS
+    task.progress = max(task.progress, 10)
+    task.save()
+    publish_task_status(task)
+    # 任務的狀態儲存後才派送，避免分片結束時的更新被覆寫
+    for shard in resumed:
+        crawl_shard_task.delay(shard.id)
+
+@shared_task(bind=True)
+def crawl_shard_task(self, shard_id):
+    """以分片自己租用的帳號爬取一個分片，結束時合併回所屬的爬取任務"""
+    shard = CrawlShard.objects.select_related('task').get(id=shard_id)
+    task = shard.task
+    if task.status in STOPPED_TASK_STATUSES:
+        shard.status = task.status
+        shard.save(update_fields=['status', 'updated_at'])
+        _finish_shard(task.id)
+        return
+
+    lease = AccountLease()
+    # 暫停／取消訊號送給整個任務，所有分片都會收到
+    control = TaskControlListener(task.id)
+    control.start()
+    task_metrics = TaskMetrics(task.id).activate()
+    buffer = WriteBehindBuffer(task, metrics=task_metrics, shard=shard)
+    crawler_core = None
+
+    try:
+        shard.status = Task.Status.IN_PROGRESS
+        shard.save(update_fields=['status', 'updated_at'])
+
+        ready_account_pool = lease.acquire(settings.ACCOUNTS_PER_CRAWL_SHARD)
+        submitter = CrawlTestCasesSubmitter(ready_account_pool, task.crawler_source, task.problem, task.header_code, task.footer_code, buffer=buffer)
+        submitter.cache = probe_cache_for(submitter.problem_id, submitter.language)
+        crawler_core = CrawlerCore(submitter, should_pause=control.should_stop, on_state_change=task_metrics.state_changed, **crawler_options(task.crawler_source))
+        crawler_core.load_state(CrawlerState(**shard.crawler_state))
+        _enable_speculation(task, submitter)
+        buffer.checkpoint = lambda: asdict(crawler_core.save_state())
+
+        try:
+            with metrics.span('crawl'):
+                crawler_core.run()
+        finally:
+            buffer.flush()
+
+        if control.should_stop():
+            shard.status = Task.Status.CANCELLED if control.cancel_requested else Task.Status.PAUSED
+            shard.crawler_state = asdict(crawler_core.save_state())
+        else:
+            shard.status = Task.Status.SUCCESS
+            shard.progress = 100
+            shard.crawler_state = None
+        shard.result = buffer.result_with_stats({})
+
+    except Exception as e:
+        logger.error(f"Shard #{shard.index} of task {task.id} failed, saving state.", exc_info=True)
+        shard.status = Task.Status.FAILURE
+        if crawler_core is not None:
+            shard.crawler_state = asdict(crawler_core.save_state())
+        shard.result = buffer.result_with_stats({'error': str(e)})
+
+    finally:
+        shard.save()
+        control.stop()
+        task_metrics.deactivate()
+        lease.release()
+        _finish_shard(task.id)
+
+def _finish_shard(task_id) -> None:
+    """
+    分片結束後更新所屬的任務：仍有分片在執行時只更新進度，
+    全部結束後合併探測統計並決定任務的最終狀態。
+    以 select_for_update 鎖定任務，避免多個分片同時結束時互相覆寫。
+    """
+    with transaction.atomic():
+        task = CrawlTestCasesTask.objects.select_for_update().get(id=task_id)
+        shards = list(task.shards.all())
+        statuses = Counter(shard.status for shard in shards)
+        active = statuses[Task.Status.PENDING] + statuses[Task.Status.IN_PROGRESS]
+        task.progress = 10 + 89 * statuses[Task.Status.SUCCESS] // max(len(shards), 1)
+
+        if active:
+            # 任務可能已被暫停，只更新進度
+            task.save(update_fields=['progress', 'updated_at'])
+        else:
+            planning = (task.result or {}).get('planning', {})
+            stats = Counter(planning)
+            for shard in shards:
+                stats.update((shard.result or {}).get('stats', {}))
+            result = {
+                'stats': dict(stats),
+                'planning': planning,
+                'shards': [
+                    {'index': shard.index, 'prefix': shard.prefix, 'lower': shard.lower, 'upper': shard.upper,
+                     'status': shard.status, 'stats': (shard.result or {}).get('stats', {})}
+                    for shard in shards
+                ],
+            }
+            errors = [shard.result['error'] for shard in shards if shard.result and 'error' in shard.result]
+            if statuses[Task.Status.SUCCESS] == len(shards):
+                task.status = Task.Status.SUCCESS
+                task.progress = 100
+                task.crawler_state = None
+                result['message'] = 'Crawl task completed successfully.'
+            elif statuses[Task.Status.FAILURE]:
+                task.status = Task.Status.FAILURE
+                result['error'] = f"{statuses[Task.Status.FAILURE]} of {len(shards)} shards failed: {errors[0] if errors else 'unknown error'}"
+            elif statuses[Task.Status.CANCELLED]:
+                task.status = Task.Status.CANCELLED
+                result['message'] = 'Task cancelled by user.'
+            else:
+                task.status = Task.Status.PAUSED
+                result['message'] = 'Task paused by user.'
+            task.result = result
+            task.save()
+
+    publish_task_status(task)
+    if not active:
+        # 空出的名額交給下一個等待中的任務
+        schedule_crawls.delay()
+
+@shared_task
+def schedule_crawls():
+    """
+    將等待中的爬取任務派送到 crawl 佇列，直到用完可同時執行的名額。
+    建立任務、任務結束、暫停與取消時都會觸發，Celery beat 也會每 CRAWL_SCHEDULE_INTERVAL 秒執行一次；
+    派送前先將心跳過期的任務標記為失敗，釋出終止的 worker 佔用的名額。以 Redis 鎖避免多個排程器同時計算名額。
+    """
+    lock = utils.get_redis_client().lock('crawl-scheduler', timeout=60, blocking_timeout=30)
+    if not lock.acquire():
+        logger.warning("Crawl scheduler is busy, skipping this round.")
+        return
+    try:
+        _reap_stale_tasks()
+        running = list(scheduler.running_crawls())
+        # 驗證與量測任務也在 crawl 佇列上執行
+        busy = running + scheduler.unscheduled_crawl_queue_tasks()
+        slots = scheduler.crawl_slots(busy)
+        if slots <= 0:
+            return
+        pending = list(scheduler.pending_crawls())
+        accounts = scheduler.available_accounts(busy)
+        for task in scheduler.pick_next(pending, running, slots, timezone.now(), accounts):
+            task.dispatched_at = timezone.now()
+            task.save(update_fields=['dispatched_at', 'updated_at'])
+            crawl_test_cases_task.delay(task.id)
+            logger.info(f"Dispatched crawl task {task.id} (priority {task.priority}, owner '{task.owner}').")
+    finally:
+        lock.release()
+
+def _reap_stale_tasks() -> None:
+    """
+    將心跳過期的任務與分片標記為失敗。任務保留最後寫回的檢查點，可以從失敗狀態恢復；
+    只有狀態與心跳在標記時仍未改變才會更新，worker 恰好寫回時不會覆寫。
+    """
+    now = timezone.now()
+    message = f"Worker stopped reporting progress for over {settings.CRAWL_HEARTBEAT_TIMEOUT} seconds."
+    for shard in scheduler.stale_shards(now):
+        updated = CrawlShard.objects.filter(id=shard.id, status=Task.Status.IN_PROGRESS, updated_at=shard.updated_at).update(
+            status=Task.Status.FAILURE, result={**(shard.result or {}), 'error': message}, updated_at=now,
+        )
+        if updated:
+            logger.warning(f"Shard #{shard.index} of task {shard.task_id} has no heartbeat, marked as failed.")
+            _finish_shard(shard.task_id)
+    for task in scheduler.stale_tasks(now):
+        updated = Task.objects.filter(id=task.id, status=Task.Status.IN_PROGRESS, updated_at=task.updated_at).update(
+            status=Task.Status.FAILURE, result={**(task.result or {}), 'error': message}, updated_at=now,
+        )
+        if updated:
+            logger.warning(f"Task {task.id} has no heartbeat, marked as failed.")
+            task.refresh_from_db()
+            publish_task_status(task)
+
+@shared_task
+def preflight_crawl_task(task_id):
+    """
+    預檢爬取任務的樣板，通過後將任務交給排程器，否則標記為失敗。
+    預檢期間任務停在 PREFLIGHT 狀態，排程器不會派送；一個批次的多個預檢分散在 worker 上，不佔用網站行程。
+    """
+    # preflight 以 CrawlTestCasesSubmitter 填入樣板，在模組層級匯入會循環匯入
+    from .preflight import preflight_source
+
+    task = CrawlTestCasesTask.objects.select_related('problem', 'crawler_source').get(id=task_id)
+    if task.status != Task.Status.PREFLIGHT:
+        logger.info(f"Task {task.id} is {task.status} before pre-flight, skipping.")
+        return
+
+    try:
+        error = preflight_source(task.crawler_source, task.problem, task.header_code, task.footer_code)
+    except Exception as e:
+        logger.error(f"Pre-flight of task {task.id} failed.", exc_info=True)
+        error = f"Pre-flight failed: {e}"
+
+    new_status = Task.Status.FAILURE if error else Task.Status.PENDING
+    # 建立任務時的估計只用彙總的長度，排程器讓短任務優先前先換成模擬走訪的確切探測數
+    estimated_probes = task.estimated_probes if error else simulate_crawl(task.problem, task.mode, task.crawler_source).probes
+    # 預檢期間被取消的任務維持取消
+    updated = CrawlTestCasesTask.objects.filter(id=task.id, status=Task.Status.PREFLIGHT).update(
+        status=new_status, result={'error': error} if error else task.result, estimated_probes=estimated_probes, updated_at=timezone.now(),
+    )
+    if not updated:
+        return
+    task.refresh_from_db()
+    publish_task_status(task)
+    if not error:
+        schedule_crawls.delay()
+
+@shared_task(bind=True)
+def verify_test_cases_task(self, task_id):
+    """以 checksum 探測驗證題目已儲存的測資，並只重新爬取錯誤位置之後的部分"""
+    task = VerifyTestCasesTask.objects.get(id=task_id)
+    if task.status in STOPPED_TASK_STATUSES:
+        logger.info(f"Task {task.id} is {task.status} before starting, skipping.")
+        return
+
+    lease = AccountLease()
+    control = TaskControlListener(task.id)
+    control.start()
+    task_metrics = TaskMetrics(task.id).activate()
+
+    try:
+        task.status = Task.Status.IN_PROGRESS
+        task.progress = 5
+        task.save()
+        publish_task_status(task)
+
+        ready_account_pool = lease.acquire(settings.ACCOUNTS_PER_VERIFY_TASK)
+        buffer = WriteBehindBuffer(task, metrics=task_metrics)
+        submitter = CrawlTestCasesSubmitter(ready_account_pool, task.crawler_source, task.problem, task.header_code, task.footer_code, buffer=buffer)
+        verifier = TestCaseVerifier(submitter, moduli=checksum_moduli(task.crawler_source.code))
+
+        test_cases = list(TestCase.objects.filter(problem=task.problem).order_by('id'))
+        contents = [test_case.content for test_case in test_cases]
+        ok_ids, missing_ids, corrupted = [], [], []
+
+        for i, test_case in enumerate(test_cases):
+            if control.should_stop():
+                break
+
+            anchor = find_anchor(test_case.content, contents)
+            # 測資是另一筆測資的前綴時，較長的測資也會以 anchor 開頭，無法確認長度
+            extended = any(other != test_case.content and other.startswith(test_case.content) for other in contents)
+            outcome = verifier.verify(test_case.content, anchor, repair=task.repair, check_length=not extended, others=contents)
+            if outcome.status == 'OK':
+                ok_ids.append(test_case.id)
+            elif outcome.status == 'MISSING':
+                missing_ids.append(test_case.id)
+            else:
+                corrupted.append({'id': test_case.id, 'first_bad_position': outcome.first_bad_position})
+                if outcome.repaired_content is not None:
+                    logger.info(f"Test case {test_case.id} repaired from position {outcome.first_bad_position}.")
+                    test_case.content = outcome.repaired_content
+                    test_case.save(update_fields=['content', 'updated_at'])
+
+            buffer.set_progress(10 + (i + 1) * 90 // len(test_cases))
+            buffer.maybe_flush()
+
+        buffer.flush()
+        result = {
+            'ok': len(ok_ids),
+            'corrupted': corrupted,
+            'repaired': task.repair,
+            'missing': missing_ids,
+            'verify_probes': verifier.probes,
+        }
+        if control.should_stop():
+            task.status = Task.Status.CANCELLED if control.cancel_requested else Task.Status.PAUSED
+            result['message'] = f"Verification stopped by user after {len(ok_ids) + len(corrupted) + len(missing_ids)} test case(s)."
+        else:
+            task.status = Task.Status.SUCCESS
+            task.progress = 100
+            result['message'] = f"Verified {len(test_cases)} test case(s)."
+        task.result = buffer.result_with_stats(result)
+        task.save()
+        publish_task_status(task)
+
+    except Exception as e:
+        logger.error(f"Verify task {task.id} failed.", exc_info=True)
+        task.status = Task.Status.FAILURE
+        task.result = {'error': str(e)}
+        task.save()
+        publish_task_status(task)
+
+    finally:
+        control.stop()
+        task_metrics.deactivate()
+        lease.release()
+        # 釋出的 worker 與帳號可以派送等待中的爬取任務
+        schedule_crawls.delay()
+
+@shared_task(bind=True)
+def benchmark_crawler_sources_task(self, task_id):
+    """
+    對題目可用的每個 CrawlerSource 重複校正探測，量測判題時間、雜訊與可用的進位數，
+    並將結果快取在 CrawlerSourceBenchmark 中，供建立爬取任務時自動挑選最快的版本。
+    """
+    task = BenchmarkCrawlerSourcesTask.objects.get(id=task_id)
+    if task.status in STOPPED_TASK_STATUSES:
+        logger.info(f"Task {task.id} is {task.status} before starting, skipping.")
+        return
+
+    lease = AccountLease()
+    control = TaskControlListener(task.id)
+    control.start()
+    task_metrics = TaskMetrics(task.id).activate()
+
+    try:
+        task.status = Task.Status.IN_PROGRESS
+        task.progress = 5
+        task.save()
+        publish_task_status(task)
+
+        sources = candidate_sources(task.problem)
+        if not sources:
+            raise Exception(f"No crawler source supports the languages of problem {task.problem.oj_display_id}.")
+
+        ready_account_pool = lease.acquire(settings.ACCOUNTS_PER_VERIFY_TASK)
+        buffer = WriteBehindBuffer(task, metrics=task_metrics)
+        measured = []
+
+        for i, crawler_source in enumerate(sources):
+            if control.should_stop():
+                break
+            fields = {'code_size': len(crawler_source.code.get('get_next_char', ''))}
+            try:
+                submitter = CrawlTestCasesSubmitter(ready_account_pool, crawler_source, task.problem, task.header_code, task.footer_code, buffer=buffer)
+                with metrics.span('source_benchmark'):
+                    measurement = measure_channel(submitter, rounds=settings.CRAWLER_SOURCE_BENCHMARK_ROUNDS)
+                fields.update(
+                    latency=measurement.latency,
+                    noise=measurement.noise if math.isfinite(measurement.noise) else None,
+                    usable_radix=measurement.usable_radix,
+                    bytes_per_second=measurement.bytes_per_second,
+                    probes=measurement.probes,
+                    error='',
+                )
+            except Exception as e:
+                # 一個版本無法編譯或判題失敗，不影響其他版本的量測
+                logger.warning(f"Benchmarking crawler source {crawler_source.name} on task {task.id} failed: {e}")
+                fields.update(latency=None, noise=None, usable_radix=0, bytes_per_second=0, probes=0, error=str(e))
+
+            benchmark, _ = CrawlerSourceBenchmark.objects.update_or_create(
+                problem=task.problem, crawler_source=crawler_source, defaults=fields,
+            )
+            measured.append(benchmark)
+            buffer.set_progress(10 + (i + 1) * 90 // len(sources))
+            buffer.maybe_flush()
+
+        buffer.flush()
+        ranking = sorted(measured, key=lambda benchmark: (-benchmark.bytes_per_second, benchmark.code_size))
+        recommended = next((benchmark for benchmark in ranking if not benchmark.error and benchmark.bytes_per_second > 0), None)
+        result = {
+            'recommended_crawler_source_id': recommended.crawler_source_id if recommended else None,
+            'sources': [
+                {
+                    'crawler_source_id': benchmark.crawler_source_id,
+                    'name': benchmark.crawler_source.name,
+                    'language': benchmark.crawler_source.language,
+                    'latency': benchmark.latency,
+                    'noise': benchmark.noise,
+                    'usable_radix': benchmark.usable_radix,
+                    'bytes_per_second': benchmark.bytes_per_second,
+                    'code_size': benchmark.code_size,
+                    'error': benchmark.error,
+                }
+                for benchmark in ranking
+            ],
+        }
+        if control.should_stop():
+            task.status = Task.Status.CANCELLED if control.cancel_requested else Task.Status.PAUSED
+            result['message'] = f"Benchmark stopped by user after {len(measured)} of {len(sources)} crawler source(s)."
+        else:
+            task.status = Task.Status.SUCCESS
+            task.progress = 100
+            result['message'] = f"Benchmarked {len(sources)} crawler source(s)."
+        task.result = buffer.result_with_stats(result)
+        task.save()
+        publish_task_status(task)
+
+    except Exception as e:
+        logger.error(f"Benchmark task {task.id} failed.", exc_info=True)
+        task.status = Task.Status.FAILURE
+        task.result = {'error': str(e)}
+        task.save()
+        publish_task_status(task)
+
+    finally:
+        control.stop()
+        task_metrics.deactivate()
+        lease.release()
+        # 釋出的 worker 與帳號可以派送等待中的爬取任務
+        schedule_crawls.delay()
+
 @shared_task(bind=True)
 def execute_create_accounts_task(self, task_id):
     """執行一個批量創建帳號的任務"""
     try:
         task = CreateAccountsTask.objects.get(id=task_id)
+        if task.status in STOPPED_TASK_STATUSES:
+            logger.info(f"Task {task.id} is {task.status} before starting, skipping.")
+            return
         task.status = Task.Status.IN_PROGRESS
         task.save(update_fields=['status'])
+        publish_task_status(task)
     except CreateAccountsTask.DoesNotExist:
         logging.warning("CreateAccountsTask DoesNotExist")
         return
         
+    control = TaskControlListener(task.id)
+    control.start()
+    task_metrics = TaskMetrics(task.id).activate()
+    # 進度只會定期寫回；任務結束時的 task.save() 會一併寫入記憶體中最新的進度
+    buffer = WriteBehindBuffer(task, metrics=task_metrics)
+
     try:
         target_quantity = task.quantity
         success_count, failure_count = 0, 0
         max_failures = target_quantity * 2
         # ... (帳號創建的主迴圈) ...
         while success_count < target_quantity:
-            task.refresh_from_db(fields=['status'])
-            if task.status == Task.Status.PAUSED:
+            if control.cancel_requested:
+                logger.info(f"Task {task.id} has been cancelled by user.")
+                task.status = Task.Status.CANCELLED
+                task.result = buffer.result_with_stats({'message': f'Task cancelled by user after creating {success_count} accounts.'})
+                task.save()
+                publish_task_status(task)
+                return
+
+            if control.pause_requested:
                 logger.info(f"Task {task.id} has been paused by user.")
-                task.result = {'message': f'Task paused by user after creating {success_count} accounts.'}
+                task.status = Task.Status.PAUSED
+                task.result = buffer.result_with_stats({'message': f'Task paused by user after creating {success_count} accounts.'})
                 task.save()
+                publish_task_status(task)
                 return
 
             if failure_count > max_failures:
@@ -262,31 +1234,41 @@ def execute_create_accounts_task(self, task_id):
             except AccountExistsError:
                 # 帳號已存在，不是致命錯誤，記錄日誌並繼續
                 logging.info(f"Account {new_username} already exists, trying next.")
+                metrics.inc('registration_failures', reason='account_exists')
                 failure_count += 1
                 continue
             except CaptchaError:
                 # 驗證碼錯誤，可以重試
                 logging.warning("Captcha failed, retrying.")
+                metrics.inc('registration_failures', reason='captcha')
                 failure_count += 1
                 continue
             else:
                 # 成功後，儲存到資料庫
                 Account.objects.create(username=new_username)
+                metrics.inc('accounts_created')
                 success_count += 1
                 # ... 更新進度 ...
-                task.progress = success_count * 100 // target_quantity
-                task.save(update_fields=['progress'])
+                buffer.set_progress(success_count * 100 // target_quantity)
+                buffer.maybe_flush()
+                publish_task_status(task)
 
         
         # 任務成功
         task.status = Task.Status.SUCCESS
         task.progress = 100
-        task.result = {'message': f'Successfully created {target_quantity} accounts.'}
+        task.result = buffer.result_with_stats({'message': f'Successfully created {target_quantity} accounts.'})
         task.save()
+        publish_task_status(task)
 
     except Exception as e:
         # 任務失敗
         logger.error(f"Task {task.id} failed unexpectedly.", exc_info=True)
         task.status = Task.Status.FAILURE
         task.result = {'error': str(e)}
-        task.save()
\ No newline at end of file
+        task.save()
+        publish_task_status(task)
+
+    finally:
+        control.stop()
+        task_metrics.deactivate()
@@ -1,3 +1,721 @@
-from django.test import TestCase
+import io
+import subprocess
+import sys
+import tarfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.db import DatabaseError
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from . import archive
+from .benchmark.fake_oj import FakeOJConfig, evaluate_probe
+from .benchmark.harness import BenchmarkRecorder, MemoryProbeCache, generate_test_cases, run_benchmark
+from .clients.oj_client import OJClient, Result
+from .core.alphabet import alphabet_of, choose_symbol_code
+from .core.channel import NOISE_MARGIN, ChannelMeasurement, choose_check_code, measure_channel, noise_upper_bound, usable_radix
+from .core.cost_model import probes_for_shape, probes_for_test_cases
+from .core.crawler_core import CHAR_READ_ATTEMPTS, CheckCode, CrawlerCore, DecodeError, prefix_text
+from .core.incremental import plan_incremental_crawl, testcase_fingerprint
+from .core.per_case import NoisyChannelError, PerCaseCrawler
+from .core.prefix_hash import HashedPrefix, PrefixHasher, digest_prefix, prefix_hash
+from .core.sharding import ShardRange, plan_shards
+from .core.trace_replay import record_params, replay_trace
+from .core.verifier import CHECKSUM_MODULI, CHECKSUM_MODULUS, TestCaseVerifier, find_anchor, prefix_checksum
+from .metrics import DurationHistogram
+from .models import Account, CrawlerSource, CrawlTestCasesTask, Problem, Task, VerifyTestCasesTask
+from .preflight import preflight_source
+from .scheduler import accounts_needed, crawl_slots, pick_next
+from .serializers import TestCaseSerializer
+from .tasks import CrawlTestCasesSubmitter, _reap_stale_tasks, preflight_crawl_task
+from .write_behind import JSONMerge, WriteBehindBuffer
+
+
+class ArchiveTests(SimpleTestCase):
+    contents = [b'1 2\n', b'x' * 600, b'']
+
+    def stream(self, start=None, end=None):
+        members = [archive.TarMember(name=f"{i}.in", size=len(data), mtime=0) for i, data in enumerate(self.contents, start=1)]
+        offsets, total = archive.build_layout(members)
+        start, end = (0, total - 1) if start is None else (start, end)
+        first, last = archive.overlapping_members(members, offsets, start, end)
+        return b''.join(archive.iter_tar_range(members, offsets, total, self.contents[first:last], start, end)), total
+
+    def test_full_stream_is_a_valid_tar(self):
+        data, total = self.stream()
+        self.assertEqual(len(data), total)
+        with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+            self.assertEqual([tar.extractfile(name).read() for name in tar.getnames()], self.contents)
+
+    def test_range_matches_the_full_stream(self):
+        full, total = self.stream()
+        for start, end in ((0, 0), (500, 1100), (1024, total - 1), (total - 10, total - 1)):
+            with self.subTest(start=start, end=end):
+                self.assertEqual(self.stream(start, end)[0], full[start:end + 1])
+
+    def test_parse_range_header(self):
+        self.assertEqual(archive.parse_range_header('bytes=10-', 100), (10, 99))
+        self.assertEqual(archive.parse_range_header('bytes=-10', 100), (90, 99))
+        self.assertEqual(archive.parse_range_header('bytes=0-500', 100), (0, 99))
+        self.assertIsNone(archive.parse_range_header('bytes=0-1,5-6', 100))
+        with self.assertRaises(ValueError):
+            archive.parse_range_header('bytes=100-', 100)
+
+    def test_truncated_preview(self):
+        preview = SimpleNamespace(content_preview='1 2', content_length=10, content='')
+        self.assertTrue(TestCaseSerializer().get_truncated(preview))
+        self.assertFalse(TestCaseSerializer().get_truncated(SimpleNamespace(content='1 2')))
+
+
+@mock.patch('crawler.write_behind.transaction.atomic', mock.MagicMock())
+class WriteBehindBufferTests(SimpleTestCase):
+    def test_failed_flush_is_merged_into_the_next_one(self):
+        buffer = WriteBehindBuffer(Task(), flush_interval=60)
+        first, second = Account(id=1), Account(id=2)
+        buffer.touch_account(first)
+        buffer.touch_account(second)
+        buffer.set_progress(5)
+        buffer.add_stats(submissions=2)
+        with mock.patch('crawler.write_behind.Account.objects') as accounts, \
+                mock.patch('crawler.write_behind.Task.objects') as tasks:
+            accounts.bulk_update.side_effect = [DatabaseError, None]
+            with self.assertLogs('crawler.write_behind', 'WARNING'):
+                buffer.flush()
+            # 失敗後才發生的寫入比保留下來的舊值新
+            buffer.touch_account(first)
+            buffer.set_progress(7)
+            buffer.add_stats(submissions=1)
+            buffer.flush()
+            self.assertEqual(accounts.bulk_update.call_count, 2)
+            updated = {account.id: account.last_used for account in accounts.bulk_update.call_args[0][0]}
+            self.assertEqual(updated, {1: first.last_used, 2: second.last_used})
+            fields = tasks.filter.return_value.update.call_args.kwargs
+            self.assertEqual(fields['progress'], 7)
+            self.assertEqual(fields['result'].patch['stats'], {'submissions': 3})
+            # 全部寫回後不再有待寫入的資料
+            buffer.flush()
+            self.assertEqual(accounts.bulk_update.call_count, 2)
+
+    def test_flush_merges_stats_without_overwriting_the_result(self):
+        # 記憶體中的 result 是任務開始時的內容，暫停的 API 之後寫入的訊息只存在資料庫中
+        buffer = WriteBehindBuffer(Task(result={'message': 'started'}), flush_interval=60)
+        buffer.add_stats(submissions=1)
+        with mock.patch('crawler.write_behind.Task.objects') as tasks:
+            buffer.flush()
+        merge = tasks.filter.return_value.update.call_args.kwargs['result']
+        self.assertIsInstance(merge, JSONMerge)
+        self.assertEqual(merge.patch, {'stats': {'submissions': 1}})
+
+
+class FakeOJProbeTests(SimpleTestCase):
+    def test_next_char_respects_prefix_and_limit(self):
+        self.assertEqual(evaluate_probe({'probe': 'get_next_char', 'prefix': 'ab', 'limit': 256}, 'abc'), ord('c'))
+        self.assertEqual(evaluate_probe({'probe': 'get_next_char', 'prefix': 'ab', 'limit': ord('c')}, 'abc'), -1)
+        self.assertEqual(evaluate_probe({'probe': 'get_next_char', 'prefix': 'abc', 'limit': 256}, 'abc'), 0)
+        self.assertEqual(evaluate_probe({'probe': 'get_next_char', 'prefix': 'x', 'limit': 256}, 'abc'), -1)
+
+    def test_next_char_matches_hashed_prefix(self):
+        probe = {'probe': 'get_next_char', 'prefix_hash': prefix_hash(b'ab'), 'prefix_length': 2, 'limit': 256}
+        self.assertEqual(evaluate_probe(probe, 'abc'), ord('c'))
+        self.assertEqual(evaluate_probe(probe, 'ab'), 0)
+        self.assertEqual(evaluate_probe(probe, 'xbc'), -1)
+
+    def test_prefix_hasher_follows_backtracking(self):
+        hasher = PrefixHasher()
+        for prefix in (b'a', b'ab', b'abc', b'ab', b'abd', b'abe', b'abef', b'x'):
+            self.assertEqual(hasher.digest(prefix), prefix_hash(prefix))
+
+    def test_hashed_prefix_tracks_appends_and_truncation(self):
+        prefix = HashedPrefix(b'ab')
+        prefix.append(ord('c'))
+        self.assertEqual(prefix.digest(), prefix_hash(b'abc'))
+        del prefix[1:]
+        self.assertEqual(prefix.digest(), prefix_hash(b'a'))
+        prefix.clear()
+        self.assertEqual(prefix.digest(), prefix_hash(b''))
+        prefix.extend(b'xyz')
+        with memoryview(prefix) as view:
+            # CrawlerCore 傳入的 memoryview 直接使用記住的雜湊，兄弟前綴由雜湊接續計算
+            digest = digest_prefix(view)
+            self.assertEqual(digest, (3, ord('z'), prefix_hash(b'xyz')))
+            self.assertEqual(digest.child(ord('w')).hash, prefix_hash(b'xyzw'))
+
+    def test_prefix_length_only_counts_smaller_cases(self):
+        probe = {'probe': 'get_prefix_length_length', 'prefix': 'abd'}
+        self.assertEqual(evaluate_probe(probe, 'abc'), 1)
+        self.assertEqual(evaluate_probe(probe, 'abe'), -1)
+        probe = {'probe': 'get_prefix_length', 'prefix': 'abd', 'length_prefix': 0, 'position': 0}
+        self.assertEqual(evaluate_probe(probe, 'abc'), 2)
+
+    def test_anchor_is_unique_among_all_cases(self):
+        self.assertEqual(find_anchor('abc', ['abc', 'abd', 'b']), 'abc')
+        self.assertEqual(find_anchor('ab', ['ab', 'abc']), 'ab')
+
+
+class BenchmarkTests(SimpleTestCase):
+    def test_every_mode_decodes_a_noiseless_judge(self):
+        config = FakeOJConfig(test_cases=generate_test_cases(4, 3, seed=1), judge_latency=0, seed=1)
+        for report in run_benchmark(config, poll_interval=0):
+            with self.subTest(mode=report.mode):
+                self.assertIsNone(report.error)
+                self.assertEqual(report.decode_error_rate, 0)
+                self.assertGreater(report.probes, 0)
+                if 'estimated_probes' in report.extra:
+                    self.assertEqual(report.probes, report.extra['estimated_probes'])
+
+    def test_non_ascii_bytes_are_crawled_exactly(self):
+        test_cases = ['caf\xe9\n', '\xff\x01"\\', '\x7f\x80 \\u0041']
+        config = FakeOJConfig(test_cases=test_cases, judge_latency=0, seed=1)
+        for report in run_benchmark(config, modes=['full', 'sharded', 'per_case', 'pairs'], poll_interval=0):
+            with self.subTest(mode=report.mode):
+                self.assertIsNone(report.error)
+                self.assertEqual(report.decode_error_rate, 0)
+
+    def test_branch_probe_replaces_prefix_length_probes(self):
+        # 共同前綴超過 branch_radix - 1 的兩筆測資要改用原本的探測
+        test_cases = ['a' * 300 + 'x', 'a' * 300 + 'y', 'ab', 'b', '\x00\x01']
+        config = FakeOJConfig(test_cases=test_cases, judge_latency=0, seed=1)
+        full, branch = run_benchmark(config, modes=['full', 'branch'], poll_interval=0)
+        self.assertEqual(branch.decode_error_rate, 0)
+        self.assertEqual(branch.probes, branch.extra['estimated_probes'])
+        self.assertLess(branch.probes, full.probes)
+
+    def test_check_probes_correct_a_noisy_judge(self):
+        config = FakeOJConfig(test_cases=generate_test_cases(4, 3, seed=2), judge_latency=0, memory_noise=100000, seed=2)
+        report, = run_benchmark(config, modes=['checked'], poll_interval=0)
+        self.assertEqual(report.decode_error_rate, 0)
+        self.assertGreater(report.extra['check_probes_per_read'], 0)
+
+    def test_speculation_reuses_predicted_probes(self):
+        config = FakeOJConfig(test_cases=['1 2\n', '1 3\n', '2 2\n'], judge_latency=0, seed=1)
+        report, = run_benchmark(config, modes=['speculative'], poll_interval=0)
+        self.assertEqual(report.decode_error_rate, 0)
+        self.assertEqual(report.probes, report.extra['estimated_probes'])
+        self.assertGreater(report.extra['speculative_hits'], 0)
+
+    def test_recrawl_is_answered_from_probe_cache(self):
+        config = FakeOJConfig(test_cases=['1 2\n', '2 3\n'], judge_latency=0, seed=1)
+        report, = run_benchmark(config, modes=['recrawl'], poll_interval=0)
+        self.assertEqual(report.decode_error_rate, 0)
+        self.assertEqual(report.probes, report.extra['estimated_probes'])
+        self.assertEqual(report.extra['cache_hits'], report.probes)
+
+    def test_probe_size_does_not_grow_with_prefix(self):
+        sizes = []
+        # 校正探測較短，兩者的探測數都要夠多，平均才不受校正探測所佔的比例影響
+        for length in (200, 400):
+            config = FakeOJConfig(test_cases=['a' * length], judge_latency=0, seed=1)
+            report, = run_benchmark(config, modes=['full'], poll_interval=0)
+            sizes.append(report.extra['code_bytes_per_probe'])
+        self.assertLess(sizes[1], sizes[0] + 20)
+
+
+class ProbeCacheTests(SimpleTestCase):
+    codes = {'get_number': 'number {number}', 'has_case': 'has {fingerprint}', 'get_next_char': 'next {prefix} {limit} {exclude}'}
+
+    def submitter(self, result=Result.WA):
+        client = mock.Mock()
+        client.submit_code.return_value = {'data': {'submission_id': 1}}
+        client.get_submission.return_value = {'data': {'result': result, 'statistic_info': {'memory_cost': 100}}}
+        submitter = CrawlTestCasesSubmitter([(Account(username='probe'), client)], CrawlerSource(code=self.codes, language='C'),
+                                            Problem(oj_submit_id=1), '', '', buffer=BenchmarkRecorder())
+        submitter.poll_interval = 0
+        submitter.cache = MemoryProbeCache()
+        return submitter, client
+
+    def test_repeated_probe_is_answered_from_cache(self):
+        submitter, client = self.submitter()
+        submitter.get_number(1)
+        submitter.get_number(1)
+        self.assertEqual(client.submit_code.call_count, 1)
+
+    def test_unexpected_verdicts_are_not_cached(self):
+        for result in (Result.CE, Result.RE, Result.SE):
+            submitter, client = self.submitter(result)
+            submitter.get_number(1)
+            self.assertEqual(submitter.cache.results, {})
+
+    def test_change_detection_probes_are_not_cached(self):
+        submitter, client = self.submitter()
+        submitter.has_case(7)
+        submitter.exclude_fingerprints = [7]
+        submitter.get_next_char('1', 256)
+        submitter.has_case(7)
+        submitter.get_next_char('1', 256)
+        self.assertEqual(submitter.cache.results, {})
+        self.assertEqual(client.submit_code.call_count, 4)
+
+
+class DurationHistogramTests(SimpleTestCase):
+    def test_quantiles_are_interpolated_within_buckets(self):
+        histogram = DurationHistogram()
+        for _ in range(1000):
+            for seconds in (0.2, 0.3, 3.0, 4.0):
+                histogram.add(seconds)
+        self.assertEqual(histogram.count, 4000)
+        self.assertAlmostEqual(histogram.total, 7500)
+        # 一半的紀錄不超過 0.3 秒，中位數落在 0.3 所在區間 (0.25, 0.5] 的上界
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.5)
+        self.assertTrue(2.5 < histogram.quantile(0.95) <= 4.0)
+        histogram.add(100)
+        self.assertEqual(histogram.quantile(1), 100)
+
+
+class CostModelTests(SimpleTestCase):
+    def test_shape_estimate_matches_exact_count_without_shared_prefixes(self):
+        test_cases = ['abc', 'bcd', 'cde']
+        self.assertEqual(probes_for_shape(3, 3), probes_for_test_cases(test_cases))
+
+
+class NumberChannel:
+    """get_number 的記憶體用量為線性函數，並依序加上給定的誤差"""
+    def __init__(self, errors):
+        self.errors = iter(errors)
+
+    def get_number(self, number):
+        return 10000 + 4096 * number + next(self.errors, 0)
+
+
+class ProbeJudge:
+    """
+    以 fake OJ 的探測語意回答 CrawlerCore 的探測：讀數為所有測資中最大的值，經線性函數轉換，
+    並依序記錄 (樣板, 參數, 讀數)；exclude 中的指紋與增量模式一樣填入每個探測
+    """
+    def __init__(self, test_cases):
+        self.test_cases = test_cases
+        self.records = []
+        self.testcases = []
+        self.exclude = []
+
+    def _probe(self, template_key, **params):
+        probe = {'probe': template_key, 'exclude': self.exclude, **params}
+        value = max(evaluate_probe(probe, test_case) for test_case in self.test_cases)
+        memory = 10000 + 4096 * value
+        self.records.append((template_key, record_params(params), memory))
+        return memory
+
+    def found_testcase(self, testcase):
+        self.testcases.append(testcase)
+
+    def get_number(self, number):
+        return self._probe('get_number', number=number)
+
+    def get_next_char(self, prefix, limit):
+        return self._probe('get_next_char', prefix=prefix_text(prefix), limit=limit)
+
+    def get_prefix_length_length(self, prefix):
+        return self._probe('get_prefix_length_length', prefix=prefix_text(prefix))
+
+    def get_prefix_length(self, prefix, length_prefix, position):
+        return self._probe('get_prefix_length', prefix=prefix_text(prefix), length_prefix=length_prefix, position=position)
+
+    def get_prefix_checksum(self, anchor, length, modulus):
+        return self._probe('get_prefix_checksum', anchor=anchor, length=length, modulus=modulus)
+
+    def has_case(self, fingerprint):
+        return self._probe('has_case', fingerprint=fingerprint)
+
+    def has_unknown_case(self, fingerprints):
+        return self._probe('has_unknown_case', fingerprints=fingerprints)
+
+
+class OutOfRangeJudge(ProbeJudge):
+    """第 at 次起的 count 次 get_next_char 讀數超出位元組的範圍"""
+    def __init__(self, test_cases, at, count):
+        super().__init__(test_cases)
+        self.at, self.count, self.reads = at, count, 0
+
+    def get_next_char(self, prefix, limit):
+        memory = super().get_next_char(prefix, limit)
+        self.reads += 1
+        return memory + 4096 * 300 if self.at <= self.reads < self.at + self.count else memory
+
+
+class DecodeTests(SimpleTestCase):
+    test_cases = ['1 2\n', '20\n']
+
+    def test_out_of_range_reading_is_probed_again(self):
+        judge = OutOfRangeJudge(self.test_cases, at=2, count=1)
+        CrawlerCore(judge).run()
+        self.assertEqual(sorted(judge.testcases), self.test_cases)
+
+    def test_persistent_out_of_range_reading_keeps_the_state(self):
+        judge = OutOfRangeJudge(self.test_cases, at=2, count=10)
+        crawler_core = CrawlerCore(judge)
+        with self.assertRaises(DecodeError):
+            crawler_core.run()
+        state = crawler_core.save_state()
+        self.assertEqual((state.state, state.prefix), ('FINDING_NEXT_CHAR', '2'))
+        # 恢復後從同一個前綴繼續
+        resumed = CrawlerCore(ProbeJudge(self.test_cases))
+        resumed.load_state(state)
+        resumed.run()
+        self.assertEqual(sorted(resumed.submitter.testcases), self.test_cases)
+
+
+class TraceReplayTests(SimpleTestCase):
+    test_cases = ['1 2\n', '1 3\n', '20\n']
+
+    def test_replay_decodes_the_recorded_crawl(self):
+        judge = ProbeJudge(self.test_cases)
+        CrawlerCore(judge).run()
+        result = replay_trace(judge.records)
+        self.assertTrue(result.complete)
+        self.assertEqual(sorted(result.testcases), sorted(self.test_cases))
+
+    def test_records_keep_only_the_prefix_length_and_hash(self):
+        judge = ProbeJudge(self.test_cases)
+        CrawlerCore(judge).run()
+        params = [params for template_key, params, _ in judge.records if template_key == 'get_next_char']
+        self.assertTrue(all('prefix' not in p for p in params))
+        self.assertEqual(max(p['prefix_length'] for p in params), len('1 2\n'))
+
+    def test_truncated_trace_returns_a_resume_state(self):
+        judge = ProbeJudge(self.test_cases)
+        CrawlerCore(judge).run()
+        result = replay_trace(judge.records[:-3])
+        self.assertFalse(result.complete)
+        self.assertIsNotNone(result.missing_probe)
+        self.assertEqual(result.resume_state.state, 'FINDING_NEXT_CHAR')
+
+
+class IncrementalTests(SimpleTestCase):
+    def test_plan_then_crawl_only_new_cases(self):
+        judge = ProbeJudge(['1 2\n', '3 4\n', '5\n'])
+        kept, removed = testcase_fingerprint('1 2\n'), testcase_fingerprint('9\n')
+        crawler_core = CrawlerCore(judge)
+        plan = plan_incremental_crawl(crawler_core, judge, [kept, removed])
+        self.assertEqual((plan.present, plan.removed, plan.has_unknown), ([kept], [removed], True))
+        judge.exclude = plan.present
+        crawler_core.run()
+        self.assertEqual(sorted(judge.testcases), ['3 4\n', '5\n'])
+
+    def test_unchanged_judge_needs_no_crawl(self):
+        judge = ProbeJudge(['1 2\n', '5\n'])
+        fingerprints = [testcase_fingerprint('1 2\n'), testcase_fingerprint('5\n')]
+        plan = plan_incremental_crawl(CrawlerCore(judge), judge, fingerprints)
+        self.assertEqual((plan.present, plan.removed, plan.has_unknown), (fingerprints, [], False))
+
+
+class ShardingTests(SimpleTestCase):
+    def test_plan_expands_breadth_first(self):
+        judge = ProbeJudge(['aa\n', 'ab\n', 'ac\n', 'ba\n', 'bb\n', 'c'])
+        shards = plan_shards(CrawlerCore(judge), judge, shards_wanted=5, max_depth=3)
+        # 第一層的 'c'、'b'、'a' 都展開後才會展開第二層，'a' 的三個子樹超出名額而合併成兩個分片
+        self.assertEqual(shards, [
+            ShardRange('c', 0, 1),
+            ShardRange('b', ord('b'), ord('b') + 1),
+            ShardRange('b', ord('a'), ord('a') + 1),
+            ShardRange('a', ord('b'), ord('d')),
+            ShardRange('a', ord('a'), ord('a') + 1),
+        ])
+
+
+class VerifierTests(SimpleTestCase):
+    def verify(self, judged, stored, content, moduli=CHECKSUM_MODULI):
+        verifier = TestCaseVerifier(ProbeJudge(judged), moduli=moduli)
+        return verifier.verify(content, find_anchor(content, stored), others=stored)
+
+    def test_second_modulus_catches_a_checksum_collision(self):
+        # 第 5、6 個字元分別加 8 與 6，31 * 8 + 6 = 254，模 254 的 checksum 相同
+        judged, stored = 'x 10 20\n', 'x 10 :6\n'
+        self.assertEqual(prefix_checksum(judged, 8), prefix_checksum(stored, 8))
+        self.assertEqual(self.verify([judged], [stored], stored, moduli=(CHECKSUM_MODULUS,)).status, 'OK')
+        outcome = self.verify([judged], [stored], stored)
+        self.assertEqual((outcome.status, outcome.first_bad_position, outcome.repaired_content), ('REPAIRED', 5, judged))
+
+    def test_corruption_inside_the_anchor_is_repaired(self):
+        stored = ['1 2\n', '1 5 6\n']
+        outcome = self.verify(['1 2\n', '1 3 6\n'], stored, '1 5 6\n')
+        self.assertEqual((outcome.status, outcome.first_bad_position, outcome.repaired_content), ('REPAIRED', 2, '1 3 6\n'))
+        # 錯誤位置之後有兩個不屬於其他已儲存測資的分支，無法確定是哪一筆
+        self.assertEqual(self.verify(['1 2\n', '1 3 6\n', '1 4\n'], stored, '1 5 6\n').status, 'MISSING')
+
+
+class ChannelTests(SimpleTestCase):
+    def test_noiseless_channel_uses_full_radix(self):
+        clock = iter(range(100)).__next__
+        measurement = measure_channel(NumberChannel([]), clock=clock)
+        self.assertEqual(measurement.probes, 10)
+        self.assertEqual(measurement.usable_radix, 256)
+        self.assertEqual(measurement.latency, 1)
+        self.assertEqual(measurement.bytes_per_second, 1)
+
+    def test_noise_reduces_usable_radix(self):
+        errors = [4096 * 3, -4096 * 3] * 5
+        measurement = measure_channel(NumberChannel(errors))
+        self.assertGreater(measurement.noise, 1)
+        self.assertLess(measurement.usable_radix, 256)
+
+    def test_few_calibration_points_widen_the_noise_bound(self):
+        # 卡方分布 95% 信賴上界：3 個自由度約為 2.92 倍，自由度越多越接近估計值
+        self.assertAlmostEqual(noise_upper_bound(1.0, 3), 2.92, delta=0.15)
+        self.assertLess(noise_upper_bound(1.0, 100), 1.2)
+
+    def test_usable_radix_ranks_on_the_noise_bound(self):
+        # 相同的殘差，校正點少的量測可用的進位數較少
+        few = ChannelMeasurement(latency=1, noise=1.0, probes=5)
+        many = ChannelMeasurement(latency=1, noise=1.0, probes=200)
+        self.assertLess(few.usable_radix, many.usable_radix)
+        self.assertEqual(few.usable_radix, usable_radix(noise_upper_bound(1.0, 3)))
+
+
+class PerCaseJudge:
+    """每筆測資的記憶體用量各自加上依序給定的誤差"""
+    def __init__(self, test_cases, errors=()):
+        self.test_cases = test_cases
+        self.errors = iter(errors)
+        self.testcases = []
+
+    def _memory(self, values):
+        return {str(i): 10000 + 4096 * value + next(self.errors, 0) for i, value in enumerate(values, start=1)}
+
+    def found_testcase(self, testcase):
+        self.testcases.append(testcase)
+
+    def get_number_per_case(self, number):
+        return self._memory([number] * len(self.test_cases))
+
+    def get_char_at_per_case(self, position):
+        return self._memory([ord(case[position]) if position < len(case) else 0 for case in self.test_cases])
+
+
+class PerCaseTests(SimpleTestCase):
+    test_cases = ['1 2\n', '30\n']
+
+    def test_clean_channel_reads_every_case(self):
+        judge = PerCaseJudge(self.test_cases)
+        PerCaseCrawler(judge).run()
+        self.assertEqual(sorted(judge.testcases), sorted(self.test_cases))
+
+    def test_noisy_calibration_refuses_the_mode(self):
+        # 兩筆測資在相鄰的校正點各差半個數值，殘差無法由截距吸收
+        judge = PerCaseJudge(self.test_cases, errors=[4096 // 2, 4096 // 2, -4096 // 2, -4096 // 2] * 5)
+        crawler = PerCaseCrawler(judge)
+        with self.assertRaises(NoisyChannelError):
+            crawler.run()
+        self.assertEqual(crawler.current_internal_state, 'NEEDS_PREDICT')
+        self.assertEqual(judge.testcases, [])
+
+    def test_out_of_range_reading_is_probed_again(self):
+        # 五個校正探測之後，第一個位置讀到超出 [0, 256) 的數值，重送後讀到正確的字元
+        calibration = [0] * 2 * 5
+        judge = PerCaseJudge(self.test_cases, errors=calibration + [4096 * 300, 0, 0, 0])
+        PerCaseCrawler(judge).run()
+        self.assertEqual(sorted(judge.testcases), sorted(self.test_cases))
+
+    def test_persistent_out_of_range_reading_keeps_the_position(self):
+        calibration = [0] * 2 * 5
+        judge = PerCaseJudge(self.test_cases, errors=calibration + [-4096 * 60, 0] * CHAR_READ_ATTEMPTS)
+        crawler = PerCaseCrawler(judge)
+        with self.assertRaises(DecodeError):
+            crawler.run()
+        state = crawler.save_state()
+        self.assertEqual((state.position, state.contents), (0, {}))
+
+
+class CheckCodeTests(SimpleTestCase):
+    def test_windows_shrink_with_noise(self):
+        self.assertEqual(choose_check_code(0).radii, ())
+        self.assertEqual(choose_check_code(1).radii, (NOISE_MARGIN,))
+        self.assertEqual(len(choose_check_code(3).radii), 2)
+        self.assertIsNone(choose_check_code(20))
+
+    def test_misread_outside_window_is_shifted_back(self):
+        code = CheckCode((5,))
+        self.assertEqual(code.correct(97.4, lambda window: window.value(100)), 100)
+        self.assertEqual(code.correct(120, lambda window: window.value(100)), 100)
+        self.assertEqual(code.correct(0.2, lambda window: window.value(-1)), -1)
+
+
+class SymbolCodeTests(SimpleTestCase):
+    def test_clean_channel_packs_and_noisy_channel_spreads(self):
+        alphabet = alphabet_of(['12 -3\n'])
+        packed = choose_symbol_code(alphabet)
+        self.assertEqual((packed.count, packed.spacing), (2, 4))
+        # 間距至少 2 * 4 * 1 = 8，放不下 8 * 8 個數值
+        spread = choose_symbol_code(alphabet, noise=1)
+        self.assertEqual((spread.count, spread.spacing), (1, 32))
+        self.assertGreaterEqual(spread.spacing, 2 * NOISE_MARGIN * 1)
+        # 沒有安全的間距時不使用 get_next_symbols
+        self.assertIsNone(choose_symbol_code(alphabet, noise=5))
+
+    def test_unknown_chars_decode_as_escape(self):
+        code = choose_symbol_code(alphabet_of(['12']))
+        # {0, '1', '2'} 加上跳脫共 4 個符號，一次探測可讀 4 個
+        self.assertEqual(code.count, 4)
+        self.assertEqual(code.decode(code.encode(b'2x')), [ord('2'), None, 0, 0])
+        self.assertEqual(code.decode(code.encode(b'1')), [ord('1'), 0, 0, 0])
+
+
+# 測試環境沒有 bwrap / nsjail，以 env 代替沙箱指令，只驗證指令的組成與 {workdir} 的代換
+@override_settings(CRAWL_PREFLIGHT_SANDBOX=['env', 'PREFLIGHT_WORKDIR={workdir}'])
+@mock.patch('crawler.preflight.utils.get_redis_client', mock.Mock(return_value=mock.Mock(exists=mock.Mock(return_value=0))))
+class PreflightTests(SimpleTestCase):
+    def preflight(self, codes, header_code=''):
+        source = CrawlerSource(name='probe', language='Python', code=codes)
+        return preflight_source(source, Problem(oj_submit_id=1), header_code, '')
+
+    def test_memory_must_grow_with_number(self):
+        growing = {'get_number': "x = b'a' * (({number} + 2) * 65536)"}
+        self.assertIsNone(self.preflight(growing))
+        self.assertIn('does not grow', self.preflight({'get_number': 'x = bytearray(65536 + 0 * {number})'}))
+
+    def test_unused_placeholders_are_rejected(self):
+        self.assertIn('{prefx}', self.preflight({'get_number': 'print({prefx})'}))
+        self.assertIn('{number}', self.preflight({'get_number': 'x = b"a" * (({{number}} + 2) * 65536)'}))
+
+    def test_escaped_braces_are_code(self):
+        growing = {'get_number': 'number = {number}\nx = b"a" * (int(f"{{number}}") + 2) * 65536'}
+        self.assertIsNone(self.preflight(growing))
+        self.assertIsNone(self.preflight({'get_length_bits': 'pass'}, header_code='# {limit}'))
+
+    def test_killed_launcher_is_rejected(self):
+        killer = {'get_length_bits': 'import os, signal; os.kill(os.getppid(), signal.SIGKILL)'}
+        self.assertIn('was killed', self.preflight(killer))
+
+    def test_runtime_errors_are_rejected(self):
+        self.assertIn('exited with status', self.preflight({'get_char_at': 'raise SystemExit({position} + 1)'}))
+
+    @mock.patch('crawler.preflight.LOCAL_MEMORY_LIMIT', 256 * 1024 ** 2)
+    def test_resource_limits_apply_to_the_probe(self):
+        # 上限由 launcher 在子行程中設定，超過位址空間上限的配置會失敗
+        self.assertIn('exited with status', self.preflight({'get_char_at': 'x = bytearray(512 * 1024 ** 2 + {position})'}))
+        self.assertIsNone(self.preflight({'get_char_at': 'x = bytearray(16 * 1024 ** 2 + {position})'}))
+
+    def test_probes_run_only_in_a_sandbox(self):
+        flat = {'get_number': 'x = bytearray(65536 + 0 * {number})'}
+        with override_settings(CRAWL_PREFLIGHT_SANDBOX=[]):
+            self.assertIsNone(self.preflight(flat))
+        self.assertIn('does not grow', self.preflight(flat))
+
+
+class PreflightTaskTests(SimpleTestCase):
+    def run_preflight(self, error, updated=1):
+        task = CrawlTestCasesTask(status=Task.Status.PREFLIGHT, problem=Problem(oj_submit_id=1), crawler_source=CrawlerSource(name='probe', language='C', code={}))
+        task.refresh_from_db = mock.Mock()
+        with mock.patch('crawler.tasks.CrawlTestCasesTask.objects') as crawl_tasks, \
+                mock.patch('crawler.tasks.simulate_crawl', return_value=SimpleNamespace(probes=42)), \
+                mock.patch('crawler.preflight.preflight_source', return_value=error), \
+                mock.patch('crawler.tasks.publish_task_status'), \
+                mock.patch('crawler.tasks.schedule_crawls') as schedule:
+            crawl_tasks.select_related.return_value.get.return_value = task
+            crawl_tasks.filter.return_value.update.return_value = updated
+            preflight_crawl_task(task.id)
+        return crawl_tasks.filter.return_value.update, schedule.delay
+
+    def test_passing_task_is_released_to_the_scheduler(self):
+        update, schedule = self.run_preflight(None)
+        self.assertEqual(update.call_args.kwargs['status'], Task.Status.PENDING)
+        # 排程前換成模擬走訪的確切探測數
+        self.assertEqual(update.call_args.kwargs['estimated_probes'], 42)
+        schedule.assert_called_once()
+
+    def test_failing_task_is_not_scheduled(self):
+        update, schedule = self.run_preflight('bad template')
+        self.assertEqual(update.call_args.kwargs['status'], Task.Status.FAILURE)
+        self.assertEqual(update.call_args.kwargs['result'], {'error': 'bad template'})
+        schedule.assert_not_called()
+
+    def test_task_cancelled_during_preflight_stays_cancelled(self):
+        _, schedule = self.run_preflight(None, updated=0)
+        schedule.assert_not_called()
+
+
+class LazyImportTests(SimpleTestCase):
+    def test_web_modules_do_not_import_torch(self):
+        code = (
+            "import sys, django; django.setup(); "
+            "import crawler.views, crawler.tasks, orange_juice.urls; "
+            "print('torch' in sys.modules)"
+        )
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip().splitlines()[-1], 'False')
+
+
+@override_settings(CAPTCHA_MIN_CONFIDENCE=0.5, CAPTCHA_MAX_REFRESHES=2)
+class CaptchaGateTests(SimpleTestCase):
+    def solve(self, *solutions):
+        solutions = iter(SimpleNamespace(text=text, confidence=confidence) for text, confidence in solutions)
+        solver = SimpleNamespace(solve_captcha_with_confidence=lambda image: next(solutions))
+        client = OJClient()
+        with mock.patch.dict(sys.modules, {'crawler.clients.captcha_solver': solver}), \
+                mock.patch.object(client, '_fetch_captcha', return_value=b'') as fetch:
+            return client._solve_confident_captcha(), fetch.call_count
+
+    def test_low_confidence_captcha_is_refreshed(self):
+        self.assertEqual(self.solve(('aaaa', 0.3), ('bbbb', 0.9)), ('bbbb', 2))
+
+    def test_gives_up_after_max_refreshes(self):
+        self.assertEqual(self.solve(('aaaa', 0.1), ('bbbb', 0.2), ('cccc', 0.3), ('dddd', 0.9)), ('cccc', 3))
+
+
+@override_settings(CRAWL_PRIORITY_AGING_SECONDS=600)
+class SchedulerTests(SimpleTestCase):
+    def make_task(self, problem_id, owner='alice', priority=0, estimated_probes=None, waited=0, shard_count=1):
+        now = timezone.now()
+        return CrawlTestCasesTask(problem_id=problem_id, owner=owner, priority=priority, shard_count=shard_count,
+                                  estimated_probes=estimated_probes, created_at=now - timedelta(seconds=waited))
+
+    def test_priority_then_owner_share_then_short_jobs(self):
+        running = [self.make_task(1, owner='alice')]
+        urgent = self.make_task(2, owner='alice', priority=5)
+        long_job = self.make_task(3, owner='bob', estimated_probes=10000)
+        short_job = self.make_task(4, owner='bob', estimated_probes=100)
+        alice_job = self.make_task(5, owner='alice', estimated_probes=10)
+        picked = pick_next([alice_job, long_job, short_job, urgent], running, 3, timezone.now())
+        self.assertEqual(picked, [urgent, short_job, long_job])
+
+    def test_waiting_raises_priority_and_problems_do_not_overlap(self):
+        old = self.make_task(1, waited=3600)
+        new = self.make_task(2, priority=3)
+        duplicate = self.make_task(1, priority=10)
+        picked = pick_next([new, old], [duplicate], 2, timezone.now())
+        self.assertEqual(picked, [new])
+        self.assertEqual(pick_next([new, old], [], 2, timezone.now()), [old, new])
+
+    @override_settings(CRAWL_MAX_CONCURRENT_TASKS=8, ACCOUNTS_PER_CRAWL_TASK=50, ACCOUNTS_PER_CRAWL_SHARD=10)
+    def test_sharded_tasks_take_a_worker_and_accounts_per_shard(self):
+        sharded = self.make_task(1, priority=5, shard_count=4)
+        small = self.make_task(2, priority=1)
+        other = self.make_task(3)
+        # 4 個分片佔用 4 個 worker，剩下 2 個名額只夠再派送兩個一般任務
+        self.assertEqual(pick_next([other, small, sharded], [], 6, timezone.now()), [sharded, small, other])
+        self.assertEqual(pick_next([other, small, sharded], [], 5, timezone.now()), [sharded, small])
+        # 排在最前面的分散任務容納不下時，不讓後面的小任務插隊
+        self.assertEqual(pick_next([small, sharded], [], 3, timezone.now()), [])
+        # 帳號：4 × 10 個給分片，剩下 50 個只夠一個一般任務
+        self.assertEqual(pick_next([other, small, sharded], [], 8, timezone.now(), accounts=100), [sharded, small])
+        # 沒有任務執行時，帳號不足仍派送一個任務
+        self.assertEqual(pick_next([small], [], 8, timezone.now(), accounts=0), [small])
+        self.assertEqual(pick_next([small], [other], 8, timezone.now(), accounts=0), [])
+
+    @override_settings(CRAWL_MAX_CONCURRENT_TASKS=4, ACCOUNTS_PER_VERIFY_TASK=5)
+    def test_verify_tasks_on_the_crawl_queue_take_a_slot(self):
+        verify = VerifyTestCasesTask(problem_id=1)
+        self.assertEqual(crawl_slots([self.make_task(1), verify]), 2)
+        self.assertEqual(accounts_needed(verify), 5)
+
+    @override_settings(CRAWL_HEARTBEAT_TIMEOUT=60)
+    def test_stale_tasks_are_marked_failed_and_keep_their_checkpoint(self):
+        stale = self.make_task(1)
+        stale.id = 'stale'
+        stale.updated_at = timezone.now() - timedelta(minutes=5)
+        stale.result = {'stats': {'submissions': 3}}
+        with mock.patch('crawler.tasks.scheduler.stale_shards', return_value=[]), \
+                mock.patch('crawler.tasks.scheduler.stale_tasks', return_value=[stale]), \
+                mock.patch('crawler.tasks.Task.objects.filter') as task_filter, \
+                mock.patch.object(stale, 'refresh_from_db'), \
+                mock.patch('crawler.tasks.publish_task_status') as publish:
+            task_filter.return_value.update.return_value = 1
+            _reap_stale_tasks()
+        # 只在狀態與心跳都沒有改變時更新，crawler_state 不動，任務可以恢復
+        self.assertEqual(task_filter.call_args.kwargs, {'id': 'stale', 'status': Task.Status.IN_PROGRESS, 'updated_at': stale.updated_at})
+        fields = task_filter.return_value.update.call_args.kwargs
+        self.assertEqual(fields['status'], Task.Status.FAILURE)
+        self.assertEqual(fields['result']['stats'], {'submissions': 3})
+        self.assertIn('60 seconds', fields['result']['error'])
+        self.assertNotIn('crawler_state', fields)
+        publish.assert_called_once_with(stale)
@@ -1,7 +1,16 @@
+import functools
 import random
 import string
 
+import redis
+from django.conf import settings
+
 def generate_random_username(prefix="test_acct_", length=8):
     """產生一個帶有前綴的隨機用戶名"""
     random_part = ''.join(random.choices(string.ascii_lowercase + string.digits, k=length))
-    return f"{prefix}{random_part}"
\ No newline at end of file
+    return f"{prefix}{random_part}"
+
+@functools.lru_cache(maxsize=None)
+def get_redis_client():
+    """取得共用的 Redis 連線（每個行程一個連線池）"""
+    return redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
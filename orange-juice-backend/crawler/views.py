@@ -1,110 +1,373 @@
-from django.http import JsonResponse
+import hashlib
+import json
+import redis
+from typing import Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import Length, Substr
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags, quote_etag
 from django.views.generic import View
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils.decorators import method_decorator
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
-from .models import Problem, Task, CrawlerSource, CrawlTestCasesTask, CreateAccountsTask, TestCase
-from .tasks import crawl_test_cases_task, execute_create_accounts_task
+from rest_framework.pagination import CursorPagination
+from .models import Problem, Task, CrawlerSource, CrawlBatch, CrawlTestCasesTask, CreateAccountsTask, TestCase, VerifyTestCasesTask, BenchmarkCrawlerSourcesTask
+from .tasks import benchmark_crawler_sources_task, execute_create_accounts_task, preflight_crawl_task, schedule_crawls, verify_test_cases_task
 from .serializers import ProblemSerializer, CrawlerSourceSerializer, TestCaseSerializer
+from .events import TaskEventSubscription, publish_task_status
+from .control import TaskSignal, send_task_signal, clear_task_signal
+from .core.incremental import missing_incremental_templates
+from .core.per_case import PER_CASE_TEMPLATES
+from .estimation import estimate_crawl
+from .source_selection import candidate_sources, fresh_benchmarks, recommend_source
+from . import archive, metrics
+
+# 進入這些狀態後任務不會再有新事件
+TERMINAL_TASK_STATUSES = (Task.Status.SUCCESS, Task.Status.FAILURE, Task.Status.CANCELLED)
 
 @method_decorator(ensure_csrf_cookie, name='dispatch')
 class GetCSRFToken(View):
     def get(self, request, *args, **kwargs):
         return JsonResponse({'success': 'CSRF cookie set'})
 
+def _request_owner(request) -> str:
+    """用於公平分配的使用者識別：登入的使用者名稱，否則為請求中的 owner 或來源 IP"""
+    if request.user and request.user.is_authenticated:
+        return request.user.get_username()
+    return str(request.data.get('owner') or request.META.get('REMOTE_ADDR', ''))[:150]
+
+# crawler_source_id 為此值時，以快取的量測結果挑選最快的 CrawlerSource
+AUTO_CRAWLER_SOURCE = 'auto'
+
+def _validate_crawl_request(data) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    驗證單一爬取請求，回傳建立 CrawlTestCasesTask 所需的欄位，或錯誤訊息。
+    """
+    oj_problem_id = data.get('oj_problem_id')
+    crawler_source_id = data.get('crawler_source_id')
+    mode = data.get('mode', CrawlTestCasesTask.Mode.FULL)
+
+    if mode not in CrawlTestCasesTask.Mode.values:
+        return None, f"Unknown mode '{mode}'."
+    if not oj_problem_id:
+        return None, "oj_problem_id is required."
+    if not crawler_source_id:
+        return None, "crawler_source_id is required (use 'auto' to pick the fastest benchmarked source)."
+    try:
+        priority = int(data.get('priority', 0))
+    except (TypeError, ValueError):
+        return None, "priority must be an integer."
+    try:
+        shard_count = int(data.get('shard_count', 1))
+    except (TypeError, ValueError):
+        return None, "shard_count must be an integer."
+    if not 1 <= shard_count <= settings.CRAWL_MAX_SHARDS:
+        return None, f"shard_count must be between 1 and {settings.CRAWL_MAX_SHARDS}."
+    if shard_count > 1 and mode != CrawlTestCasesTask.Mode.FULL:
+        return None, "Only full crawls can be sharded."
+
+    try:
+        problem = Problem.objects.get(oj_display_id=oj_problem_id)
+    except Problem.DoesNotExist:
+        return None, f"Problem '{oj_problem_id}' not found."
+    if crawler_source_id == AUTO_CRAWLER_SOURCE:
+        crawler_source = recommend_source(problem)
+        if crawler_source is None:
+            return None, f"No benchmark results for problem '{oj_problem_id}'. Benchmark its crawler sources first or choose one."
+    else:
+        try:
+            crawler_source = CrawlerSource.objects.get(id=crawler_source_id)
+        except (CrawlerSource.DoesNotExist, ValueError):
+            return None, f"Crawler source '{crawler_source_id}' not found."
+
+    # 檢查 crawler_source 的 language 是否在 problem 的 allowed_languages 中
+    if not problem.allowed_languages.count(crawler_source.language):
+        return None, f"Language '{crawler_source.language}' is not allowed for this problem."
+
+    if mode == CrawlTestCasesTask.Mode.INCREMENTAL:
+        missing = missing_incremental_templates(crawler_source.code)
+        if missing:
+            return None, f"Crawler source '{crawler_source.name}' does not support incremental mode, missing: {', '.join(missing)}."
+    if mode == CrawlTestCasesTask.Mode.PER_CASE:
+        missing = [key for key in PER_CASE_TEMPLATES if key not in crawler_source.code]
+        if missing:
+            return None, f"Crawler source '{crawler_source.name}' does not support per-test-case mode, missing: {', '.join(missing)}."
+
+    return {
+        'problem': problem,
+        'crawler_source': crawler_source,
+        'header_code': data.get('header_code', ''),
+        'footer_code': data.get('footer_code', ''),
+        'mode': mode,
+        'priority': priority,
+        'shard_count': shard_count,
+    }, None
+
+def _create_crawl_task(fields: dict, owner: str, batch: Optional[CrawlBatch] = None) -> Tuple[CrawlTestCasesTask, bool, dict]:
+    """
+    建立爬取任務，任務在預檢通過前停在 PREFLIGHT 狀態；同一題已有進行中的任務時直接回傳該任務。
+    回傳 (任務, 是否為新建立, 成本估計)。
+    """
+    problem = fields['problem']
+    estimate = estimate_crawl(problem, fields['mode'], fields['crawler_source'])
+    # 各分片同時進行探測
+    estimate.concurrency = fields.get('shard_count', 1)
+    # 檢查是否有正在進行的任務
+    existing_task = CrawlTestCasesTask.objects.filter(
+        problem=problem,
+        status__in=[Task.Status.PREFLIGHT, Task.Status.PENDING, Task.Status.IN_PROGRESS]
+    ).first()
+    if existing_task:
+        return existing_task, False, estimate.as_dict()
+
+    new_task = CrawlTestCasesTask.objects.create(
+        **fields,
+        status=Task.Status.PREFLIGHT,
+        owner=owner,
+        batch=batch,
+        estimated_probes=estimate.probes,
+    )
+    return new_task, True, estimate.as_dict()
+
 class CrawlTestCasesTaskView(APIView):
+    def post(self, request, *args, **kwargs):
+        fields, error = _validate_crawl_request(request.data)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        task, created, estimate = _create_crawl_task(fields, _request_owner(request))
+        if created:
+            # 樣板在本機就能發現的錯誤不應該等到 judge 回傳 CE / RE 才發現；
+            # 預檢通過後由排程器依優先權與公平分配決定何時送到 crawl 佇列
+            transaction.on_commit(lambda: preflight_crawl_task.delay(task.id))
+
+        return Response(
+            {"task_id": task.id, "estimate": estimate},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+class CrawlBatchView(APIView):
+    """
+    一次建立多個爬取任務，例如整場比賽的題目。
+    請求格式：{"name": "...", "priority": 0, "items": [{"oj_problem_id": ..., "crawler_source_id": ..., ...}]}；
+    項目未指定 priority 時使用批次的 priority。任一項目無效時不會建立任何任務；
+    樣板的預檢在建立後於 worker 上進行，未通過的任務標記為失敗，不影響其他任務。
+    """
+    def post(self, request, *args, **kwargs):
+        items = request.data.get('items')
+        if not isinstance(items, list) or not items:
+            return Response({"error": "items must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.CRAWL_BATCH_MAX_ITEMS:
+            return Response({"error": f"A batch can contain at most {settings.CRAWL_BATCH_MAX_ITEMS} items."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            priority = int(request.data.get('priority', 0))
+        except (TypeError, ValueError):
+            return Response({"error": "priority must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        validated, errors = [], []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append({"index": index, "error": "Each item must be an object."})
+                continue
+            fields, error = _validate_crawl_request({'priority': priority, **item})
+            if error:
+                errors.append({"index": index, "error": error})
+            else:
+                validated.append(fields)
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        owner = _request_owner(request)
+        with transaction.atomic():
+            batch = CrawlBatch.objects.create(name=request.data.get('name', ''), owner=owner, priority=priority)
+            tasks = []
+            for fields in validated:
+                task, created, estimate = _create_crawl_task(fields, owner, batch)
+                tasks.append({
+                    "oj_problem_id": fields['problem'].oj_display_id,
+                    "task_id": task.id,
+                    "created": created,
+                    "estimate": estimate,
+                })
+                if created:
+                    transaction.on_commit(lambda task_id=task.id: preflight_crawl_task.delay(task_id))
+
+        return Response({"batch_id": batch.id, "tasks": tasks}, status=status.HTTP_202_ACCEPTED)
+
+class CrawlBatchStatusView(APIView):
+    def get(self, request, batch_id, *args, **kwargs):
+        batch = get_object_or_404(CrawlBatch, id=batch_id)
+        tasks = batch.tasks.select_related('problem').order_by('-priority', 'created_at')
+        counts = {row['status']: row['count'] for row in tasks.values('status').annotate(count=Count('id')).order_by()}
+        task_list = [
+            {
+                "task_id": task.id,
+                "oj_problem_id": task.problem.oj_display_id,
+                "status": task.status,
+                "progress": task.progress,
+                "priority": task.priority,
+                "dispatched_at": task.dispatched_at,
+            }
+            for task in tasks
+        ]
+        return Response({
+            "batch_id": batch.id,
+            "name": batch.name,
+            "owner": batch.owner,
+            "priority": batch.priority,
+            "created_at": batch.created_at,
+            "counts": counts,
+            "progress": sum(task["progress"] for task in task_list) // len(task_list) if task_list else 0,
+            "tasks": task_list,
+        })
+
+def get_task_status_data(task_id) -> dict:
+    """
+    讀取任務狀態，並以單一查詢同時取得其子類別。
+
+    Raises:
+        Task.DoesNotExist
+    """
+    task = Task.objects.select_related('crawltestcasestask', 'createaccountstask', 'verifytestcasestask', 'benchmarkcrawlersourcestask').get(id=task_id)
+
+    response_data = {
+        "id": task.id,
+        "status": task.status,
+        "progress": task.progress,
+        "result": task.result,
+        "updated_at": task.updated_at
+    }
+
+    # 嘗試獲取具體的任務子類，以便訪問其專有欄位
+    try:
+        crawl_task = task.crawltestcasestask
+        response_data['task_type'] = 'CrawlTestCasesTask'
+        response_data['crawler_state'] = crawl_task.crawler_state
+    except CrawlTestCasesTask.DoesNotExist:
+        try:
+            # 如果需要，也可以處理其他任務類型
+            task.createaccountstask
+            response_data['task_type'] = 'CreateAccountsTask'
+        except CreateAccountsTask.DoesNotExist:
+            try:
+                task.verifytestcasestask
+                response_data['task_type'] = 'VerifyTestCasesTask'
+            except VerifyTestCasesTask.DoesNotExist:
+                try:
+                    task.benchmarkcrawlersourcestask
+                    response_data['task_type'] = 'BenchmarkCrawlerSourcesTask'
+                except BenchmarkCrawlerSourcesTask.DoesNotExist:
+                    response_data['task_type'] = 'Task'
+
+    return response_data
+
+class VerifyTestCasesTaskView(APIView):
+    """
+    驗證題目已儲存的測資，CrawlerSource 必須提供 get_prefix_checksum 樣板。
+    """
     def post(self, request, *args, **kwargs):
         oj_problem_id = request.data.get('oj_problem_id')
         crawler_source_id = request.data.get('crawler_source_id')
-        header_code = request.data.get('header_code', '')
-        footer_code = request.data.get('footer_code', '')
-
-        if not oj_problem_id:
+        if not oj_problem_id or not crawler_source_id:
             return Response(
-                {"error": "oj_problem_id is required."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        if not crawler_source_id:
-            return Response(
-                {"error": "crawler_source_id is required."},
+                {"error": "oj_problem_id and crawler_source_id are required."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        problem = Problem.objects.get(oj_display_id=oj_problem_id)
-        crawler_source = CrawlerSource.objects.get(id=crawler_source_id)
+        problem = get_object_or_404(Problem, oj_display_id=oj_problem_id)
+        crawler_source = get_object_or_404(CrawlerSource, id=crawler_source_id)
 
-        # 檢查 crawler_source 的 language 是否在 problem 的 allowed_languages 中
         if not problem.allowed_languages.count(crawler_source.language):
             return Response(
                 {"error": f"Language '{crawler_source.language}' is not allowed for this problem."},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if 'get_prefix_checksum' not in crawler_source.code:
+            return Response(
+                {"error": f"Crawler source '{crawler_source.name}' has no 'get_prefix_checksum' template."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        # 檢查是否有正在進行的任務
-        existing_task = CrawlTestCasesTask.objects.filter(
+        existing_task = VerifyTestCasesTask.objects.filter(
             problem=problem,
             status__in=[Task.Status.PENDING, Task.Status.IN_PROGRESS]
         ).first()
-
         if existing_task:
-            # 如果已有任務，直接返回該任務 ID
-            return Response(
-                {"task_id": existing_task.id},
-                status=status.HTTP_202_ACCEPTED
-            )
+            return Response({"task_id": existing_task.id}, status=status.HTTP_202_ACCEPTED)
 
-        # 建立新任務
-        new_task = CrawlTestCasesTask.objects.create(
+        new_task = VerifyTestCasesTask.objects.create(
             problem=problem,
             crawler_source=crawler_source,
-            header_code=header_code,
-            footer_code=footer_code
+            header_code=request.data.get('header_code', ''),
+            footer_code=request.data.get('footer_code', ''),
+            repair=bool(request.data.get('repair', True)),
         )
+        verify_test_cases_task.delay(new_task.id)
 
-        # 推送任務到 Celery
-        crawl_test_cases_task.delay(new_task.id)
-
-        return Response(
-            {"task_id": new_task.id},
-            status=status.HTTP_202_ACCEPTED
-        )
+        return Response({"task_id": new_task.id}, status=status.HTTP_202_ACCEPTED)
 
 # 查詢任務狀態的 View (通常會放在另一個 class)
 class TaskStatusView(APIView):
     def get(self, request, task_id, *args, **kwargs):
         try:
-            task = Task.objects.get(id=task_id)
-            
-            response_data = {
-                "id": task.id,
-                "status": task.status,
-                "progress": task.progress,
-                "result": task.result,
-                "updated_at": task.updated_at
-            }
-
-            # 嘗試獲取具體的任務子類，以便訪問其專有欄位
-            try:
-                crawl_task = task.crawltestcasestask
-                response_data['task_type'] = 'CrawlTestCasesTask'
-                response_data['crawler_state'] = crawl_task.crawler_state
-            except CrawlTestCasesTask.DoesNotExist:
-                try:
-                    # 如果需要，也可以處理其他任務類型
-                    task.createaccountstask
-                    response_data['task_type'] = 'CreateAccountsTask'
-                except CreateAccountsTask.DoesNotExist:
-                    response_data['task_type'] = 'Task'
-
-            return Response(response_data, status=status.HTTP_200_OK)
+            return Response(get_task_status_data(task_id), status=status.HTTP_200_OK)
         except Task.DoesNotExist:
             return Response(
                 {"error": "Task not found."},
                 status=status.HTTP_404_NOT_FOUND
             )
 
+class TaskEventsView(View):
+    """
+    以 Server-Sent Events 推送任務狀態。
+    第一個事件是完整的任務快照，之後的事件只包含有變動的欄位，
+    任務結束後串流會自動關閉。需在 ASGI 伺服器下執行。
+    """
+    async def get(self, request, task_id, *args, **kwargs):
+        if not await Task.objects.filter(id=task_id).aexists():
+            return JsonResponse({"error": "Task not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        async def stream():
+            subscription = TaskEventSubscription(task_id)
+            await subscription.open()
+            try:
+                snapshot = await sync_to_async(get_task_status_data)(task_id)
+                yield f"data: {json.dumps(snapshot, cls=DjangoJSONEncoder)}\n\n"
+                if snapshot['status'] in TERMINAL_TASK_STATUSES:
+                    return
+
+                while True:
+                    payload = await subscription.next_message(timeout=settings.TASK_EVENT_KEEPALIVE)
+                    if payload is None:
+                        yield ": keep-alive\n\n"
+                        continue
+                    yield f"data: {payload}\n\n"
+                    if json.loads(payload).get('status') in TERMINAL_TASK_STATUSES:
+                        return
+            finally:
+                await subscription.close()
+
+        response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+class MetricsView(View):
+    """以 Prometheus 文字格式輸出所有 worker 的爬蟲指標"""
+    def get(self, request, *args, **kwargs):
+        try:
+            body = metrics.render_prometheus()
+        except redis.RedisError as e:
+            return HttpResponse(f"# metrics unavailable: {e}\n", status=status.HTTP_503_SERVICE_UNAVAILABLE, content_type='text/plain')
+        return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
 class ResumeCrawlTaskView(APIView):
     def post(self, request, task_id, *args, **kwargs):
         try:
@@ -124,14 +387,17 @@ class ResumeCrawlTaskView(APIView):
         if new_state is not None:
             task.crawler_state = new_state
         
-        # 重設任務狀態以便重新執行
-        task.status = Task.Status.PENDING
+        # 重設任務狀態以便重新執行；樣板可能就是失敗的原因，重新預檢（通過過的樣板有快取）
+        task.status = Task.Status.PREFLIGHT
         task.progress = 0
         task.result = {"message": "Task has been resumed by user."}
+        task.dispatched_at = None
         task.save()
+        clear_task_signal(task.id)
+        publish_task_status(task)
 
-        # 重新將任務推送到 Celery
-        crawl_test_cases_task.delay(task.id)
+        # 預檢通過後交給排程器重新排入 crawl 佇列
+        preflight_crawl_task.delay(task.id)
 
         return Response(
             {"message": "Task has been successfully queued for resumption.", "task_id": task.id},
@@ -187,12 +453,46 @@ class PauseTaskView(APIView):
         task.status = Task.Status.PAUSED
         task.result = {"message": "Task pause request received."}
         task.save()
+        send_task_signal(task.id, TaskSignal.PAUSE)
+        publish_task_status(task)
+        # 等待中的任務不再佔用名額，不必等到 worker 收到訊號才派送下一個任務
+        schedule_crawls.delay()
 
         return Response(
             {"message": "Task has been marked for pausing.", "task_id": task.id},
             status=status.HTTP_200_OK
         )
 
+class CancelTaskView(APIView):
+    """
+    取消任務。執行中的任務會在下一次檢查訊號時停止（爬蟲為下一次提交前），
+    已暫停或失敗的任務則直接標記為已取消，之後無法再恢復。
+    """
+    def post(self, request, task_id, *args, **kwargs):
+        try:
+            task = Task.objects.get(id=task_id)
+        except Task.DoesNotExist:
+            return Response({"error": "Task not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        if task.status in [Task.Status.SUCCESS, Task.Status.CANCELLED]:
+            return Response(
+                {"error": f"Task is in '{task.status}' state and cannot be cancelled."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        task.status = Task.Status.CANCELLED
+        task.result = {"message": "Task cancel request received."}
+        task.save()
+        send_task_signal(task.id, TaskSignal.CANCEL)
+        publish_task_status(task)
+        # 等待中的任務不再佔用名額，不必等到 worker 收到訊號才派送下一個任務
+        schedule_crawls.delay()
+
+        return Response(
+            {"message": "Task has been marked for cancellation.", "task_id": task.id},
+            status=status.HTTP_200_OK
+        )
+
 class ResumeCrawlTaskView(APIView):
     def post(self, request, task_id, *args, **kwargs):
         try:
@@ -212,14 +512,17 @@ class ResumeCrawlTaskView(APIView):
         if new_state is not None:
             task.crawler_state = new_state
         
-        # 重設任務狀態以便重新執行
-        task.status = Task.Status.PENDING
+        # 重設任務狀態以便重新執行；樣板可能就是失敗的原因，重新預檢（通過過的樣板有快取）
+        task.status = Task.Status.PREFLIGHT
         task.progress = 0
         task.result = {"message": "Task has been resumed by user."}
+        task.dispatched_at = None
         task.save()
+        clear_task_signal(task.id)
+        publish_task_status(task)
 
-        # 重新將任務推送到 Celery
-        crawl_test_cases_task.delay(task.id)
+        # 預檢通過後交給排程器重新排入 crawl 佇列
+        preflight_crawl_task.delay(task.id)
 
         return Response(
             {"message": "Task has been successfully queued for resumption.", "task_id": task.id},
@@ -241,9 +544,173 @@ class ProblemDetailView(generics.RetrieveAPIView):
     lookup_field = 'oj_display_id'
     lookup_url_kwarg = 'problem_id'
 
+class CrawlEstimateView(APIView):
+    """
+    不提交任何探測，預估爬取題目所需的探測數與時間，供規劃帳號數量與排程使用。
+    可用 ?concurrency=n 估計同時進行 n 個探測時的時間，?mode= 指定爬取模式。
+    """
+    def get(self, request, problem_id, *args, **kwargs):
+        problem = get_object_or_404(Problem, oj_display_id=problem_id)
+        mode = request.query_params.get('mode', CrawlTestCasesTask.Mode.FULL)
+        if mode not in CrawlTestCasesTask.Mode.values:
+            return Response({"error": f"Unknown mode '{mode}'."}, status=status.HTTP_400_BAD_REQUEST)
+        estimate = estimate_crawl(problem, mode)
+        try:
+            estimate.concurrency = max(int(request.query_params.get('concurrency', 1)), 1)
+        except ValueError:
+            return Response({"error": "concurrency must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(estimate.as_dict())
+
+class CrawlerSourceBenchmarkView(APIView):
+    """
+    GET：題目上各 CrawlerSource 快取的量測結果與建議使用的版本。
+    POST：以題目可用的每個 CrawlerSource 提交校正探測，重新量測並更新快取。
+    """
+    def get(self, request, problem_id, *args, **kwargs):
+        problem = get_object_or_404(Problem, oj_display_id=problem_id)
+        recommended = recommend_source(problem)
+        return Response({
+            "recommended_crawler_source_id": recommended.id if recommended else None,
+            "sources": [
+                {
+                    "crawler_source_id": benchmark.crawler_source_id,
+                    "name": benchmark.crawler_source.name,
+                    "language": benchmark.crawler_source.language,
+                    "latency": benchmark.latency,
+                    "noise": benchmark.noise,
+                    "usable_radix": benchmark.usable_radix,
+                    "bytes_per_second": benchmark.bytes_per_second,
+                    "code_size": benchmark.code_size,
+                    "error": benchmark.error,
+                    "measured_at": benchmark.measured_at,
+                }
+                for benchmark in fresh_benchmarks(problem)
+            ],
+        })
+
+    def post(self, request, problem_id, *args, **kwargs):
+        problem = get_object_or_404(Problem, oj_display_id=problem_id)
+        if not candidate_sources(problem):
+            return Response(
+                {"error": f"No crawler source supports the languages of problem '{problem_id}'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        existing_task = BenchmarkCrawlerSourcesTask.objects.filter(
+            problem=problem,
+            status__in=[Task.Status.PENDING, Task.Status.IN_PROGRESS]
+        ).first()
+        if existing_task:
+            return Response({"task_id": existing_task.id}, status=status.HTTP_202_ACCEPTED)
+
+        new_task = BenchmarkCrawlerSourcesTask.objects.create(
+            problem=problem,
+            header_code=request.data.get('header_code', ''),
+            footer_code=request.data.get('footer_code', ''),
+        )
+        benchmark_crawler_sources_task.delay(new_task.id)
+        return Response({"task_id": new_task.id}, status=status.HTTP_202_ACCEPTED)
+
+class TestCaseCursorPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('created_at', 'id')
+
 class TestCaseListView(generics.ListAPIView):
+    """
+    分頁列出題目的測資。
+    可用 ?truncate=<n> 只取回每筆測資的前 n 個字元，截斷在資料庫端完成。
+    """
     serializer_class = TestCaseSerializer
+    pagination_class = TestCaseCursorPagination
 
     def get_queryset(self):
         problem_id = self.kwargs['problem_id']
-        return TestCase.objects.filter(problem__oj_display_id=problem_id).order_by('created_at')
\ No newline at end of file
+        queryset = TestCase.objects.filter(problem__oj_display_id=problem_id)
+
+        truncate = self.request.query_params.get('truncate')
+        if truncate is not None:
+            try:
+                truncate = int(truncate)
+                if truncate < 0:
+                    raise ValueError
+            except ValueError:
+                truncate = 0
+            queryset = queryset.defer('content').annotate(
+                content_preview=Substr('content', 1, truncate),
+                content_length=Length('content'),
+            )
+        return queryset
+
+class TestCaseDetailView(generics.RetrieveAPIView):
+    """單一測資的完整內容；列表以 ?truncate= 只載入預覽，需要完整內容（例如複製）時才取回。"""
+    serializer_class = TestCaseSerializer
+
+    def get_queryset(self):
+        return TestCase.objects.filter(problem__oj_display_id=self.kwargs['problem_id'])
+
+class TestCaseExportView(View):
+    """
+    以 tar 封存檔串流匯出題目的所有測資（1.in、2.in、…）。
+    內容透過伺服器端 cursor 逐筆讀取，並支援 ETag 與單一區間的 Range 續傳。
+    """
+    iterator_chunk_size = 100
+
+    def get(self, request, problem_id, *args, **kwargs):
+        problem = get_object_or_404(Problem, oj_display_id=problem_id)
+        # 封存檔只包含 judge 上仍存在的測資
+        queryset = TestCase.objects.filter(problem=problem, is_stale=False).order_by('created_at', 'id')
+
+        # 第一階段：只讀取排版所需的欄位（不含內容）；測資的每個字元對應一個位元組（latin-1），字元數即為檔案大小
+        rows = list(queryset.annotate(size=Length('content')).values_list('id', 'size', 'updated_at'))
+        members = [
+            archive.TarMember(name=f"{i}.in", size=size, mtime=int(updated_at.timestamp()))
+            for i, (_, size, updated_at) in enumerate(rows, start=1)
+        ]
+        offsets, total = archive.build_layout(members)
+
+        digest = hashlib.sha1()
+        for test_case_id, size, updated_at in rows:
+            digest.update(f"{test_case_id}:{size}:{updated_at.isoformat()};".encode())
+        etag = quote_etag(digest.hexdigest())
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            return response
+
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if if_range is None or if_range == etag:
+            try:
+                byte_range = archive.parse_range_header(request.headers.get('Range', ''), total)
+            except ValueError:
+                response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+                response['Content-Range'] = f"bytes */{total}"
+                return response
+
+        start, end = byte_range or (0, total - 1)
+        first, last = archive.overlapping_members(members, offsets, start, end)
+        expected_ids = [row[0] for row in rows[first:last]]
+
+        def contents():
+            # 第二階段：只讀取與請求區間重疊的測資內容
+            rows_iter = queryset.values_list('id', 'content')[first:last].iterator(chunk_size=self.iterator_chunk_size)
+            for expected_id, (test_case_id, content) in zip(expected_ids, rows_iter):
+                if test_case_id != expected_id:
+                    raise ValueError("Test cases changed while streaming the archive.")
+                yield content.encode('latin-1')
+
+        response = StreamingHttpResponse(
+            archive.iter_tar_range(members, offsets, total, contents(), start, end),
+            status=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+            content_type='application/x-tar',
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Disposition'] = f'attachment; filename="{problem.oj_display_id}.tar"'
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+        if byte_range:
+            response['Content-Range'] = f"bytes {start}-{end}/{total}"
+        return response
\ No newline at end of file
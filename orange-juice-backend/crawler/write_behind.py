@@ -0,0 +1,152 @@
+import json
+import logging
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Func, JSONField, Max
+from django.utils import timezone
+
+from .models import Account, Task, CrawlTestCasesTask, CrawlShard, ProbeRecord
+from .metrics import TaskMetrics, span
+
+logger = logging.getLogger(__name__)
+
+
+class JSONMerge(Func):
+    """
+    以 PostgreSQL 的 jsonb || 將 patch 合併到欄位中，patch 的鍵覆寫同名的鍵，其他鍵保持資料庫中的值；欄位為 NULL 時視為空物件。
+    在同一個 UPDATE 中讀取與寫入，不會覆寫其他行程（例如暫停與取消的 API）同時寫入的鍵。
+    """
+    template = "(COALESCE(%(expressions)s, '{}'::jsonb) || %%s::jsonb)"
+    output_field = JSONField()
+
+    def __init__(self, expression, patch: dict):
+        super().__init__(expression)
+        self.patch = patch
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = super().as_sql(compiler, connection, **extra_context)
+        return sql, (*params, json.dumps(self.patch))
+
+
+class WriteBehindBuffer:
+    """
+    將爬蟲任務在熱路徑上的資料庫寫入暫存在記憶體中，定期批次寫回。
+
+    暫存的內容包括帳號的 last_used、任務進度、探測統計、探測紀錄以及 CrawlerCore 的檢查點。
+    每 flush_interval 秒最多寫入一次，任務暫停、取消或結束時必須呼叫 flush()。
+    worker 意外終止時，最多只會遺失最後 flush_interval 秒內的資料。
+    """
+
+    def __init__(self, task: Task, flush_interval: Optional[float] = None, checkpoint: Optional[Callable[[], dict]] = None, metrics: Optional[TaskMetrics] = None, shard: Optional[CrawlShard] = None):
+        """
+        Args:
+            task: 要寫回的任務。
+            checkpoint: 寫回時呼叫以取得最新的 crawler_state，只適用於 CrawlTestCasesTask。
+            metrics: 任務的指標，其摘要會與探測統計一起寫入 Task.result 的 stats 與 metrics 鍵。
+            shard: 分散爬取時執行的分片；進度、統計與檢查點改為寫入分片，探測紀錄仍屬於 task。
+        """
+        self.task = task
+        self.shard = shard
+        self.flush_interval = settings.WRITE_BEHIND_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.checkpoint = checkpoint
+        self.metrics = metrics
+        self.stats: Counter = Counter()
+
+        self._account_last_used: Dict[int, datetime] = {}
+        self._progress: Optional[int] = None
+        self._stats_dirty = False
+        self._probe_records: List[ProbeRecord] = []
+        self._next_probe_seq: Optional[int] = None
+        self._last_flush = time.monotonic()
+
+    def touch_account(self, account: Account) -> None:
+        """記錄帳號被使用，取代每次提交都執行一次 UPDATE"""
+        account.last_used = timezone.now()
+        self._account_last_used[account.id] = account.last_used
+
+    def set_progress(self, progress: int) -> None:
+        (self.shard or self.task).progress = progress
+        self._progress = progress
+
+    def add_stats(self, **counters: int) -> None:
+        """累加探測統計，例如 submissions=1、failed_attempts=1"""
+        self.stats.update(counters)
+        self._stats_dirty = True
+
+    def add_probe_record(self, **fields) -> None:
+        """暫存一筆探測紀錄，寫回時以 bulk_create 一次新增；只有爬取任務會保存探測紀錄"""
+        if not isinstance(self.task, CrawlTestCasesTask):
+            return
+        if self._next_probe_seq is None:
+            # 任務恢復執行時，序號接續之前的紀錄
+            records = ProbeRecord.objects.filter(task_id=self.task.id, shard=self.shard)
+            last_seq = records.aggregate(Max('seq'))['seq__max']
+            self._next_probe_seq = 0 if last_seq is None else last_seq + 1
+        self._probe_records.append(ProbeRecord(task_id=self.task.id, shard=self.shard, seq=self._next_probe_seq, **fields))
+        self._next_probe_seq += 1
+
+    def stats_fields(self) -> dict:
+        """Task.result 中由 buffer 負責的鍵：目前的探測統計與指標摘要"""
+        fields = {}
+        if self.stats:
+            fields['stats'] = dict(self.stats)
+        if self.metrics is not None:
+            fields['metrics'] = self.metrics.summary()
+        return fields
+
+    def result_with_stats(self, result: dict) -> dict:
+        """在要寫入 Task.result 的內容中附上目前的探測統計與指標摘要"""
+        return {**result, **self.stats_fields()}
+
+    def maybe_flush(self) -> None:
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """將所有暫存的寫入以批次方式寫回資料庫"""
+        self._last_flush = time.monotonic()
+        account_last_used, self._account_last_used = self._account_last_used, {}
+        progress, self._progress = self._progress, None
+        stats_dirty, self._stats_dirty = self._stats_dirty, False
+        probe_records, self._probe_records = self._probe_records, []
+
+        task_fields = {}
+        if progress is not None:
+            task_fields['progress'] = progress
+        if stats_dirty:
+            # 只寫入 stats 與 metrics：記憶體中的 result 可能已經過時，整個寫回會覆寫暫停或取消時寫入的訊息
+            task_fields['result'] = JSONMerge('result', self.stats_fields())
+
+        try:
+            with span('db_flush'), transaction.atomic():
+                if account_last_used:
+                    Account.objects.bulk_update(
+                        [Account(id=account_id, last_used=last_used) for account_id, last_used in account_last_used.items()],
+                        ['last_used'],
+                    )
+                if probe_records:
+                    ProbeRecord.objects.bulk_create(probe_records)
+                if self.shard is not None:
+                    if self.checkpoint is not None:
+                        task_fields['crawler_state'] = self.checkpoint()
+                    if task_fields:
+                        CrawlShard.objects.filter(id=self.shard.id).update(updated_at=timezone.now(), **task_fields)
+                else:
+                    if task_fields:
+                        Task.objects.filter(id=self.task.id).update(updated_at=timezone.now(), **task_fields)
+                    if self.checkpoint is not None:
+                        CrawlTestCasesTask.objects.filter(id=self.task.id).update(crawler_state=self.checkpoint())
+        except Exception:
+            # 寫回失敗時保留資料，等下一次再試
+            for account_id, last_used in account_last_used.items():
+                self._account_last_used.setdefault(account_id, last_used)
+            if self._progress is None:
+                self._progress = progress
+            self._stats_dirty = self._stats_dirty or stats_dirty
+            self._probe_records = probe_records + self._probe_records
+            logger.warning(f"Failed to flush buffered writes for task {self.task.id}.", exc_info=True)
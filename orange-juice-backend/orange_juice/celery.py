@@ -1,5 +1,7 @@
+import logging
 import os
 from celery import Celery
+from celery.signals import celeryd_init
 
 # 設定 Django 的 settings 模組
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'orange_juice.settings')
@@ -10,4 +12,32 @@ app = Celery('orange_juice')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # 自動從所有註冊的 Django app 中尋找 tasks.py
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+logger = logging.getLogger(__name__)
+
+
+@celeryd_init.connect
+def preload_captcha_model(sender=None, options=None, **kwargs):
+    """
+    在 worker 主行程 fork 出子行程之前載入驗證碼模型，子行程以寫入時複製的方式共用模型的記憶體。
+    只有消費帳號創建佇列（或未指定佇列）的 worker 需要辨識驗證碼；網站行程與其他 worker 不會載入 torch。
+    載入後不在主行程中執行推論，避免 torch 的執行緒池在 fork 後失效。
+    """
+    from django.conf import settings
+
+    if not settings.CAPTCHA_PRELOAD_MODEL:
+        return
+    queues = (options or {}).get('queues') or []
+    if isinstance(queues, str):
+        queues = queues.split(',')
+    if queues and settings.CAPTCHA_QUEUE not in queues:
+        return
+
+    from crawler.clients.captcha_solver import get_predictor
+    try:
+        get_predictor()
+        logger.info("Captcha model preloaded before forking worker processes.")
+    except Exception:
+        # 模型無法載入時，維持第一次辨識驗證碼時才載入的行為
+        logger.warning("Failed to preload captcha model.", exc_info=True)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import shlex
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -156,10 +157,54 @@ DEFAULT_OJ_PASSWORD = os.environ.get('DEFAULT_OJ_PASSWORD')
 
 # 測資爬取任務相關設定
 ACCOUNTS_PER_CRAWL_TASK = 50 # 每個爬取任務需要分配 50 個帳號
+ACCOUNTS_PER_VERIFY_TASK = 5 # 驗證任務的探測次數少，只需要少量帳號
+
+# 爬取任務排程：同時執行的任務數不超過 crawl 佇列的 worker 數
+CRAWL_MAX_CONCURRENT_TASKS = int(os.environ.get('CRAWL_WORKER_CONCURRENCY', 4))
+CRAWL_PRIORITY_AGING_SECONDS = 10 * 60 # 每等待這麼久，有效優先權加 1
+CRAWL_BATCH_MAX_ITEMS = 200
+# worker 意外終止時任務停在 IN_PROGRESS，心跳超過這麼多秒沒有更新就標記為失敗並釋出名額
+CRAWL_HEARTBEAT_TIMEOUT = int(os.environ.get('CRAWL_HEARTBEAT_TIMEOUT', 15 * 60))
+# Celery beat 執行 schedule_crawls 的間隔（秒）
+CRAWL_SCHEDULE_INTERVAL = int(os.environ.get('CRAWL_SCHEDULE_INTERVAL', 60))
+
+# 分散爬取：一題切成多個分片，每個分片在不同的 worker 上以各自租用的帳號爬取
+CRAWL_MAX_SHARDS = 16
+CRAWL_SHARD_MAX_DEPTH = 3 # 規劃分片時最多展開字典樹的層數
+ACCOUNTS_PER_CRAWL_SHARD = 10
+
+# CrawlerSource 有 get_next_char_or_branch 樣板時，結尾探測以此進位數回傳分岔點（小於 CRAWL_BRANCH_RADIX - 1 時不需額外探測）；
+# get_number 樣板必須能表示到 CRAWL_BRANCH_RADIX + 255
+CRAWL_BRANCH_RADIX = int(os.environ.get('CRAWL_BRANCH_RADIX', 256))
+
+# 等待一次讀取字元的判題時，以最多這麼多個閒置帳號預先提交最可能的下一個前綴；0 表示不預先提交
+CRAWL_SPECULATION_WIDTH = int(os.environ.get('CRAWL_SPECULATION_WIDTH', 3))
+
+# 爬取任務的探測結果快取（以題目、語言與完整程式碼為鍵，所有 worker 共用）：
+# 結果保存的秒數，judge 上的測資在這段時間內被修改時，重新爬取仍會讀到舊的結果；0 表示不使用快取
+CRAWL_PROBE_CACHE_TTL = int(os.environ.get('CRAWL_PROBE_CACHE_TTL', 6 * 60 * 60))
+CRAWL_PROBE_CACHE_MAX_ENTRIES = 200000
+
+# 爬取任務派送前以範例參數填入每個樣板，見 crawler.preflight；預檢期間任務停在 PREFLIGHT 狀態。
+# 實際編譯並執行探測會執行請求中的 header_code 與 footer_code，只在此沙箱指令中進行（shell 語法，{workdir} 代換為探測的暫存目錄），
+# 沙箱必須隔離檔案系統、網路與權限，並唯讀掛載編譯器與 Python 直譯器，例如
+#   bwrap --unshare-all --die-with-parent --ro-bind /usr /usr --symlink usr/lib /lib --symlink usr/lib64 /lib64 --symlink usr/bin /bin
+#         --proc /proc --dev /dev --bind {workdir} {workdir} --chdir {workdir}
+# 未設定時不在本機執行探測，只檢查樣板
+CRAWL_PREFLIGHT_SANDBOX = shlex.split(os.environ.get('CRAWL_PREFLIGHT_SANDBOX', ''))
+CRAWL_PREFLIGHT_TIMEOUT = 10 # 每支探測編譯與執行各自的秒數上限
+# 執行預檢的佇列；設定沙箱的 worker 可以只消費此佇列
+CRAWL_PREFLIGHT_QUEUE = os.environ.get('CRAWL_PREFLIGHT_QUEUE', 'celery')
 
 OJ_BASE_URL = 'http://134.208.3.66/'
 
 CNN_MODEL_PATH = BASE_DIR / "assets" / "cnn_models" / "captcha_v1.pth"
+# 消費此佇列的 worker 在 fork 子行程前預先載入驗證碼模型；網站行程永遠不會載入 torch
+CAPTCHA_QUEUE = 'accounts'
+CAPTCHA_PRELOAD_MODEL = os.environ.get('CAPTCHA_PRELOAD_MODEL', '1') == '1'
+# 驗證碼四個字元都正確的預測機率低於此值時，先換一張驗證碼再送出註冊請求
+CAPTCHA_MIN_CONFIDENCE = float(os.environ.get('CAPTCHA_MIN_CONFIDENCE', 0.8))
+CAPTCHA_MAX_REFRESHES = 5
 
 # --- Logging Configuration ---
 
@@ -233,4 +278,51 @@ CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL')
 CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
-CELERY_RESULT_SERIALIZER = 'json'
\ No newline at end of file
+CELERY_RESULT_SERIALIZER = 'json'
+# 爬取與帳號創建使用各自的佇列，由不同的 worker 處理，彼此不會搶占 worker
+CELERY_TASK_ROUTES = {
+    'crawler.tasks.crawl_test_cases_task': {'queue': 'crawl'},
+    'crawler.tasks.crawl_shard_task': {'queue': 'crawl'},
+    'crawler.tasks.verify_test_cases_task': {'queue': 'crawl'},
+    'crawler.tasks.benchmark_crawler_sources_task': {'queue': 'crawl'},
+    'crawler.tasks.execute_create_accounts_task': {'queue': CAPTCHA_QUEUE},
+    'crawler.tasks.preflight_crawl_task': {'queue': CRAWL_PREFLIGHT_QUEUE},
+}
+# 任務執行時間長，worker 不預先領取多餘的任務，讓排程順序不被打亂
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# 定期排程爬取任務，不只依賴任務結束時的觸發；需要執行 celery beat
+CELERY_BEAT_SCHEDULE = {
+    'schedule-crawls': {
+        'task': 'crawler.tasks.schedule_crawls',
+        'schedule': CRAWL_SCHEDULE_INTERVAL,
+    },
+}
+
+# Redis 設定（任務事件推播等），預設與 Celery broker 共用
+REDIS_URL = os.environ.get('REDIS_URL') or CELERY_BROKER_URL or 'redis://redis:6379/0'
+
+# 任務進度事件的最短推播間隔（秒），避免每次提交都推播
+TASK_EVENT_MIN_INTERVAL = 1.0
+# SSE 連線的心跳間隔（秒）
+TASK_EVENT_KEEPALIVE = 15
+
+# 任務控制訊號（暫停／取消）在 Redis 中的保存時間（秒）
+TASK_CONTROL_SIGNAL_TTL = 24 * 60 * 60
+# Redis 無法使用時，worker 改為輪詢資料庫任務狀態的間隔（秒）
+TASK_CONTROL_FALLBACK_INTERVAL = 5
+
+# 爬蟲任務將帳號使用時間、進度與檢查點暫存在記憶體中，每隔此秒數批次寫回資料庫
+WRITE_BEHIND_FLUSH_INTERVAL = 10
+
+# 爬取成本估計：沒有量測紀錄或已儲存的測資時使用的預設值
+CRAWL_ESTIMATE_JUDGE_LATENCY = 2.0 # 單次探測從提交到取得結果的秒數
+CRAWL_ESTIMATE_DEFAULT_TEST_CASES = 10
+CRAWL_ESTIMATE_DEFAULT_LENGTH = 1000
+
+# CrawlerSource 量測：每個版本重複幾輪校正探測，以及量測結果的有效時間（秒）
+CRAWLER_SOURCE_BENCHMARK_ROUNDS = 2
+CRAWLER_SOURCE_BENCHMARK_TTL = 7 * 24 * 60 * 60
+
+# 爬蟲指標：worker 每隔此秒數將累計的指標寫入 Redis，停止回報的 worker 在 TTL 後消失
+METRICS_FLUSH_INTERVAL = 10
+METRICS_KEY_TTL = 24 * 60 * 60
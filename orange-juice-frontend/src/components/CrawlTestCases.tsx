@@ -19,6 +19,8 @@ interface FormData {
   crawler_source_id: string;
   header_code: string;
   footer_code: string;
+  mode: 'FULL' | 'INCREMENTAL' | 'PER_CASE';
+  shard_count: string;
 }
 
 interface ResultState {
@@ -34,7 +36,9 @@ function CrawlTestCases() {
         oj_problem_id: '',
         crawler_source_id: '',
         header_code: '',
-        footer_code: ''
+        footer_code: '',
+        mode: 'FULL',
+        shard_count: '1'
     });
     const [loading, setLoading] = useState<boolean>(false);
     const [result, setResult] = useState<ResultState | null>(null);
@@ -66,9 +70,30 @@ function CrawlTestCases() {
         try {
             const response = await apiClient.post('/api/tasks/crawl-testcases/', {
                 ...formData,
-                crawler_source_id: parseInt(formData.crawler_source_id)
+                crawler_source_id: formData.crawler_source_id === 'auto' ? 'auto' : parseInt(formData.crawler_source_id),
+                shard_count: formData.mode === 'FULL' ? parseInt(formData.shard_count) : 1
             });
-            setResult({ type: 'success', message: `Task started successfully!`, taskId: response.data.task_id });
+            const estimate = response.data.estimate;
+            const message = estimate
+                ? `Task started successfully! Estimated ${estimate.probes} submissions, about ${Math.ceil(estimate.eta_seconds / 60)} min.`
+                : `Task started successfully!`;
+            setResult({ type: 'success', message, taskId: response.data.task_id });
+        } catch (err: any) {
+            setResult({ type: 'error', message: `Error: ${err.response?.data?.error || err.message}` });
+        } finally {
+            setLoading(false);
+        }
+    };
+
+    const handleBenchmark = async () => {
+        setLoading(true);
+        setResult(null);
+        try {
+            const response = await apiClient.post(`/api/problems/${formData.oj_problem_id}/crawler-sources/benchmark/`, {
+                header_code: formData.header_code,
+                footer_code: formData.footer_code
+            });
+            setResult({ type: 'success', message: 'Benchmarking crawler sources for this problem.', taskId: response.data.task_id });
         } catch (err: any) {
             setResult({ type: 'error', message: `Error: ${err.response?.data?.error || err.message}` });
         } finally {
@@ -93,9 +118,29 @@ function CrawlTestCases() {
                     <label htmlFor="crawler_source_id" className="block text-gray-700 font-bold mb-2">Crawler Source:</label>
                     <select id="crawler_source_id" name="crawler_source_id" value={formData.crawler_source_id} onChange={handleChange} required className={commonInputStyle}>
                         <option value="" disabled>Select a crawler source</option>
+                        <option value="auto">Auto (fastest benchmarked source)</option>
                         {crawlerSources.map(s => <option key={s.id} value={s.id}>{s.name}</option>)}
                     </select>
                 </div>
+                <div>
+                    <label htmlFor="mode" className="block text-gray-700 font-bold mb-2">Mode:</label>
+                    <select id="mode" name="mode" value={formData.mode} onChange={handleChange} className={commonInputStyle}>
+                        <option value="FULL">Full crawl</option>
+                        <option value="INCREMENTAL">Incremental (only new or changed test cases)</option>
+                        <option value="PER_CASE">Per test case (judge reports every case)</option>
+                    </select>
+                </div>
+                {formData.mode === 'FULL' && (
+                    <div>
+                        <label htmlFor="shard_count" className="block text-gray-700 font-bold mb-2">Shards:</label>
+                        <select id="shard_count" name="shard_count" value={formData.shard_count} onChange={handleChange} className={commonInputStyle}>
+                            <option value="1">1 (single worker)</option>
+                            <option value="2">2</option>
+                            <option value="4">4</option>
+                            <option value="8">8</option>
+                        </select>
+                    </div>
+                )}
                 <div>
                     <label htmlFor="header_code" className="block text-gray-700 font-bold mb-2">Header Code:</label>
                     <textarea id="header_code" name="header_code" value={formData.header_code} onChange={handleChange} rows={4} className={`${commonInputStyle} font-mono text-sm`} />
@@ -107,6 +152,9 @@ function CrawlTestCases() {
                 <button type="submit" disabled={loading} className="w-full bg-green-500 hover:bg-green-700 text-white font-bold py-2 px-4 rounded focus:outline-none focus:shadow-outline disabled:bg-green-300">
                     {loading ? 'Starting...' : 'Start Task'}
                 </button>
+                <button type="button" onClick={handleBenchmark} disabled={loading || !formData.oj_problem_id} className="w-full bg-white border border-green-500 text-green-700 hover:bg-green-50 font-bold py-2 px-4 rounded focus:outline-none focus:shadow-outline disabled:opacity-50">
+                    Benchmark Crawler Sources
+                </button>
             </form>
             {result && (
                 <div className={`mt-6 p-4 rounded-md text-sm ${result.type === 'success' ? 'bg-green-100 text-green-800' : 'bg-red-100 text-red-800'}`}>
@@ -11,14 +11,35 @@ interface Problem {
 interface TestCase {
   id: number;
   content: string;
+  content_length: number;
+  truncated: boolean;
+  is_stale: boolean;
   created_at: string;
 }
 
+interface TestCasePage {
+  next: string | null;
+  previous: string | null;
+  results: TestCase[];
+}
+
+// 列表只載入每筆測資的前幾個字元，完整內容在複製時才取回
+const PREVIEW_LENGTH = 500;
+
+// 後端回傳的是絕對網址，只取路徑與查詢字串以便經過 Vite proxy
+const relativeUrl = (url: string | null): string | null => {
+    if (!url) return null;
+    const parsed = new URL(url);
+    return parsed.pathname + parsed.search;
+};
+
 function ProblemTestCases() {
     const { problemId } = useParams<{ problemId: string }>();
     const [problem, setProblem] = useState<Problem | null>(null);
     const [testCases, setTestCases] = useState<TestCase[]>([]);
+    const [nextUrl, setNextUrl] = useState<string | null>(null);
     const [loading, setLoading] = useState<boolean>(true);
+    const [loadingMore, setLoadingMore] = useState<boolean>(false);
     const [error, setError] = useState<string | null>(null);
     const [copiedId, setCopiedId] = useState<number | null>(null);
 
@@ -27,12 +48,15 @@ function ProblemTestCases() {
 
         const fetchData = async () => {
             try {
-                const [problemRes, testCasesRes] = await Promise.all([
-                    apiClient.get<Problem>(`/api/problems/${problemId}/`),
-                    apiClient.get<TestCase[]>(`/api/problems/${problemId}/testcases/`)
-                ]);
+                const problemRes = await apiClient.get<Problem>(`/api/problems/${problemId}/`);
                 setProblem(problemRes.data);
-                setTestCases(testCasesRes.data);
+
+                // 測資列表使用 cursor 分頁，先只載入第一頁，其餘由使用者按「Load more」載入
+                const pageRes = await apiClient.get<TestCasePage>(`/api/problems/${problemId}/testcases/`, {
+                    params: { truncate: PREVIEW_LENGTH },
+                });
+                setTestCases(pageRes.data.results);
+                setNextUrl(relativeUrl(pageRes.data.next));
             } catch (err) {
                 setError('Failed to load data for this problem.');
             } finally {
@@ -42,15 +66,36 @@ function ProblemTestCases() {
         fetchData();
     }, [problemId]);
 
-    const handleCopy = (text: string, id: number) => {
-        navigator.clipboard.writeText(text).then(() => {
-            setCopiedId(id);
+    const handleLoadMore = async () => {
+        if (!nextUrl) return;
+        setLoadingMore(true);
+        try {
+            // next 已帶有 truncate 參數
+            const pageRes = await apiClient.get<TestCasePage>(nextUrl);
+            setTestCases(loaded => loaded.concat(pageRes.data.results));
+            setNextUrl(relativeUrl(pageRes.data.next));
+        } catch (err) {
+            setError('Failed to load more test cases.');
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
+    const handleCopy = async (tc: TestCase) => {
+        try {
+            let text = tc.content;
+            if (tc.truncated) {
+                const res = await apiClient.get<TestCase>(`/api/problems/${problemId}/testcases/${tc.id}/`);
+                text = res.data.content;
+            }
+            await navigator.clipboard.writeText(text);
+            setCopiedId(tc.id);
             setTimeout(() => {
                 setCopiedId(null);
             }, 2000);
-        }).catch(err => {
+        } catch (err) {
             console.error('Failed to copy text: ', err);
-        });
+        }
     };
 
     if (loading) return <div className="text-center p-4">Loading test cases...</div>;
@@ -64,15 +109,28 @@ function ProblemTestCases() {
                     <p className="text-gray-500">{problem.oj_display_id}</p>
                 </div>
             )}
-            <h3 className="text-xl font-semibold mb-4 text-gray-700">Test Cases ({testCases.length})</h3>
+            <div className="flex justify-between items-center mb-4">
+                <h3 className="text-xl font-semibold text-gray-700">Test Cases ({testCases.length}{nextUrl ? '+' : ''})</h3>
+                {testCases.length > 0 && (
+                    <a
+                        href={`/api/problems/${problemId}/testcases/export/`}
+                        className="px-3 py-1 text-sm font-medium text-white bg-orange-500 rounded-md hover:bg-orange-600"
+                    >
+                        Download .tar
+                    </a>
+                )}
+            </div>
             <div className="space-y-4">
                 {testCases.length > 0 ? (
                     testCases.map((tc, index) => (
                         <div key={tc.id} className="bg-gray-50 p-4 rounded-md shadow-sm">
                             <div className="flex justify-between items-center mb-2">
-                                <h4 className="font-bold text-gray-600">Test Case #{index + 1}</h4>
+                                <h4 className="font-bold text-gray-600">
+                                    Test Case #{index + 1}
+                                    {tc.is_stale && <span className="ml-2 px-2 py-0.5 text-xs font-medium text-yellow-800 bg-yellow-100 rounded">Stale</span>}
+                                </h4>
                                 <button
-                                    onClick={() => handleCopy(tc.content, tc.id)}
+                                    onClick={() => handleCopy(tc)}
                                     className="px-3 py-1 text-sm font-medium text-gray-700 bg-gray-200 rounded-md hover:bg-gray-300 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-gray-500 transition-colors"
                                 >
                                     {copiedId === tc.id ? 'Copied!' : 'Copy'}
@@ -81,12 +139,28 @@ function ProblemTestCases() {
                             <pre className="bg-gray-900 text-white p-3 rounded-md text-sm whitespace-pre-wrap break-all">
                                 <code>{tc.content}</code>
                             </pre>
+                            {tc.truncated && (
+                                <p className="mt-1 text-xs text-gray-500">
+                                    Showing the first {tc.content.length} of {tc.content_length} characters.
+                                </p>
+                            )}
                         </div>
                     ))
                 ) : (
                     <p className="text-gray-500">No test cases found for this problem.</p>
                 )}
             </div>
+            {nextUrl && (
+                <div className="mt-4 text-center">
+                    <button
+                        onClick={handleLoadMore}
+                        disabled={loadingMore}
+                        className="px-4 py-2 text-sm font-medium text-gray-700 bg-gray-200 rounded-md hover:bg-gray-300 disabled:opacity-50"
+                    >
+                        {loadingMore ? 'Loading...' : 'Load more'}
+                    </button>
+                </div>
+            )}
         </div>
     );
 }
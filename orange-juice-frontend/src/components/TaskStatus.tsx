@@ -16,12 +16,31 @@ interface CrawlerState {
 
 interface Task {
     id: string;
-    status: 'PENDING' | 'IN_PROGRESS' | 'SUCCESS' | 'FAILURE' | 'PAUSED';
+    status: 'PREFLIGHT' | 'PENDING' | 'IN_PROGRESS' | 'SUCCESS' | 'FAILURE' | 'PAUSED' | 'CANCELLED';
     progress: number;
     result: any;
     updated_at: string;
     task_type?: string;
     crawler_state?: CrawlerState;
+    live?: LiveProgress;
+}
+
+// 爬蟲執行中推播的即時資訊（不會寫入資料庫）
+interface LiveProgress {
+    found_testcases: number;
+    submissions: number;
+    crawler_state: CrawlerState['state'] | null;
+    submissions_per_second: number;
+    // 有成本估計時才會出現
+    estimated_probes?: number;
+    eta_seconds?: number;
+}
+
+function formatDuration(seconds: number): string {
+    const s = Math.round(seconds);
+    const h = Math.floor(s / 3600);
+    const m = Math.floor((s % 3600) / 60);
+    return h > 0 ? `${h}h ${m}m` : m > 0 ? `${m}m ${s % 60}s` : `${s}s`;
 }
 
 function TaskStatus() {
@@ -31,48 +50,37 @@ function TaskStatus() {
     const [loading, setLoading] = useState<boolean>(true);
     const [isResuming, setIsResuming] = useState<boolean>(false);
     const [isPausing, setIsPausing] = useState<boolean>(false);
+    const [isCancelling, setIsCancelling] = useState<boolean>(false);
     // 使用物件來分別儲存 state 的各個欄位
     const [editableCrawlerState, setEditableCrawlerState] = useState<Partial<CrawlerState>>({});
     const [resumeMessage, setResumeMessage] = useState<{type: 'success' | 'error', text: string} | null>(null);
 
     useEffect(() => {
-        let isMounted = true;
-        const fetchTaskStatus = async () => {
-            try {
-                const response = await apiClient.get<Task>(`/api/tasks/${taskId}/status/`);
-                if (isMounted) {
-                    setTask(response.data);
-                    if (response.data.status === 'SUCCESS' || response.data.status === 'FAILURE') {
-                        return true; // Stop polling
-                    }
-                }
-            } catch (err: any) {
-                if (isMounted) {
-                    setError(err.response?.data?.error || 'Failed to fetch task status.');
-                }
-                return true; // Stop polling on error
-            } finally {
-                if (isMounted) {
-                    setLoading(false);
-                }
+        // 透過 Server-Sent Events 訂閱任務事件：第一個事件是完整快照，之後只包含有變動的欄位
+        const eventSource = new EventSource(`/api/tasks/${taskId}/events/`);
+
+        eventSource.onmessage = (event: MessageEvent) => {
+            const update: Partial<Task> = JSON.parse(event.data);
+            setTask(prevTask => ({ ...(prevTask ?? {}), ...update } as Task));
+            setError(null);
+            setLoading(false);
+            if (update.status === 'SUCCESS' || update.status === 'FAILURE' || update.status === 'CANCELLED') {
+                eventSource.close(); // 任務結束，不需要再自動重連
             }
-            return false; // Continue polling
         };
 
-        const poll = async () => {
-            if (await fetchTaskStatus()) {
-                clearInterval(intervalId);
+        eventSource.onerror = () => {
+            // EventSource 會自動重連，只有在連線被永久關閉時才顯示錯誤
+            if (eventSource.readyState === EventSource.CLOSED) {
+                setError('Failed to subscribe to task events.');
+                setLoading(false);
             }
         };
 
-        poll(); // Initial fetch
-        const intervalId = setInterval(poll, 3000); // Poll every 3 seconds
-
         return () => {
-            isMounted = false;
-            clearInterval(intervalId); // Cleanup on component unmount
+            eventSource.close(); // Cleanup on component unmount
         };
-    }, [taskId, isResuming]); // Rerun effect if we trigger a resume
+    }, [taskId, isResuming]); // Resubscribe if we trigger a resume
 
     useEffect(() => {
         // 當 task 資料載入時，更新 editableCrawlerState 的預設值
@@ -117,7 +125,7 @@ function TaskStatus() {
             });
             
             setResumeMessage({ type: 'success', text: 'Task resume request sent successfully! Refreshing status...' });
-            // 重置狀態以觸發重新輪詢
+            // 重置狀態以觸發重新訂閱
             setLoading(true);
             setTask(null); 
         } catch (err: any) {
@@ -140,13 +148,30 @@ function TaskStatus() {
         }
     };
 
+    const handleCancelTask = async () => {
+        if (!taskId) return;
+        if (!window.confirm('Cancel this task? A cancelled task cannot be resumed.')) return;
+        setIsCancelling(true);
+        setResumeMessage(null);
+        try {
+            await apiClient.post(`/api/tasks/${taskId}/cancel/`);
+            setResumeMessage({ type: 'success', text: 'Task cancel request sent successfully! Status will update shortly.' });
+        } catch (err: any) {
+            setResumeMessage({ type: 'error', text: err.response?.data?.error || 'Failed to cancel task.' });
+        } finally {
+            setIsCancelling(false);
+        }
+    };
+
     const getStatusColor = (status: Task['status']) => {
         switch (status) {
             case 'SUCCESS': return 'text-green-600';
             case 'FAILURE': return 'text-red-600';
             case 'IN_PROGRESS': return 'text-blue-600';
+            case 'PREFLIGHT':
             case 'PENDING': return 'text-gray-600';
             case 'PAUSED': return 'text-yellow-600';
+            case 'CANCELLED': return 'text-gray-500';
             default: return 'text-gray-800';
         }
     };
@@ -167,15 +192,26 @@ function TaskStatus() {
         <div className="max-w-4xl mx-auto bg-white p-8 rounded-lg shadow-md mt-6">
             <div className="flex justify-between items-center mb-4">
                 <h1 className="text-2xl font-bold">Task Status</h1>
-                {task && (task.status === 'IN_PROGRESS' || task.status === 'PENDING') && (
-                    <button
-                        onClick={handlePauseTask}
-                        disabled={isPausing}
-                        className="bg-yellow-500 text-white font-bold py-2 px-4 rounded hover:bg-yellow-600 disabled:bg-gray-400"
-                    >
-                        {isPausing ? 'Pausing...' : 'Pause Task'}
-                    </button>
-                )}
+                <div className="space-x-2">
+                    {task && (task.status === 'IN_PROGRESS' || task.status === 'PENDING') && (
+                        <button
+                            onClick={handlePauseTask}
+                            disabled={isPausing}
+                            className="bg-yellow-500 text-white font-bold py-2 px-4 rounded hover:bg-yellow-600 disabled:bg-gray-400"
+                        >
+                            {isPausing ? 'Pausing...' : 'Pause Task'}
+                        </button>
+                    )}
+                    {task && task.status !== 'SUCCESS' && task.status !== 'CANCELLED' && (
+                        <button
+                            onClick={handleCancelTask}
+                            disabled={isCancelling}
+                            className="bg-red-500 text-white font-bold py-2 px-4 rounded hover:bg-red-600 disabled:bg-gray-400"
+                        >
+                            {isCancelling ? 'Cancelling...' : 'Cancel Task'}
+                        </button>
+                    )}
+                </div>
             </div>
             <div className="space-y-4">
                 <div>
@@ -200,6 +236,17 @@ function TaskStatus() {
                     </div>
                     <span className="text-sm">{task.progress}%</span>
                 </div>
+                {task.live && (
+                    <div className="grid grid-cols-2 md:grid-cols-4 gap-4 p-4 bg-gray-50 rounded-md text-sm">
+                        <div><span className="font-bold block">Found Test Cases</span>{task.live.found_testcases}</div>
+                        <div><span className="font-bold block">Submissions</span>{task.live.submissions}{task.live.estimated_probes !== undefined && ` / ~${task.live.estimated_probes}`}</div>
+                        <div><span className="font-bold block">Submissions/s</span>{task.live.submissions_per_second.toFixed(2)}</div>
+                        <div><span className="font-bold block">Crawler State</span><span className="font-mono">{task.live.crawler_state ?? '-'}</span></div>
+                        {task.live.eta_seconds !== undefined && (
+                            <div><span className="font-bold block">ETA</span>{formatDuration(task.live.eta_seconds)}</div>
+                        )}
+                    </div>
+                )}
                 {task.result && (
                     <div>
                         <span className="font-bold">Result:</span>